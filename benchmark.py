@@ -0,0 +1,584 @@
+"""
+Benchmarks for boBnox's hot paths. Each subcommand prints a small table, e.g.:
+
+    python benchmark.py scan --entries 1000000
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+
+def _best_of(repeat, func):
+    """Runs func repeat times and returns (best wall time in seconds, last result)."""
+    best, result = None, None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def _print_table(rows, headers):
+    widths = [max(len(str(row[i])) for row in rows + [headers]) for i in range(len(headers))]
+    print("  ".join(str(h).ljust(w) for h, w in zip(headers, widths)))
+    for row in rows:
+        print("  ".join(str(c).ljust(w) for c, w in zip(row, widths)))
+
+
+def _populate(directory, count):
+    """Creates count empty files with realistic names in directory."""
+    extensions = [".jpg", ".pdf", ".txt", ".tar.gz", ".mp3", ".docx", "", ".xyz"]
+    for i in range(count):
+        with open(os.path.join(directory, f"IMG_{i:08d}{extensions[i % len(extensions)]}"), "wb"):
+            pass
+
+
+def _work_directory(args):
+    """Returns (directory, cleanup) for the benchmark's test directory."""
+    if args.dir:
+        os.makedirs(args.dir, exist_ok=True)
+        if not os.listdir(args.dir):
+            _populate(args.dir, args.entries)
+        return args.dir, lambda: None
+    directory = tempfile.mkdtemp(prefix="bobnox-bench-")
+    _populate(directory, args.entries)
+    return directory, lambda: shutil.rmtree(directory, ignore_errors=True)
+
+
+def bench_scan(args):
+    """os.listdir / os.scandir versus the getdents64 enumerator in organize_linux."""
+    import organize_linux
+
+    directory, cleanup = _work_directory(args)
+    try:
+        def listdir():
+            return len(os.listdir(directory))
+
+        def scandir():
+            with os.scandir(directory) as it:
+                return sum(1 for entry in it if entry.is_file())
+
+        def dents_batches():
+            batches = list(organize_linux.iter_dirent_batches(directory, args.buffer))
+            return sum(len(b) for b in batches), len(batches), sum(len(b.data) for b in batches)
+
+        def dents_entries():
+            return sum(1 for _ in organize_linux.scan_files(directory, args.buffer))
+
+        rows = []
+        for name, func in [("os.listdir", listdir), ("os.scandir + is_file", scandir)]:
+            elapsed, count = _best_of(args.repeat, func)
+            rows.append([name, count, f"{elapsed:.3f}", f"{count / elapsed:,.0f}", ""])
+
+        if organize_linux.getdents_available():
+            elapsed, (count, calls, nbytes) = _best_of(args.repeat, dents_batches)
+            rows.append(["getdents64 batches", count, f"{elapsed:.3f}", f"{count / elapsed:,.0f}", calls])
+            elapsed, count = _best_of(args.repeat, dents_entries)
+            rows.append(["getdents64 DentEntry", count, f"{elapsed:.3f}", f"{count / elapsed:,.0f}", calls])
+            # glibc's readdir uses a 32 KiB buffer, so scandir needs about this many calls
+            scandir_calls = -(-nbytes // 32768)
+            rows[0][4] = rows[1][4] = f"~{scandir_calls}"
+        else:
+            print("getdents64 is not available on this platform")
+
+        _print_table(rows, ["method", "entries", "seconds", "entries/s", "getdents calls"])
+    finally:
+        cleanup()
+
+
+def bench_classify(args):
+    """Names classified per second: splitext + dict lookup, the suffix trie and classify_many()."""
+    import random
+
+    import organize_classify
+    from bobnox import FileOrganizer
+
+    extension_map = FileOrganizer.EXTENSION_MAP
+    extensions = list(extension_map) + [".XYZ", ".bak", ".tar.gz", ".NII.GZ", "", ".part"]
+    rng = random.Random(0)
+    names = [f"file_{i}{rng.choice(extensions)}" for i in range(args.names)]
+    organizer = FileOrganizer()
+
+    def splitext_lookup():
+        # The classification boBnox used before the suffix trie
+        folders = []
+        for name in names:
+            extension = os.path.splitext(name)[1].lower()
+            if extension in extension_map:
+                folders.append(extension_map[extension])
+            else:
+                folders.append(f"{extension[1:].upper()} Files" if extension else "Other Files")
+        return folders
+
+    def suffix_trie():
+        # The classifier FileOrganizer uses while scanning
+        classify_name = organizer._classifier.classify_name
+        return [classify_name(name) for name in names]
+
+    def classify_many(vectorized):
+        organize_classify.HAS_NUMPY = vectorized
+        try:
+            return organizer.classify_many(names)[0]
+        finally:
+            organize_classify.HAS_NUMPY = has_numpy
+
+    has_numpy = organize_classify.HAS_NUMPY
+    candidates = [("splitext + dict", splitext_lookup), ("suffix trie", suffix_trie),
+                  ("classify_many, pure Python", lambda: classify_many(False))]
+    if has_numpy:
+        # Manifests loaded with NumPy arrive as string arrays and skip the conversion
+        name_array = organize_classify.np.asarray(names)
+        candidates += [("classify_many, NumPy", lambda: classify_many(True)),
+                       ("classify_many, NumPy array input",
+                        lambda: organizer.classify_many(name_array)[0])]
+    rows = []
+    for name, func in candidates:
+        elapsed, folders = _best_of(args.repeat, func)
+        rows.append([name, len(folders), f"{elapsed:.3f}", f"{len(folders) / elapsed:,.0f}"])
+    _print_table(rows, ["classifier", "names", "seconds", "names/s"])
+
+
+def bench_rules(args):
+    """Rule matching cost per file as the rule set grows: compiled RuleSet versus a loop."""
+    import random
+    import re
+    from types import SimpleNamespace
+
+    from organize_rules import Rule, RuleSet
+
+    rng = random.Random(0)
+    extensions = [".jpg", ".pdf", ".txt", ".tar.gz", ".mp3", ".docx", "", ".xyz"]
+    names = [SimpleNamespace(name=f"{rng.choice(['IMG_', 'scan_', 'doc'])}{i}{rng.choice(extensions)}")
+             for i in range(args.names)]
+
+    def make_rules(count):
+        rules = []
+        for i in range(count):
+            kind = i % 3
+            if kind == 0:
+                rules.append(Rule(f"R{i}", extensions=(f".e{i}",)))
+            elif kind == 1:
+                rules.append(Rule(f"R{i}", glob=f"key{i}_*"))
+            else:
+                rules.append(Rule(f"R{i}", extensions=(".pdf",), glob=f"inv{i}*"))
+        return rules
+
+    def one_by_one(rules):
+        # Every rule checked in turn, as a straightforward implementation would
+        compiled = [(rule, re.compile(rule.pattern) if rule.pattern else None) for rule in rules]
+
+        def match(entry):
+            name = entry.name
+            lowered = name.lower()
+            for rule, pattern in compiled:
+                if rule.extensions and not lowered.endswith(rule.extensions):
+                    continue
+                if pattern is not None and pattern.match(name) is None:
+                    continue
+                return rule.folder
+            return None
+        return match
+
+    rows = []
+    for count in args.rules:
+        rules = make_rules(count)
+        for label, match in [("loop", one_by_one(rules)), ("compiled", RuleSet(rules).match)]:
+            elapsed, _ = _best_of(args.repeat, lambda: [match(entry) for entry in names])
+            rows.append([count, label, f"{elapsed:.3f}", f"{len(names) / elapsed:,.0f}"])
+    _print_table(rows, ["rules", "matcher", "seconds", "names/s"])
+
+
+def bench_rules_load(args):
+    """Startup cost of a rules config: compiling it versus loading the cached tables."""
+    import json
+
+    from organize_rules import RuleSet
+
+    directory = tempfile.mkdtemp(prefix="bobnox-bench-")
+    saved_cache_home = os.environ.get("XDG_CACHE_HOME")
+    # Keep the benchmark's pickles out of the real cache directory
+    os.environ["XDG_CACHE_HOME"] = directory
+    try:
+        rows = []
+        for count in args.rules:
+            rules = []
+            for i in range(count):
+                kind = i % 3
+                if kind == 0:
+                    rules.append({"folder": f"R{i}", "extension": [f".e{i}", f".e{i}.gz"]})
+                elif kind == 1:
+                    rules.append({"folder": f"R{i}", "glob": f"key{i}_*", "ignore_case": True})
+                else:
+                    rules.append({"folder": f"R{i}", "extension": ".pdf", "regex": f"^inv{i}[-_][0-9]+"})
+            config = {"rules": rules, "keywords": {f"kw{i:04d}": f"K{i}" for i in range(count * 4)}}
+            path = os.path.join(directory, f"rules-{count}.json")
+            with open(path, "w", encoding="utf-8") as fh:
+                json.dump(config, fh)
+            RuleSet.load(path)
+            for label, func in [("compile", lambda: RuleSet.load(path, cache=False)),
+                                ("cached", lambda: RuleSet.load(path))]:
+                elapsed, _ = _best_of(args.repeat, func)
+                rows.append([count, label, f"{elapsed * 1000:.1f}"])
+        _print_table(rows, ["rules", "load", "ms"])
+    finally:
+        if saved_cache_home is None:
+            del os.environ["XDG_CACHE_HOME"]
+        else:
+            os.environ["XDG_CACHE_HOME"] = saved_cache_home
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def bench_keywords(args):
+    """Keyword routing: one `in` test per keyword versus the Aho-Corasick automaton."""
+    import random
+
+    from organize_keywords import KeywordRouter
+
+    rng = random.Random(0)
+    words = ["Screenshot", "Invoice", "IMG_", "scan_", "Receipt", "DSC", "Payslip", "WhatsApp"]
+    # Most names in a real folder contain none of the keywords
+    names = [f"{rng.choice(words) if rng.random() < 0.2 else 'file'} {rng.randrange(10**6)} final"
+             f"{rng.choice(['.png', '.pdf', '.jpg'])}" for _ in range(args.names)]
+
+    rows = []
+    for count in args.keywords:
+        keywords = [(words[i] if i < len(words) else f"kw{i:04d}", f"Folder {i}", i % 3) for i in range(count)]
+        lowered_keywords = [(keyword.lower(), target, priority) for keyword, target, priority in keywords]
+
+        def one_by_one():
+            # Priorities mean every keyword has to be tried
+            folders = []
+            for name in names:
+                lowered = name.lower()
+                best = None
+                for keyword, target, priority in lowered_keywords:
+                    if keyword in lowered and (best is None or (priority, len(keyword)) > best[:2]):
+                        best = (priority, len(keyword), target)
+                folders.append(best and best[2])
+            return folders
+
+        router = KeywordRouter(keywords)
+        for label, func in [("in per keyword", one_by_one), ("aho-corasick", lambda: [router.match(n) for n in names])]:
+            elapsed, _ = _best_of(args.repeat, func)
+            rows.append([count, label, f"{elapsed:.3f}", f"{len(names) / elapsed:,.0f}"])
+    _print_table(rows, ["keywords", "matcher", "seconds", "names/s"])
+
+
+class _SyscallCounter:
+    """
+    Counts calls of the os functions that stand for file system calls while active, plus
+    those of extra (module, function name) pairs such as ctypes wrappers. lookups counts
+    the path components the kernel has to resolve for the two paths of every rename.
+    """
+    FUNCTIONS = ("stat", "lstat", "mkdir", "rename", "replace", "scandir", "open")
+    RENAMES = ("rename", "replace", "rename_noreplace")
+
+    def __init__(self, extra=()):
+        self.targets = [(os, name) for name in self.FUNCTIONS] + list(extra)
+        self.counts = {name: 0 for _, name in self.targets}
+        self.lookups = 0
+        self._saved = []
+
+    def __enter__(self):
+        for module, name in self.targets:
+            original = getattr(module, name)
+            self._saved.append((module, name, original))
+            setattr(module, name, self._counting(name, original))
+        return self
+
+    def __exit__(self, *exc_info):
+        for module, name, original in self._saved:
+            setattr(module, name, original)
+        self._saved = []
+
+    def _counting(self, name, original):
+        counts = self.counts
+        renames = name in self.RENAMES
+
+        def call(*args, **kwargs):
+            counts[name] += 1
+            if renames:
+                self.lookups += sum(len([part for part in os.fspath(path).split(os.sep) if part])
+                                    for path in args[:2])
+            return original(*args, **kwargs)
+        return call
+
+    @property
+    def total(self):
+        return sum(self.counts.values())
+
+
+def bench_moves(args):
+    """
+    System calls and time per moved file: exists checks per file and per name tried
+    versus folders created once and name conflicts settled in a NameIndex.
+    """
+    import bobnox
+
+    organizer = bobnox.FileOrganizer()
+
+    def add_duplicates(directory):
+        # Earlier copies of every file already sit in its folder: name, name (1), ...
+        with os.scandir(directory) as it:
+            names = [entry.name for entry in it]
+        for name in names:
+            folder = os.path.join(directory, organizer.classify_name(name))
+            os.makedirs(folder, exist_ok=True)
+            base, ext, _ = organizer._classifier.split(name)
+            for i in range(args.duplicates):
+                with open(os.path.join(folder, f"{base} ({i}){ext}" if i else name), "wb"):
+                    pass
+
+    def exists_per_file(directory):
+        # What organizing looked like before: check the folder, then the name, then move
+        with os.scandir(directory) as it:
+            entries = [entry for entry in it if entry.is_file()]
+        for entry in entries:
+            folder = os.path.join(directory, organizer.classify_entry(entry))
+            if not os.path.exists(folder):
+                os.makedirs(folder)
+            base, ext, _ = organizer._classifier.split(entry.name)
+            destination, counter = os.path.join(folder, entry.name), 1
+            while os.path.exists(destination):
+                destination = os.path.join(folder, f"{base} ({counter}){ext}")
+                counter += 1
+            os.rename(entry.path, destination)
+
+    def streaming(directory):
+        for _ in organizer.iter_organize(directory):
+            pass
+
+    def planned(directory):
+        for _ in organizer.iter_organize(directory, max_memory=256 << 20):
+            pass
+
+    rows = []
+    for label, func in [("exists check per file", exists_per_file), ("streaming, name index", streaming),
+                        ("planned, folders up front", planned)]:
+        best, counter = None, None
+        for _ in range(args.repeat):
+            directory = tempfile.mkdtemp(prefix="bobnox-bench-")
+            try:
+                _populate(directory, args.entries)
+                add_duplicates(directory)
+                with _SyscallCounter([(bobnox, "rename_noreplace")]) as counter:
+                    start = time.perf_counter()
+                    func(directory)
+                    elapsed = time.perf_counter() - start
+                best = elapsed if best is None else min(best, elapsed)
+            finally:
+                shutil.rmtree(directory, ignore_errors=True)
+        per_file = {name: count / args.entries for name, count in counter.counts.items()}
+        renames = per_file["rename"] + per_file["replace"] + per_file["rename_noreplace"]
+        rows.append([label, f"{best:.3f}", f"{args.entries / best:,.0f}", f"{counter.total / args.entries:.2f}",
+                     f"{per_file['stat'] + per_file['lstat']:.2f}", f"{per_file['mkdir']:.4f}", f"{renames:.2f}",
+                     f"{counter.lookups / args.entries:.1f}"])
+    _print_table(rows, ["mover", "seconds", "files/s", "syscalls/file", "stats/file", "mkdirs/file", "renames/file",
+                        "lookups/move"])
+
+
+def bench_workers(args):
+    """
+    Moves with a thread pool of N workers against a simulated network filesystem, where
+    every rename waits for a round trip of --latency milliseconds. Also checks that the
+    conflicts get the same names whatever the number of workers.
+    """
+    import bobnox
+
+    organizer = bobnox.FileOrganizer()
+    delay = args.latency / 1000
+
+    def slow(original):
+        def call(*a, **kw):
+            time.sleep(delay)
+            return original(*a, **kw)
+        return call
+
+    def populate(directory):
+        _populate(directory, args.entries)
+        # Every fifth file meets an older copy in its folder, and a 'name (1)' of itself
+        # in the directory that competes for the same numbered names
+        with os.scandir(directory) as it:
+            names = sorted(entry.name for entry in it)
+        for name in names[::5]:
+            folder = os.path.join(directory, organizer.classify_name(name))
+            os.makedirs(folder, exist_ok=True)
+            base, ext, _ = organizer._classifier.split(name)
+            for copy in (os.path.join(folder, name), os.path.join(directory, f"{base} (1){ext}")):
+                with open(copy, "wb") as fh:
+                    fh.write(name.encode())
+
+    def outcome(directory):
+        # Where the content of each file ended up
+        placed = {}
+        for dirpath, _, files in os.walk(directory):
+            for name in files:
+                with open(os.path.join(dirpath, name), "rb") as fh:
+                    placed[os.path.relpath(os.path.join(dirpath, name), directory)] = fh.read()
+        return placed
+
+    targets = [(bobnox, "rename_noreplace"), (os, "rename"), (os, "replace")]
+    rows, reference = [], None
+    for workers in args.workers:
+        best, placed = None, None
+        for _ in range(args.repeat):
+            directory = tempfile.mkdtemp(prefix="bobnox-bench-")
+            saved = [(module, name, getattr(module, name)) for module, name in targets]
+            try:
+                populate(directory)
+                total = len(os.listdir(directory))
+                for module, name, original in saved:
+                    setattr(module, name, slow(original))
+                try:
+                    start = time.perf_counter()
+                    for _ in organizer.iter_organize(directory, workers=workers):
+                        pass
+                    elapsed = time.perf_counter() - start
+                finally:
+                    for module, name, original in saved:
+                        setattr(module, name, original)
+                placed = outcome(directory)
+                best = elapsed if best is None else min(best, elapsed)
+            finally:
+                shutil.rmtree(directory, ignore_errors=True)
+        if reference is None:
+            reference = placed
+        rows.append([workers, f"{best:.3f}", f"{total / best:,.0f}", "yes" if placed == reference else "NO"])
+    _print_table(rows, ["workers", "seconds", "files/s", "same names"])
+
+
+def _exif_jpeg(path, date, size):
+    """Writes a JPEG-shaped file of size bytes whose EXIF block carries DateTimeOriginal."""
+    value = date.encode("ascii") + b"\0"
+    # TIFF header, IFD0 with an ExifIFD pointer, Exif IFD with DateTimeOriginal
+    tiff = (b"II*\0" + (8).to_bytes(4, "little")
+            + (1).to_bytes(2, "little") + bytes.fromhex("6987") + (4).to_bytes(2, "little")
+            + (1).to_bytes(4, "little") + (26).to_bytes(4, "little") + bytes(4)
+            + (1).to_bytes(2, "little") + bytes.fromhex("0390") + (2).to_bytes(2, "little")
+            + len(value).to_bytes(4, "little") + (44).to_bytes(4, "little") + bytes(4) + value)
+    app1 = b"Exif\0\0" + tiff
+    with open(path, "wb") as fh:
+        fh.write(b"\xff\xd8\xff\xe1" + (len(app1) + 2).to_bytes(2, "big") + app1 + b"\xff\xda\0\x02")
+        # Stand-in for the compressed image data; sparse, so it costs no disk space
+        fh.truncate(size)
+
+
+def bench_media(args):
+    """EXIF capture dates: reading whole files (or Pillow) versus header parsing and the MediaReader."""
+    from organize_media import MediaReader, read_metadata
+
+    try:
+        from PIL import Image
+    except ImportError:
+        Image = None
+
+    directory = tempfile.mkdtemp(prefix="bobnox-bench-")
+    try:
+        for i in range(args.entries):
+            _exif_jpeg(os.path.join(directory, f"IMG_{i:08d}.jpg"),
+                       f"20{10 + i % 16}:{1 + i % 12:02d}:{1 + i % 28:02d} 12:00:00", args.size)
+        with os.scandir(directory) as it:
+            entries = [entry for entry in it]
+        for entry in entries:
+            # Cache the stat results, as a scan that classifies by date would
+            entry.stat()
+        cache = os.path.join(directory, "media.json")
+
+        def full_read():
+            dates = []
+            for entry in entries:
+                with open(entry.path, "rb") as fh:
+                    data = fh.read()
+                start = data.find(b"Exif\0\0")
+                dates.append(data[start:start + 64] if start >= 0 else None)
+            return len(dates)
+
+        def pillow():
+            return sum(1 for entry in entries if Image.open(entry.path).getexif() is not None)
+
+        def headers():
+            return sum(1 for entry in entries if read_metadata(entry.path, "jpeg"))
+
+        def reader(load):
+            media = MediaReader.load(cache) if load else MediaReader(cache)
+            found = sum(1 for _, metadata in media.read_entries(entries, lambda e: (e, "jpeg")) if metadata)
+            media.save()
+            return found
+
+        rows = []
+        candidates = [("whole file read", full_read)]
+        if Image is not None:
+            candidates.append(("Pillow Image.open + getexif", pillow))
+        candidates += [("header parse, one process", headers),
+                       ("MediaReader, cold cache", lambda: reader(False)),
+                       ("MediaReader, warm cache", lambda: reader(True))]
+        for name, func in candidates:
+            elapsed, _ = _best_of(args.repeat, func)
+            rows.append([name, f"{elapsed:.3f}", f"{len(entries) / elapsed:,.0f}"])
+        _print_table(rows, ["reader", "seconds", "files/s"])
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="boBnox benchmarks")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    scan = sub.add_parser("scan", help="Directory enumeration: scandir versus getdents64")
+    scan.add_argument("--entries", type=int, default=200000, help="Number of files to create")
+    scan.add_argument("--dir", help="Existing directory to scan (populated if empty) instead of a temp dir")
+    scan.add_argument("--buffer", type=int, default=1 << 20, help="getdents64 buffer size in bytes")
+    scan.add_argument("--repeat", type=int, default=3)
+    scan.set_defaults(func=bench_scan)
+
+    classify = sub.add_parser("classify", help="File name classification throughput")
+    classify.add_argument("--names", type=int, default=500000, help="Number of synthetic names")
+    classify.add_argument("--repeat", type=int, default=3)
+    classify.set_defaults(func=bench_classify)
+
+    rules = sub.add_parser("rules", help="Rule matching throughput versus number of rules")
+    rules.add_argument("--names", type=int, default=100000, help="Number of synthetic names")
+    rules.add_argument("--rules", type=int, nargs="+", default=[10, 100, 500], help="Rule set sizes to try")
+    rules.add_argument("--repeat", type=int, default=3)
+    rules.set_defaults(func=bench_rules)
+
+    rules_load = sub.add_parser("rules-load", help="Rules config startup: compiling versus the cached tables")
+    rules_load.add_argument("--rules", type=int, nargs="+", default=[10, 100, 500], help="Rule set sizes to try")
+    rules_load.add_argument("--repeat", type=int, default=3)
+    rules_load.set_defaults(func=bench_rules_load)
+
+    keywords = sub.add_parser("keywords", help="Keyword routing throughput versus number of keywords")
+    keywords.add_argument("--names", type=int, default=100000, help="Number of synthetic names")
+    keywords.add_argument("--keywords", type=int, nargs="+", default=[10, 100, 500], help="Keyword counts to try")
+    keywords.add_argument("--repeat", type=int, default=3)
+    keywords.set_defaults(func=bench_keywords)
+
+    moves = sub.add_parser("moves", help="System calls and time per moved file")
+    moves.add_argument("--entries", type=int, default=100000, help="Number of files to create and move")
+    moves.add_argument("--duplicates", type=int, default=0,
+                       help="Files of the same name already in the destination, per file moved")
+    moves.add_argument("--repeat", type=int, default=3)
+    moves.set_defaults(func=bench_moves)
+
+    workers = sub.add_parser("workers", help="Parallel moves against a simulated network round trip")
+    workers.add_argument("--entries", type=int, default=5000, help="Number of files to create and move")
+    workers.add_argument("--latency", type=float, default=2.0, help="Milliseconds added to every rename")
+    workers.add_argument("--workers", type=int, nargs="+", default=[1, 4, 16], help="Worker counts to try")
+    workers.add_argument("--repeat", type=int, default=3)
+    workers.set_defaults(func=bench_workers)
+
+    media = sub.add_parser("media", help="EXIF date extraction: whole files versus header reads")
+    media.add_argument("--entries", type=int, default=20000, help="Number of photos to create")
+    media.add_argument("--size", type=int, default=4 << 20, help="Size of each photo in bytes (sparse)")
+    media.add_argument("--repeat", type=int, default=3)
+    media.set_defaults(func=bench_media)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,36 @@
+import errno
+import functools
+import itertools
 import os
+import re
 import shutil
+import stat
 import tkinter as tk
 from tkinter import filedialog, messagebox, ttk
 import threading
+import time
 import io
+from collections import OrderedDict, namedtuple
 from datetime import datetime
 
+from organize_classify import SuffixClassifier
+from organize_conflicts import NameIndex, STRATEGIES, make_folders
+from organize_executor import KeyedExecutor
+from organize_ignore import IgnoreRules
+from organize_index import ResumeCursor, ScanIndex
+from organize_linux import getdents_available, rename_noreplace, scan_files as linux_scan_files, stable_offsets
+from organize_media import MediaReader, media_format, read_metadata
+from organize_sniff import ContentSniffer
+from organize_spill import SpillingSorter
+from organize_watch import create_watcher
+from organize_walk import ParallelWalker
+
+__version__ = "1.0.0"
+
+# The ' (1)' or ' (1a2b3c4d)' that conflict resolution put at the end of a base name,
+# as often as it did: 'a (1) (1)' competes for the same names as 'a'
+_CONFLICT_SUFFIX = re.compile(r"(?: \([^()]*\))+$")
+
 # Optional SVG rendering support (cairosvg + Pillow). If unavailable we fall back to text button.
 HAS_SVG_SUPPORT = False
 try:
@@ -17,6 +42,81 @@ except Exception:
     HAS_SVG_SUPPORT = False
 
 # --- 1. CORE LOGIC CLASS ---
+class _FileEntry:
+    """
+    Minimal os.DirEntry look-alike for a file known by name rather than found by scandir.
+    The stat result is fetched once and cached, like DirEntry does.
+    """
+    __slots__ = ('name', 'path', '_stat')
+
+    def __init__(self, directory_path, name):
+        self.name = name
+        self.path = os.path.join(directory_path, name)
+        self._stat = None
+
+    def stat(self, follow_symlinks=True):
+        if self._stat is None:
+            self._stat = os.stat(self.path)
+        return self._stat
+
+    def is_file(self, follow_symlinks=True):
+        try:
+            return stat.S_ISREG(self.stat().st_mode)
+        except OSError:
+            return False
+
+
+class _TimeBudget:
+    """
+    Deadline of a time-budgeted run, shared by the walker threads. check() flags the
+    budget as expired once the time is up and calls on_expire (e.g. ParallelWalker.stop).
+    position is the getdents64 position of the last file taken on in a flat scan.
+    """
+    __slots__ = ('deadline', 'expired', 'on_expire', 'position')
+
+    def __init__(self, seconds, on_expire=None):
+        self.deadline = time.monotonic() + seconds
+        self.expired = False
+        self.on_expire = on_expire
+        self.position = None
+
+    def check(self):
+        if not self.expired and time.monotonic() >= self.deadline:
+            self.expired = True
+            if self.on_expire is not None:
+                self.on_expire()
+        return self.expired
+
+
+class OrganizeEvent(namedtuple('OrganizeEvent',
+                               'index name source folder destination error rules_version total estimated')):
+    """
+    Outcome of organizing one file, as yielded by FileOrganizer.iter_organize().
+    destination is None and error holds the exception when the move failed, or a
+    FileExistsError when the conflict strategy left the file where it is; folder is
+    None as well when source is a directory that could not be scanned.
+    rules_version is the FileOrganizer.rules_version the file was classified with.
+    total is the expected number of files; estimated tells whether it is a guess.
+    total is None when files are streamed in and nothing is known about their number.
+    """
+    __slots__ = ()
+
+    @property
+    def progress(self):
+        """Progress as a 0.0-1.0 fraction, suitable for status callbacks."""
+        return min(self.index / self.total, 1.0) if self.total else 0.0
+
+    @property
+    def counter(self):
+        """
+        Human readable position, e.g. '3/10' or '3/~120' while the total is estimated,
+        or just '3' when there is no total at all.
+        """
+        if self.total is None:
+            return str(self.index)
+        return f"{self.index}/{'~' if self.estimated else ''}{self.total}"
+
+
 class FileOrganizer:
     """
     Handles the actual file organization logic, decoupled from the GUI.
@@ -25,7 +125,7 @@ class FileOrganizer:
         # Images
         '.jpg': 'Images', '.jpeg': 'Images', '.png': 'Images', '.gif': 'Images',
         '.bmp': 'Images', '.svg': 'Images', '.tiff': 'Images', '.webp': 'Images',
-        '.heic': 'Images',
+        '.heic': 'Images', '.heif': 'Images', '.avif': 'Images',
         # Documents
         '.pdf': 'Documents', '.doc': 'Documents', '.docx': 'Documents',
         '.txt': 'Text Documents', '.rtf': 'Documents', '.odt': 'Documents',
@@ -38,10 +138,14 @@ class FileOrganizer:
         '.ogg': 'Audio', '.m4a': 'Audio',
         # Video
         '.mp4': 'Videos', '.mov': 'Videos', '.avi': 'Videos', '.mkv': 'Videos',
-        '.wmv': 'Videos', '.flv': 'Videos',
+        '.wmv': 'Videos', '.flv': 'Videos', '.3gp': 'Videos',
         # Archives
         '.zip': 'Archives', '.rar': 'Archives', '.7z': 'Archives', '.tar': 'Archives',
-        '.gz': 'Archives',
+        '.gz': 'Archives', '.bz2': 'Archives', '.xz': 'Archives', '.zst': 'Archives',
+        '.tar.gz': 'Archives', '.tgz': 'Archives', '.tar.bz2': 'Archives', '.tbz2': 'Archives',
+        '.tar.xz': 'Archives', '.txz': 'Archives', '.tar.zst': 'Archives',
+        # Medical imaging
+        '.nii': 'Medical Images', '.nii.gz': 'Medical Images', '.dcm': 'Medical Images',
         # Code & Scripts
         '.py': 'Scripts', '.js': 'Scripts', '.html': 'Web Files', '.css': 'Web Files',
         '.java': 'Code', '.cpp': 'Code', '.c': 'Code', '.sh': 'Scripts',
@@ -49,71 +153,856 @@ class FileOrganizer:
         '.exe': 'Executables', '.msi': 'Installers', '.dmg': 'Installers',
     }
 
-    def organize_directory(self, directory_path, status_callback):
+    def __init__(self, rules=None, template=None, conflict="rename"):
+        # EXTENSION_MAP compiled for lookups; see classify_name()
+        self._classifier = SuffixClassifier(self.EXTENSION_MAP)
+        # Optional RuleSet consulted before EXTENSION_MAP; see classify_entry(). Kept
+        # together with its version in one tuple so that it can be swapped atomically
+        self._rules = (0, rules)
+        self._rules_lock = threading.Lock()
+        # Folders of every RuleSet used so far; they all stay category folders
+        self._rule_folders = frozenset(rules.folders) if rules is not None else frozenset()
+        # Levels of the deepest of those folders
+        self._rule_depth = rules.depth if rules is not None else 1
+        # Optional PathTemplate that nests files below their category folder
+        self.template = template
+        # What to do when the destination folder already has the name; see organize_conflicts
+        if conflict not in STRATEGIES:
+            raise ValueError(f"unknown conflict strategy {conflict!r}; use one of {', '.join(STRATEGIES)}")
+        self.conflict = conflict
+
+    @property
+    def rules(self):
+        return self._rules[1]
+
+    @property
+    def rules_version(self):
+        """0 for the rules the organizer was created with, then incremented by set_rules()."""
+        return self._rules[0]
+
+    def set_rules(self, rules):
+        """
+        Replaces the RuleSet (or None), e.g. after the rules file changed, and returns the
+        new rules_version. Safe to call from any thread while files are being organized:
+        files already classified move as planned, and every file is classified by either
+        the old or the new rules, never a mix. Planned runs keep the rules they started with.
+        """
+        with self._rules_lock:
+            if rules is not None:
+                self._rule_folders |= rules.folders
+                self._rule_depth = max(self._rule_depth, rules.depth)
+            version = self._rules[0] + 1
+            self._rules = (version, rules)
+        return version
+
+    # Directories iter_organize_paths() keeps open at a time
+    OPEN_DIRECTORIES = 16
+
+    # Set by iter_organize() when a time budget ran out before the work was done
+    stopped_early = False
+
+    def organize_directory(self, directory_path, status_callback, **options):
         """
         Organizes files in the given directory into subfolders.
         Uses a callback function to report progress back to the GUI.
+        Keyword options are passed on to iter_organize().
+        """
+        return self._report_events(self.iter_organize(directory_path, **options), status_callback)
+
+    def organize_paths(self, paths, status_callback, root=None, workers=None):
+        """
+        Organizes the files named by an iterable of paths, see iter_organize_paths().
+        Returns the number of files moved.
+        """
+        return self._report_events(self.iter_organize_paths(paths, root, workers), status_callback)
+
+    def watch_directory(self, directory_path, status_callback, mode="auto", debounce=0.2, max_delay=1.0,
+                        **options):
+        """
+        Organizes the directory once and then keeps organizing files as they arrive, until
+        stop_watching() is called. Arrivals are only picked up once they are completely
+        written and are handled in coalesced batches, without rescanning the directory.
+
+        mode selects the watcher: "inotify", "poll" (snapshot diffs for NFS, SMB and FUSE
+        mounts) or "auto" to choose based on the filesystem. If inotify drops events, the
+        whole directory is organized again. Options are passed on to iter_organize(), and
+        workers to the batches as well. Returns the total number of files moved.
+
+        Only directory_path itself is watched, so recursive is refused (ValueError) rather
+        than organizing the subdirectories once and then never again.
+        """
+        if options.get("recursive"):
+            raise ValueError("watching covers only the top directory; recursive is not supported")
+        watcher = create_watcher(directory_path, mode, debounce=debounce, max_delay=max_delay)
+        self._watcher = watcher
+        try:
+            # Files that arrive from here on are queued by the watcher already
+            files_moved = self.organize_directory(directory_path, status_callback, **options)
+            status_callback("Watching for new files...", 1.0)
+            for batch in watcher.batches():
+                if batch is watcher.RESCAN:
+                    files_moved += self.organize_directory(directory_path, status_callback, **options)
+                else:
+                    events = self.iter_organize_names(directory_path, sorted(batch), options.get("workers"))
+                    files_moved += self._report_events(events, status_callback)
+        finally:
+            self._watcher = None
+            watcher.close()
+        return files_moved
+
+    def stop_watching(self):
+        """Ends a running watch_directory() call. Safe to call from any thread."""
+        watcher = getattr(self, '_watcher', None)
+        if watcher is not None:
+            watcher.stop()
+
+    def _report_events(self, events, status_callback):
+        """Reports a stream of OrganizeEvents through status_callback; returns files moved."""
+        files_moved = 0
+        event = None
+        for event in events:
+            if event.folder is None:
+                print(f"Failed to scan {event.source}: {event.error}")
+                continue
+            if isinstance(event.error, FileExistsError):
+                # Left in place by the conflict strategy
+                status_callback(f"Skipping ({event.counter}): {event.name}, already in {event.folder}",
+                                event.progress)
+                continue
+            if event.error is not None:
+                # Report failure to move this specific file but continue
+                print(f"Failed to move {event.name}: {event.error}")
+            else:
+                files_moved += 1
+
+            # Report progress back to the GUI
+            status_callback(f"Moving ({event.counter}): {event.name} -> {event.folder}", event.progress)
+
+        if event is not None and event.estimated:
+            # The total was only a guess, so finish the progress bar explicitly
+            status_callback(f"Processed {event.index} files", 1.0)
+
+        return files_moved
+
+    def iter_organize_names(self, directory_path, names, workers=None):
+        """
+        Organizes the given file names inside directory_path, without listing the
+        directory. Names that no longer exist or are not regular files are skipped.
+        workers runs the moves on a thread pool, as in iter_organize().
+        """
+        names = list(names)
+        script_name = os.path.basename(__file__)
+        ignore = IgnoreRules(directory_path).matcher(directory_path)
+        destinations = self._name_index()
+        movers = KeyedExecutor(workers) if workers and workers > 1 else None
+        skipped = 0
+
+        def moves():
+            nonlocal skipped
+            for name in names:
+                entry = _FileEntry(directory_path, name)
+                if name == script_name or ignore.ignored(name) or not entry.is_file():
+                    skipped += 1
+                    continue
+                folder_name, rules_version = self._destination(entry)
+                yield self._move_job(directory_path, entry, destinations, folder_name, rules_version, movers)
+
+        results = self._run_moves(moves(), movers)
+        try:
+            for count, result in enumerate(results, 1):
+                # Skipped names count towards the progress as well
+                yield OrganizeEvent(count + skipped, *result, len(names), False)
+        finally:
+            # Waits for the moves still running on the movers' threads
+            results.close()
+            if movers is not None:
+                movers.shutdown()
+            destinations.close()
+
+    def iter_organize_paths(self, paths, root=None, workers=None):
+        """
+        Organizes individual files by path as the paths stream in, each into the category
+        folders of its own directory; no directory is listed. This suits callers that
+        already know what is new, e.g. the output of `find -print0`.
+
+        Relative paths are taken relative to root. Paths outside root, paths that are not
+        regular files, files already somewhere below a category folder (see
+        _in_category_folder()) and files that the .bobnoxignore files of root (or, without
+        one, of their directory) ignore are skipped.
+        Events carry a running count, as the total is unknown.
+
+        The OPEN_DIRECTORIES directories used last keep their destination folders open
+        and listed, so paths alternating between a few directories list each folder once.
+        workers runs the moves on a thread pool, as in iter_organize().
+        """
+        script_name = os.path.basename(__file__)
+        ignores = {}
+        destinations = self._name_index()
+        movers = KeyedExecutor(workers) if workers and workers > 1 else None
+        if root is not None:
+            root = os.path.abspath(root)
+            ignores[None] = IgnoreRules(root)
+        # The directories used last, least recent first, with their destination folders
+        # open and listed; find output often alternates between a few directories
+        recent = OrderedDict()
+        # Moves per directory that have not finished yet
+        pending = {}
+
+        def retire(directory_path):
+            # Closes a directory that dropped out of recent once its last move is done
+            if directory_path not in recent and not pending.get(directory_path):
+                pending.pop(directory_path, None)
+                destinations.close_directory(directory_path)
+
+        def moves():
+            for path in paths:
+                path = os.path.abspath(os.path.join(root, path) if root is not None else path)
+                if root is not None and os.path.commonpath([root, path]) != root:
+                    continue
+                directory_path, name = os.path.split(path)
+                entry = _FileEntry(directory_path, name)
+                if root is not None:
+                    ignore = ignores[None]
+                else:
+                    ignore = ignores.get(directory_path) or ignores.setdefault(directory_path,
+                                                                              IgnoreRules(directory_path))
+                if (name == script_name or self._in_category_folder(directory_path, root)
+                        or ignore.ignored(path) or not entry.is_file()):
+                    continue
+                if directory_path in recent:
+                    recent.move_to_end(directory_path)
+                else:
+                    recent[directory_path] = None
+                    if len(recent) > self.OPEN_DIRECTORIES:
+                        retire(recent.popitem(last=False)[0])
+                pending[directory_path] = pending.get(directory_path, 0) + 1
+                folder_name, rules_version = self._destination(entry)
+                key, move = self._move_job(directory_path, entry, destinations, folder_name, rules_version,
+                                           movers)
+                yield key, functools.partial(self._tagged, directory_path, move)
+
+        results = self._run_moves(moves(), movers)
+        try:
+            for count, (directory_path, result) in enumerate(results, 1):
+                pending[directory_path] -= 1
+                retire(directory_path)
+                yield OrganizeEvent(count, *result, None, True)
+        finally:
+            # Waits for the moves still running on the movers' threads
+            results.close()
+            if movers is not None:
+                movers.shutdown()
+            destinations.close()
+
+    def iter_organize(self, directory_path, total_hint=None, recursive=False, walk_threads=None,
+                      same_filesystem=False, follow_symlinks=False, incremental=False,
+                      scanner="scandir", scan_buffer=1 << 20, max_memory=None, time_budget=None,
+                      sniff=False, workers=None):
+        """
+        Streams the organization of a directory: every file is classified and moved as soon
+        as os.scandir hands it over, and an OrganizeEvent is yielded for it. Nothing is
+        collected up front, so the first move happens immediately and memory stays flat
+        however large the directory is.
+
+        With recursive=True every subdirectory is organized in place as well. The tree is
+        walked by a ParallelWalker with walk_threads threads; boBnox's own category folders
+        are never descended into, same_filesystem stops at mount points and
+        follow_symlinks enters symlinked directories (loops are detected).
+
+        With incremental=True a persistent ScanIndex of the tree is kept between runs:
+        directories whose inode and mtime did not change are not listed again, and in
+        changed directories only new files are looked at.
+
+        scanner="getdents" lists a (non-recursive) directory with large getdents64 calls of
+        scan_buffer bytes instead of os.scandir. That needs far fewer system calls on
+        directories with millions of entries, which pays off where every call is a round
+        trip; on local disks os.scandir is usually faster. Falls back to os.scandir where
+        getdents64 is not available.
+
+        max_memory (bytes) switches to a planned run: the whole scan is classified into a
+        move plan first, which is sorted by directory and destination folder and spilled
+        to temporary run files whenever it outgrows its share of the budget. The plan is then
+        merged back and executed, so memory stays bounded for any number of files and the
+        total is known exactly before the first move.
+
+        time_budget (seconds) stops the run cleanly once the time is up and saves a
+        ResumeCursor: the directories still to be scanned (with the getdents scanner, the
+        position inside a flat directory) and any part of the move plan not yet carried
+        out. The next run with a time budget continues from there, so a huge tree gets
+        organized over several short runs. self.stopped_early tells whether it was cut short.
+
+        sniff=True classifies files without a known extension by their first bytes (magic
+        numbers and '#!' lines), so an extensionless PNG lands in Images and a script
+        without .sh in Scripts. Headers are read by a thread pool and the results cached
+        per inode, size and mtime, so later runs never read the same file again.
+
+        With a template set on the organizer, files go to the folder it renders (e.g.
+        Images/2026/10) instead of their bare category folder. Templates with metadata
+        fields such as {taken_year} or {artist} read the EXIF, ID3 or MP4 headers of media
+        files through a MediaReader, which parses them in a process pool and caches the
+        results per inode, size and mtime.
+
+        Every destination folder is created once per run, the first time a file goes there,
+        without checking whether it exists first; in a planned run they are all known
+        before the first move and are created up front. Its names are then listed once
+        into a NameIndex, which settles name conflicts in memory according to the
+        organizer's conflict strategy: 'rename' (name (1).ext, the default), 'skip',
+        'overwrite-if-newer' or 'hash-suffix'. Each directory and destination folder is
+        opened once, and the moves are renames relative to those fds, so the kernel
+        resolves two bare names per file rather than two full paths.
+
+        workers=N carries out up to N moves at a time on a thread pool, so that on network
+        filesystems moves are bound by bandwidth rather than by one round trip after the
+        other. Moves of files with the same base name into the same folder still run one
+        after the other in scan order, so conflicts get the same names as without workers.
+        Events come in the order moves finish; their index and total stay exact.
+
+        boBnox's own log files and whatever a .bobnoxignore file (gitignore syntax) in a
+        directory or above it matches are left alone; ignored directories are not even
+        listed.
+
+        Progress is exact when total_hint is given, otherwise it is based on an estimate of
+        the directory size that grows as needed.
         """
         if not os.path.isdir(directory_path):
             raise FileNotFoundError("The selected path is not a valid directory.")
 
-        # Filter out directories and the script file itself, only keeping files to move
-        files_to_move = [
-            f for f in os.listdir(directory_path)
-            if os.path.isfile(os.path.join(directory_path, f)) and f != os.path.basename(__file__)
-        ]
-        
-        total_files = len(files_to_move)
-        files_moved = 0
-        
-        if total_files == 0:
-            return 0 # No files to move
+        if total_hint:
+            total, estimated = total_hint, False
+        else:
+            total, estimated = self._estimate_entry_count(directory_path), True
+
+        self.stopped_early = False
+        index = ScanIndex.load(directory_path) if incremental else None
+        plan = SpillingSorter(3, self._plan_budget(max_memory)) if max_memory else None
+        cursor = ResumeCursor.load(directory_path, recursive, plan is not None) if time_budget else None
+        seeds = cursor.pending_dirs if cursor is not None else None
+        if cursor is not None and plan is not None and cursor.plan_count:
+            plan.add_run(cursor.plan_path, cursor.plan_count)
+
+        ignore = IgnoreRules(directory_path)
+        walker = None
+        if recursive:
+            walker = ParallelWalker(walk_threads, follow_symlinks=follow_symlinks,
+                                    same_filesystem=same_filesystem, skip_dir=self.is_category_folder,
+                                    index=index, ignore=ignore)
+        budget = _TimeBudget(time_budget, walker.stop if walker else None) if time_budget else None
+        sniffer = ContentSniffer.load() if sniff else None
+        media = MediaReader.load() if self.template is not None and self.template.needs_metadata else None
+        destinations = set() if plan is not None else None
+        # The names in the destination folders, listed as the run gets to them
+        names = self._name_index()
+        movers = KeyedExecutor(workers) if workers and workers > 1 else None
+        # A plan is carried out as it was made, so a planned run keeps the rules it started with
+        rules_state = self._rules if plan is not None else None
+        handler = functools.partial(self._organize_files, index=index, plan=plan, budget=budget,
+                                    sniffer=sniffer, media=media, destinations=destinations, ignore=ignore,
+                                    rules_state=rules_state, names=names, movers=movers)
+
+        walk = moves = None
+        if walker is not None:
+            results = walk = walker.walk(directory_path, handler, seeds)
+        elif seeds == [] or (index is not None and index.unchanged_subdirs(
+                directory_path, os.stat(directory_path), ignore.matcher(directory_path).key) is not None):
+            results = ()
+        else:
+            position = 0
+            if cursor is not None and seeds and cursor.position:
+                # Only where the offset was saved, as another directory's offsets mean nothing
+                if cursor.directory == self._directory_id(directory_path):
+                    position = cursor.position
+            results = moves = handler(directory_path,
+                                      self._scan_files(directory_path, scanner, scan_buffer, position))
 
-        for i, item_name in enumerate(files_to_move):
-            source_path = os.path.join(directory_path, item_name)
+        planned = False
+        try:
+            if plan is not None:
+                # Only scan errors come out of the planning pass
+                scan_errors = list(results)
+                if budget is not None and budget.expired:
+                    results = scan_errors
+                else:
+                    planned = True
+                    total, estimated = plan.count + len(scan_errors), False
+                    self._make_folders(destinations)
+                    records = iter(plan)
+                    moves = self._execute_plan(records, names, rules_state[0], budget, movers)
+                    results = itertools.chain(scan_errors, moves)
+
+            for count, result in enumerate(results, 1):
+                if estimated and count >= total:
+                    # The estimate was too low; keep some headroom so progress never hits 100%
+                    # before the scan has really finished.
+                    total = count + max(count // 4, 1)
+                if isinstance(result[1], OSError):
+                    # A subdirectory that could not be listed
+                    dirpath, error = result
+                    yield OrganizeEvent(count, os.path.basename(dirpath), dirpath, None, None, error, None,
+                                        total, estimated)
+                else:
+                    yield OrganizeEvent(count, *result, total, estimated)
+
+            if budget is not None and budget.expired:
+                if walker is not None:
+                    cursor.pending_dirs, cursor.position = walker.unfinished(), 0
+                elif planned:
+                    cursor.pending_dirs, cursor.position = [], 0
+                else:
+                    cursor.pending_dirs, cursor.position = [directory_path], budget.position or 0
+                    if cursor.position and not stable_offsets(directory_path):
+                        # The offsets count entries here: with the files taken on moved
+                        # out, the same offset would skip as many files still to do
+                        cursor.position = 0
+                    cursor.directory = self._directory_id(directory_path) if cursor.position else None
+                if plan is not None:
+                    cursor.write_plan(records if planned else plan)
+                self.stopped_early = bool(cursor.pending_dirs or cursor.plan_count)
+        finally:
+            if walk is not None:
+                # Ends the walk, so that no worker is still moving files with the fds below
+                walk.close()
+            if moves is not None:
+                # Waits for the moves still running on the movers' threads
+                moves.close()
+            if movers is not None:
+                movers.shutdown()
+            names.close()
+            if plan is not None:
+                plan.close()
+            if sniffer is not None:
+                sniffer.save()
+            if media is not None:
+                media.save()
+
+        if self.stopped_early:
+            cursor.save()
+        elif cursor is not None:
+            cursor.clear()
+        if index is not None:
+            index.save(partial=self.stopped_early)
+
+    def is_category_folder(self, name):
+        """
+        True for folder names that boBnox itself creates, e.g. 'Images', 'XYZ Files' or
+        the folder of a rule or the fixed top folder of a template.
+        """
+        if self._classifier.is_folder(name):
+            return True
+        if self.template is not None and name == self.template.root:
+            return True
+        return name in self._rule_folders
+
+    def _in_category_folder(self, directory_path, root=None):
+        """
+        True if directory_path is a category folder or lies below one, so that files
+        organized before (e.g. into Images/2026/10 by a template) stay where they are.
+        With a root, every folder between root and directory_path is checked; without
+        one, as many of its last folders as a destination folder can span.
+        """
+        if root is not None:
+            rel = os.path.relpath(directory_path, root)
+            parts = [] if rel == os.curdir else rel.split(os.sep)
+        else:
+            depth = self._rule_depth
+            if self.template is not None:
+                depth += self.template.depth - 1
+            parts = directory_path.split(os.sep)[-depth:]
+        return any(self.is_category_folder(part) for part in parts)
+
+    def classify_entry(self, entry, rules=None):
+        """
+        Returns the destination folder name for a scanned file: the folder of the first
+        matching rule, if rules are set, otherwise classify_name() of its name.
+        rules overrides the organizer's current RuleSet.
+        """
+        if rules is None:
+            rules = self.rules
+        if rules is not None:
+            folder_name = rules.match(entry)
+            if folder_name is not None:
+                return folder_name
+        return self._classifier.classify_name(entry.name)
+
+    def destination_folder(self, entry, folder_name, extension=None, metadata=None):
+        """
+        Returns the folder, relative to the file's directory, that a scanned file with the
+        category folder_name goes to: folder_name itself, or what the template renders
+        from it. extension overrides the one in the file name, e.g. when it was sniffed;
+        metadata is what a MediaReader found, and is read here if the template needs it.
+        """
+        if self.template is None:
+            return folder_name
+        if extension is None:
+            extension = self._classifier.split(entry.name)[1]
+        if metadata is None and self.template.needs_metadata:
+            fmt = media_format(extension)
+            metadata = read_metadata(entry.path, fmt) if fmt else {}
+        try:
+            st = entry.stat() if self.template.needs_stat else None
+        except OSError:
+            # Gone or unreadable; the move reports the error
+            return folder_name
+        return self.template.render(folder_name, extension, st, metadata)
+
+    def classify_name(self, name):
+        """
+        Returns the destination folder name for a file name. The longest matching
+        extension wins, so 'scan.nii.gz' goes to 'Medical Images' and 'src.tar.gz' to
+        'Archives'; unknown extensions go to e.g. 'XYZ Files', no extension to 'Other Files'.
+        """
+        return self._classifier.classify_name(name)
+
+    def classify_many(self, names):
+        """
+        Classifies a large batch of file names, e.g. an offline manifest, without moving
+        anything. Returns (codes, table), where table[codes[i]] is the folder
+        classify_name(names[i]) would return. Vectorized with NumPy when it is installed.
+        Rules are not applied, as they may need more than the name.
+        """
+        return self._classifier.classify_many(names)
+
+    @staticmethod
+    def _directory_id(directory_path):
+        """[st_dev, st_ino] of a directory, or None if it cannot be stat'ed."""
+        try:
+            st = os.stat(directory_path)
+        except OSError:
+            return None
+        return [st.st_dev, st.st_ino]
+
+    @staticmethod
+    def _scan_files(directory_path, scanner="scandir", scan_buffer=1 << 20, position=0):
+        """
+        Yields the DirEntry of every regular file directly inside directory_path.
+        os.scandir gives us the d_type of each entry, so is_file() needs no extra stat.
+        position continues an earlier getdents64 scan; os.scandir always starts over.
+        """
+        if scanner == "getdents" and getdents_available():
+            yield from linux_scan_files(directory_path, scan_buffer, position)
+            return
+        with os.scandir(directory_path) as it:
+            for entry in it:
+                if entry.is_file():
+                    yield entry
+
+    def _organize_files(self, directory_path, entries, index=None, plan=None, budget=None, sniffer=None,
+                        media=None, destinations=None, ignore=None, rules_state=None, names=None, movers=None):
+        """
+        Organizes the scanned files of one directory, skipping the script file itself.
+        Yields (name, source, folder_name, destination_path, error, rules_version) per file.
+        With an index, files left in place by the previous run are skipped and the new
+        state of the directory is recorded once all entries are consumed.
+        With a plan, files are only classified and added to it as
+        (directory_path, folder_name, name); nothing is moved or yielded. Every
+        (directory_path, folder_name) pair is added to destinations.
+        With a budget, stops early once it has expired.
+        With a sniffer, files whose extension is missing or unknown are classified by
+        their content where it is recognized.
+        With a media reader, the metadata of media files is read for the template.
+        With IgnoreRules, ignored files are left in place and count as seen for as long as
+        the directory's ignore rules stay the same.
+        rules_state pins the (rules_version, rules) to classify with; by default each file
+        gets the organizer's current rules.
+        names is the NameIndex of the run's destination folders.
+        With movers (a KeyedExecutor), the moves run on its threads.
+        """
+        script_name = os.path.basename(__file__)
+        matcher = ignore.matcher(directory_path) if ignore is not None else None
+        ignore_key = matcher.key if matcher is not None else None
+        known = index.seen_files(directory_path, ignore_key) if index is not None else set()
+        known.add(script_name)
+        failed = set()
+        if budget is not None and budget.check():
+            return
+        if ignore is not None:
+            entries = self._skip_ignored(entries, matcher, known)
+        else:
+            entries = (entry for entry in entries if entry.name not in known)
+        if sniffer is not None:
+            entries = sniffer.sniff_entries(entries, self._needs_sniffing)
+        else:
+            entries = zip(entries, itertools.repeat(None))
+        if media is not None:
+            entries = media.read_entries(entries, self._media_file)
+        else:
+            entries = zip(entries, itertools.repeat(None))
+
+        def moves():
+            for (entry, sniffed), metadata in entries:
+                if budget is not None:
+                    # A planned scan can only stop halfway if it can pick up at this entry
+                    # again; otherwise the next run would plan the same files over and over
+                    position = getattr(entry, 'position', None)
+                    if (plan is None or position is not None) and budget.check():
+                        return
+                    budget.position = position
+                rules_version, rules = rules_state or self._rules
+                folder_name = rules.match(entry) if rules is not None else None
+                if folder_name is None:
+                    if sniffed:
+                        folder_name = self._classifier.classify_extension(sniffed)
+                    else:
+                        folder_name = self._classifier.classify_name(entry.name)
+                if self.template is not None:
+                    folder_name = self.destination_folder(entry, folder_name, sniffed, metadata)
+                if plan is not None:
+                    plan.add((directory_path, folder_name, entry.name))
+                    if destinations is not None:
+                        destinations.add((directory_path, folder_name))
+                else:
+                    yield self._move_job(directory_path, entry, names, folder_name, rules_version, movers)
+
+        for result in self._run_moves(moves(), movers):
+            if isinstance(result[4], FileExistsError):
+                # Left in place by the conflict strategy: seen, so an unchanged directory
+                # is not listed again only to skip the same file
+                known.add(result[0])
+            elif result[4] is not None:
+                # Looked at again next time
+                failed.add(result[0])
+            yield result
 
-            # 1. Determine destination folder name
-            _, file_extension = os.path.splitext(item_name)
-            file_extension = file_extension.lower()
+        if names is not None and plan is None:
+            names.close_directory(directory_path)
+        if index is not None:
+            self._record_directory(index, directory_path, known, failed, ignore_key)
 
-            if file_extension in self.EXTENSION_MAP:
-                folder_name = self.EXTENSION_MAP[file_extension]
+    @staticmethod
+    def _skip_ignored(entries, matcher, known):
+        """Yields the entries not in known that matcher does not ignore; ignored names are added to known."""
+        for entry in entries:
+            if entry.name in known:
+                continue
+            if matcher.ignored(entry.name):
+                known.add(entry.name)
             else:
-                # Group unknown files
-                folder_name = f"{file_extension[1:].upper()} Files" if file_extension else "Other Files"
+                yield entry
 
-            dest_folder_path = os.path.join(directory_path, folder_name)
+    def _needs_sniffing(self, entry):
+        """True for files whose name has no extension that EXTENSION_MAP knows."""
+        return self._classifier.split(entry.name)[2] is None
 
-            # 2. Create folder if needed
-            if not os.path.exists(dest_folder_path):
-                os.makedirs(dest_folder_path)
+    @staticmethod
+    def _make_folders(destinations):
+        """
+        Creates the (directory_path, folder_name) destinations of a plan before anything
+        is moved, relative to one fd per directory (see organize_conflicts.make_folders()).
+        Folders that cannot be created are dropped from the set, so executing the plan
+        tries again when it gets to them.
+        """
+        for directory_path, group in itertools.groupby(sorted(destinations), key=lambda pair: pair[0]):
+            for folder_name in make_folders(directory_path, [folder_name for _, folder_name in group]):
+                destinations.discard((directory_path, folder_name))
 
-            # 3. Handle Duplicate File Names (Robust Naming)
-            original_name = item_name
-            base_name, ext = os.path.splitext(original_name)
-            counter = 1
-            destination_path = os.path.join(dest_folder_path, item_name)
-            
-            while os.path.exists(destination_path):
-                # Rename the file if it conflicts (e.g., 'file (1).ext')
-                item_name = f"{base_name} ({counter}){ext}"
-                destination_path = os.path.join(dest_folder_path, item_name)
-                counter += 1
+    def _media_file(self, item):
+        """(entry, header format) of a scanned (entry, sniffed extension) pair, or None if it is no media file."""
+        entry, sniffed = item
+        fmt = media_format(sniffed or self._classifier.split(entry.name)[1])
+        return (entry, fmt) if fmt else None
+
+    def _execute_plan(self, records, names, rules_version=None, budget=None, movers=None):
+        """
+        Carries out the sorted records of a move plan, one destination folder after the
+        other, with the NameIndex names. Folders that were not created up front (e.g. from
+        the plan of an earlier, time-budgeted run) are created when their first file comes
+        up. Yields the same tuples as _organize_files, with the rules_version of the plan.
+        With a budget, stops taking records once it has expired, leaving the rest in
+        records; the moves under way are still delivered. With movers (a KeyedExecutor),
+        the moves run on its threads.
+        """
+        current = None
+        # Moves per directory that have not finished yet
+        pending = {}
+
+        def moves():
+            nonlocal current
+            while budget is None or not budget.check():
+                record = next(records, None)
+                if record is None:
+                    return
+                directory_path, folder_name, name = record
+                if directory_path != current:
+                    # Records come sorted by directory, so the previous one is done once
+                    # its last moves are
+                    if current is not None and not pending[current]:
+                        del pending[current]
+                        names.close_directory(current)
+                    current = directory_path
+                    pending[current] = 0
+                pending[current] += 1
+                entry = _FileEntry(directory_path, name)
+                key, move = self._move_job(directory_path, entry, names, folder_name, rules_version, movers)
+                yield key, functools.partial(self._tagged, directory_path, move)
+
+        for directory_path, result in self._run_moves(moves(), movers):
+            pending[directory_path] -= 1
+            if not pending[directory_path] and directory_path != current:
+                del pending[directory_path]
+                names.close_directory(directory_path)
+            yield result
+        if current is not None:
+            names.close_directory(current)
+
+    def _record_directory(self, index, directory_path, known, failed, ignore_key=None):
+        """
+        Stores the post-run state of an organized directory in the scan index. The stat is
+        taken before the final listing, so anything arriving afterwards shows up as a
+        changed mtime next time. Files that arrived during the run or failed to move keep
+        the directory marked as changed, so the next run looks at them again. ignore_key
+        is the key of the ignore rules the files were checked against.
+        """
+        st = os.stat(directory_path)
+        seen, dirs, clean = [], [], not failed
+        with os.scandir(directory_path) as it:
+            for entry in it:
+                try:
+                    if entry.is_dir():
+                        if not self.is_category_folder(entry.name):
+                            dirs.append(entry.name)
+                    elif entry.name in known:
+                        seen.append(entry.name)
+                    elif entry.name not in failed:
+                        clean = False
+                except OSError:
+                    clean = False
+        index.record(directory_path, st, seen, dirs, clean, ignore_key)
+
+    @staticmethod
+    def _plan_budget(max_memory):
+        """
+        Memory a move plan may buffer under a max_memory budget for the whole process:
+        a third of what is left after the interpreter's current footprint, the rest being
+        headroom for allocator slack, merging and moving.
+        """
+        try:
+            with open("/proc/self/statm") as fh:
+                rss = int(fh.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+        except (OSError, ValueError, IndexError, AttributeError):
+            rss = 0
+        return max((max_memory - rss) // 3, 1 << 20)
+
+    @staticmethod
+    def _estimate_entry_count(directory_path):
+        """
+        Rough number of entries in a directory, derived from its st_size. Most filesystems
+        (ext4, xfs, btrfs, tmpfs) grow a directory by a few dozen bytes per entry, which is
+        good enough to drive a progress bar without listing the directory twice.
+        """
+        try:
+            return max(os.stat(directory_path).st_size // 32, 1)
+        except OSError:
+            return 1
+
+    def _move_job(self, directory_path, entry, names, folder_name, rules_version, movers=None):
+        """
+        The (key, func) pair moving one classified file: func() returns the tuple
+        _organize_files yields for it. With movers, key is the destination folder and
+        base name, whose moves the KeyedExecutor runs one after the other. Conflict
+        suffixes are left out of the base name, as 'photo (1).jpg' and 'photo (1) (1).jpg'
+        compete with 'photo.jpg' for the same names.
+        """
+        key = None
+        if movers is not None:
+            base = _CONFLICT_SUFFIX.sub("", self._classifier.split(entry.name)[0])
+            key = (directory_path, folder_name, base)
+        return key, lambda: (entry.name, entry.path) + self._organize_entry(directory_path, entry, names,
+                                                                           folder_name, rules_version)
+
+    def _destination(self, entry):
+        """(folder_name, rules_version): where a file goes by the current rules and template."""
+        rules_version, rules = self._rules
+        return self.destination_folder(entry, self.classify_entry(entry, rules)), rules_version
+
+    @staticmethod
+    def _tagged(tag, move):
+        """(tag, move()), so that a result coming back from the movers tells where it belongs."""
+        return tag, move()
+
+    @staticmethod
+    def _run_moves(jobs, movers=None):
+        """
+        Yields func() of every (key, func) pair of jobs: one after the other, or on the
+        threads of a KeyedExecutor in the order the moves finish.
+        """
+        if movers is not None:
+            return movers.run(jobs)
+        return (move() for _, move in jobs)
 
-            # 4. Move the file
+    def _name_index(self):
+        """A NameIndex for a run; numbered names keep compound extensions whole: 'backup (1).tar.gz'."""
+        return NameIndex(self.conflict, lambda name: self._classifier.split(name)[:2])
+
+    def _organize_entry(self, directory_path, entry, names, folder_name=None, rules_version=None):
+        """
+        Classifies and moves a single scanned file; folder_name skips the classification
+        when it is already known (by rules of rules_version). names is the run's NameIndex,
+        which opens (and the first time creates) the destination folder and picks the
+        file's name in it according to the conflict strategy.
+        Returns (folder_name, destination_path, error, rules_version); error is None on
+        success and a FileExistsError when the strategy left the file where it is.
+        """
+        item_name = entry.name
+
+        # 1. Determine destination folder name
+        if folder_name is None:
+            folder_name, rules_version = self._destination(entry)
+
+        # 2. Open the destination folder, creating it the first time it comes up
+        try:
+            folder = names.folder(directory_path, folder_name)
+            src_dir_fd = names.directory_fd(directory_path)
+        except OSError as e:
+            return folder_name, None, e, rules_version
+        while True:
+            # 3. Pick the name in the destination folder
             try:
-                shutil.move(source_path, destination_path)
-                files_moved += 1
+                name, replace = names.claim(folder, item_name, entry)
+            except OSError as e:
+                return folder_name, None, e, rules_version
+            destination_path = os.path.join(folder.path, name)
+
+            # 4. Move the file, relative to the directory fds where there are any
+            try:
+                self._move_file(entry.path, destination_path, replace, src_dir_fd, folder.fd)
+            except FileExistsError:
+                # Created by someone else since the folder was listed. The name stays
+                # taken in the index, so the next claim settles the conflict.
+                continue
             except Exception as e:
-                # Report failure to move this specific file but continue
-                print(f"Failed to move {item_name}: {e}")
+                names.release(folder, name)
+                return folder_name, None, e, rules_version
+            return folder_name, destination_path, None, rules_version
+
+    @staticmethod
+    def _move_file(source_path, destination_path, replace=False, src_dir_fd=None, dst_dir_fd=None):
+        """
+        Moves a single file. The destination folder lives next to the source, so a plain
+        rename almost always works; shutil.move is only needed across filesystems.
 
-            # 5. Report progress back to the GUI
-            progress_percent = (i + 1) / total_files
-            status_message = f"Moving ({i + 1}/{total_files}): {original_name} -> {folder_name}"
-            status_callback(status_message, progress_percent)
+        Unless replace is set, an existing destination is never overwritten but raises
+        FileExistsError. On Linux renameat2(RENAME_NOREPLACE) makes that check and the
+        move one atomic system call; where the kernel or filesystem lacks it, a plain
+        rename is used and a file created since the NameIndex listing could be replaced.
 
-        return files_moved
+        With the fds of the source and destination directories, the rename only looks up
+        the two file names in them instead of resolving both full paths again.
+        """
+        source, destination = source_path, destination_path
+        if src_dir_fd is not None and dst_dir_fd is not None:
+            source, destination = os.path.basename(source_path), os.path.basename(destination_path)
+        else:
+            src_dir_fd = dst_dir_fd = None
+        try:
+            if replace:
+                os.replace(source, destination, src_dir_fd=src_dir_fd, dst_dir_fd=dst_dir_fd)
+            elif not rename_noreplace(source, destination, src_dir_fd, dst_dir_fd):
+                os.rename(source, destination, src_dir_fd=src_dir_fd, dst_dir_fd=dst_dir_fd)
+        except OSError as e:
+            if e.errno != errno.EXDEV:
+                raise
+            if not replace and os.path.lexists(destination_path):
+                raise FileExistsError(errno.EEXIST, os.strerror(errno.EEXIST), destination_path) from None
+            shutil.move(source_path, destination_path)
 
 
 # --- 2. GUI APPLICATION CLASS ---
@@ -129,6 +1018,7 @@ class FileOrganizerApp(tk.Tk):
         self.geometry("480x360")
         self.configure(bg="#1E1E1E")
         self.path_var = tk.StringVar()
+        self.watch_var = tk.BooleanVar(value=False)
         self.status_var = tk.StringVar(value="Ready. Select a folder to begin.")
         self.log_messages = []  # Store log messages for this run
 
@@ -151,6 +1041,8 @@ class FileOrganizerApp(tk.Tk):
         style.configure("TLabel", background=self.BG_DARK, foreground=self.FG_LIGHT, font=("Inter", 12))
         style.configure("Title.TLabel", font=("Inter", 24, "bold"), foreground=self.ACCENT_COLOR)
         style.configure("Status.TLabel", background=self.BG_DARK, foreground="#999999", font=("Inter", 10, "italic"))
+        style.configure("TCheckbutton", background=self.BG_DARK, foreground=self.FG_LIGHT, font=("Inter", 10))
+        style.map("TCheckbutton", background=[('active', self.BG_DARK)])
 
         # Entry/Input
         style.configure("TEntry", fieldbackground=self.BG_MID, foreground=self.FG_LIGHT, borderwidth=0, relief="flat", padding=8)
@@ -248,15 +1140,24 @@ class FileOrganizerApp(tk.Tk):
                 activebackground=self.BG_DARK
             )
 
-        self.organize_button.grid(row=1, column=0, pady=(10, 20))
+        self.organize_button.grid(row=1, column=0, pady=(10, 10))
+
+        # Watch Toggle - keeps organizing new arrivals until unchecked
+        self.watch_check = ttk.Checkbutton(
+            main_frame,
+            text="Keep watching for new files",
+            variable=self.watch_var,
+            command=self.toggle_watch
+        )
+        self.watch_check.grid(row=2, column=0, pady=(0, 10))
 
         # Progress Bar
         self.progress_bar = ttk.Progressbar(main_frame, orient="horizontal", mode="determinate")
-        self.progress_bar.grid(row=2, column=0, sticky="ew", pady=(0, 10))
+        self.progress_bar.grid(row=3, column=0, sticky="ew", pady=(0, 10))
 
         # Status Label
         self.status_label = ttk.Label(main_frame, textvariable=self.status_var, style="Status.TLabel")
-        self.status_label.grid(row=3, column=0, sticky="w")
+        self.status_label.grid(row=4, column=0, sticky="w")
 
 
     # --- UI EVENT HANDLERS ---
@@ -267,6 +1168,11 @@ class FileOrganizerApp(tk.Tk):
         if path:
             self.path_var.set(path)
 
+    def toggle_watch(self):
+        """Unchecking the watch toggle ends a running watch; the run then finishes normally."""
+        if not self.watch_var.get():
+            self.organizer.stop_watching()
+
     # --- THREADING AND ASYNCHRONOUS EXECUTION ---
     
     def start_organizing_thread(self):
@@ -296,7 +1202,9 @@ class FileOrganizerApp(tk.Tk):
         self.log_messages.append("")
 
         # Start the organization task in a new thread
-        self.thread = threading.Thread(target=self.organize_action, args=(directory_path,), daemon=True)
+        self.thread = threading.Thread(
+            target=self.organize_action, args=(directory_path, self.watch_var.get()), daemon=True
+        )
         self.thread.start()
 
     def update_status(self, message, progress_value):
@@ -318,13 +1226,19 @@ class FileOrganizerApp(tk.Tk):
         self.log_messages.append(message)
         self.update_idletasks() # Force GUI redraw
 
-    def organize_action(self, directory_path):
+    def organize_action(self, directory_path, watch=False):
         """The function executed in the worker thread."""
         try:
-            files_moved = self.organizer.organize_directory(
-                directory_path,
-                self.update_status
-            )
+            if watch:
+                files_moved = self.organizer.watch_directory(
+                    directory_path,
+                    self.update_status
+                )
+            else:
+                files_moved = self.organizer.organize_directory(
+                    directory_path,
+                    self.update_status
+                )
 
             # Final success message
             if files_moved > 0:
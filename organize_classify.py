@@ -0,0 +1,249 @@
+"""
+File name classification: maps names to category folders by their extension.
+"""
+import itertools
+from array import array
+
+# Optional NumPy for classify_many(); without it the names are classified one by one
+HAS_NUMPY = False
+try:
+    import numpy as np
+    HAS_NUMPY = True
+except ImportError:
+    np = None
+else:
+    # NumPy 2 has string ufuncs; np.char loops in Python
+    _strings = getattr(np, "strings", np.char)
+
+# Extension parts of up to 8 ASCII characters are packed into the bytes of a uint64;
+# these keys, which no such part packs into, mark names without (another) extension
+# part and parts that do not fit
+_NO_EXTENSION = 1 << 62
+_SLOW = 1 << 63
+
+
+def _part_keys(names, lead, ends):
+    """
+    Packs the extension part of every name in a NumPy string array that ends before
+    index ends (exclusive) into a uint64 key, lower-cased. lead is where the stem starts,
+    after any leading dots. Returns (keys, index of the dot that starts the part or -1).
+    """
+    count, width = len(names), max(names.itemsize // 4, 1)
+    dot = _strings.rfind(names, ".", lead + 1, ends)
+    part_lengths = ends - dot - 1
+    points = names.view(np.uint32).reshape(count, width)
+    chars = np.take_along_axis(points, np.minimum(dot[:, None] + 1 + np.arange(8), width - 1), axis=1)
+    slow = (part_lengths > 8) | (chars >= 128).any(axis=1)
+    chars = chars.astype(np.uint8)
+    chars *= np.arange(8) < part_lengths[:, None]
+    # ASCII upper case to lower case; the subtraction wraps below 'A'
+    chars += ((chars - np.uint8(65)) < 26) * np.uint8(32)
+    keys = chars.view("<u8").reshape(count)
+    keys[slow] = _SLOW
+    keys[dot < 0] = _NO_EXTENSION
+    return keys, dot
+
+
+def _pack(part):
+    return int.from_bytes(part.encode("ascii"), "little")
+
+
+def _unpack(key):
+    return key.to_bytes(8, "little").rstrip(b"\0").decode("ascii")
+
+
+class SuffixClassifier:
+    """
+    Classifies file names by their longest known extension, so compound extensions such
+    as '.tar.gz' or '.nii.gz' win over their last part ('.gz').
+
+    The extension map is compiled once into a trie of extension parts in reverse order
+    ('gz' -> 'tar' -> ...). A lookup walks the name's dot-separated suffixes from the
+    end and stops as soon as the trie has no continuation. Matching is case-insensitive.
+    Names with an unknown extension go to '<EXT> Files'.
+
+    classify_name() memoizes the folder per last extension as written ('.JPG'), except
+    for the last parts of compound extensions ('.gz'), so most names cost one rfind and
+    one dict lookup, as with splitext and a flat map; only names ending in a compound
+    tail walk the trie.
+    """
+    OTHER = "Other Files"
+
+    def __init__(self, extension_map):
+        self.categories = frozenset(extension_map.values())
+        # Node: {part: [category or None, child node]}
+        self._trie = {}
+        for extension, category in extension_map.items():
+            node, slot = self._trie, None
+            for part in reversed(extension.lower().lstrip(".").split(".")):
+                slot = node.setdefault(part, [None, {}])
+                node = slot[1]
+            slot[0] = category
+        # Folder per last extension as written, for extensions that no compound
+        # extension ends with
+        self._folders = {}
+        # Last extension parts that can end a compound extension ('gz' of '.tar.gz')
+        self._compound_tails = frozenset(part for part, slot in self._trie.items() if slot[1])
+
+    def split(self, name):
+        """
+        Splits name into (stem, extension, category). stem and extension are what
+        os.path.splitext returns, except that a known compound extension is kept whole:
+        'backup.tar.gz' -> ('backup', '.tar.gz', 'Archives'). category is None for an
+        unknown extension.
+        """
+        node = self._trie
+        end = len(name)
+        best = best_start = last_start = None
+        # Leading dots belong to the stem ('.bashrc' has no extension), as in splitext
+        first = len(name) - len(name.lstrip("."))
+        while True:
+            dot = name.rfind(".", first, end)
+            if dot < 0:
+                break
+            if last_start is None:
+                last_start = dot
+            slot = node.get(name[dot + 1:end].lower())
+            if slot is None:
+                break
+            if slot[0] is not None:
+                best, best_start = slot[0], dot
+            node = slot[1]
+            end = dot
+        if best_start is not None:
+            return name[:best_start], name[best_start:], best
+        if last_start is not None:
+            return name[:last_start], name[last_start:], None
+        return name, "", None
+
+    def classify_name(self, name):
+        """Returns the category folder name for a file name."""
+        dot = name.rfind(".")
+        # A dot after another dot or at the start may be part of leading dots ('.bashrc')
+        if dot > 0 and name[dot - 1] != ".":
+            folder = self._folders.get(name[dot:])
+            if folder is not None:
+                return folder
+        _, extension, category = self.split(name)
+        if not extension:
+            return self.OTHER
+        folder = category or f"{extension[1:].upper()} Files"
+        last = name[dot:]
+        if dot > 0 and name[dot - 1] != "." and last[1:].lower() not in self._compound_tails:
+            self._folders[last] = folder
+        return folder
+
+    def is_folder(self, name):
+        """
+        True for folder names classify_name() can return: a category, 'Other Files' or
+        '<EXT> Files' with an upper-case extension, which has no spaces or dots.
+        """
+        if name in self.categories or name == self.OTHER:
+            return True
+        ext = name[:-6] if name.endswith(" Files") else ""
+        return bool(ext) and ext == ext.upper() and " " not in ext and "." not in ext
+
+    def classify_extension(self, extension):
+        """Returns the category folder name for a bare extension such as '.png'."""
+        return self.classify_name("file" + extension)
+
+    def classify_many(self, names):
+        """
+        Classifies a batch of names at once. Returns (codes, table): codes holds, for
+        every name in order, the index of its category folder in the list table. codes is
+        a uint16 array (uint32 beyond 65535 folders): a NumPy array when NumPy is
+        available, an array.array otherwise. The folders are the ones classify_name()
+        returns.
+
+        With NumPy, names are processed in chunks of CHUNK_SIZE. The last extension part
+        of every name is found in the array's code points and packed into an integer in
+        one vectorized pass, and np.unique's inverse index maps the distinct extensions,
+        each classified once, back to the names. Names ending in the last part of a
+        compound extension ('.gz') get a second pass for the part before it. The rare
+        names with long or non-ASCII extensions are classified one by one.
+        """
+        if not HAS_NUMPY:
+            return self._classify_each(names)
+        table, codes_by_folder, codes_by_key = [], {}, {}
+        tails = np.array([_pack(tail) for tail in self._compound_tails if len(tail) <= 8 and tail.isascii()],
+                         dtype=np.uint64)
+        chunks = []
+        for chunk in self._chunks(names):
+            lengths = _strings.str_len(chunk)
+            # Leading dots belong to the stem, as in os.path.splitext
+            lead = lengths - _strings.str_len(_strings.lstrip(chunk, "."))
+            keys, dot = _part_keys(chunk, lead, lengths)
+            codes = self._key_codes(keys, lambda key: (key, _NO_EXTENSION), table, codes_by_folder, codes_by_key)
+            for tail in np.intersect1d(keys, tails).tolist():
+                # One more pass over the part before each compound tail
+                rows = np.flatnonzero(keys == tail)
+                before = _part_keys(chunk[rows], lead[rows], dot[rows])[0]
+                codes[rows] = self._key_codes(before, lambda key: (tail, key), table, codes_by_folder,
+                                              codes_by_key)
+            for i in np.flatnonzero(codes < 0).tolist():
+                codes[i] = self._code(self.classify_name(str(chunk[i])), table, codes_by_folder)
+            chunks.append(codes)
+        codes = np.concatenate(chunks) if chunks else np.zeros(0, dtype=np.int64)
+        return codes.astype(np.uint16 if len(table) <= 0xFFFF else np.uint32), table
+
+    def _key_codes(self, keys, pair, table, codes_by_folder, codes_by_key):
+        """
+        Codes for an array of _part_keys() keys. pair(key) gives the keys of the last two
+        extension parts it stands for; each distinct pair is classified once.
+        """
+        unique_keys, inverse = np.unique(keys, return_inverse=True)
+        unique_codes = np.empty(len(unique_keys), dtype=np.int64)
+        for i, key in enumerate(unique_keys.tolist()):
+            parts = pair(key)
+            code = codes_by_key.get(parts)
+            if code is None:
+                code = codes_by_key[parts] = self._key_code(*parts, table, codes_by_folder)
+            unique_codes[i] = code
+        return unique_codes[inverse.reshape(-1)]
+
+    CHUNK_SIZE = 1 << 20
+
+    def _chunks(self, names):
+        """Yields names as NumPy string arrays of at most CHUNK_SIZE names."""
+        if isinstance(names, np.ndarray):
+            for start in range(0, len(names), self.CHUNK_SIZE):
+                yield names[start:start + self.CHUNK_SIZE].astype(str, copy=False)
+            return
+        names = iter(names)
+        while True:
+            chunk = list(itertools.islice(names, self.CHUNK_SIZE))
+            if not chunk:
+                return
+            yield np.asarray(chunk, dtype=str)
+
+    def _key_code(self, last, before, table, codes_by_folder):
+        """
+        The code for names whose last two extension parts have these _part_keys() keys,
+        or -1 if they have to be classified one by one.
+        """
+        if last == _NO_EXTENSION:
+            return self._code(self.OTHER, table, codes_by_folder)
+        if last == _SLOW or before == _SLOW:
+            return -1
+        extension = "." + _unpack(last)
+        if before != _NO_EXTENSION:
+            extension = "." + _unpack(before) + extension
+            slot = self._trie.get(extension.rsplit(".", 1)[1], (None, {}))[1].get(_unpack(before))
+            if slot is not None and slot[1]:
+                # The compound extension may go on
+                return -1
+        return self._code(self.classify_name("file" + extension), table, codes_by_folder)
+
+    def _classify_each(self, names):
+        """classify_many() without NumPy."""
+        table, codes_by_folder = [], {}
+        codes = [self._code(self.classify_name(name), table, codes_by_folder) for name in names]
+        return array("H" if len(table) <= 0xFFFF else "I", codes), table
+
+    @staticmethod
+    def _code(folder, table, codes_by_folder):
+        code = codes_by_folder.get(folder)
+        if code is None:
+            code = codes_by_folder[folder] = len(table)
+            table.append(folder)
+        return code
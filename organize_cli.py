@@ -1,26 +1,167 @@
 import argparse
 import os
+import shutil
+import signal
+import sys
+import tempfile
+import threading
 from datetime import datetime
 
-from bobnox import FileOrganizer
+import organize_rules
+from bobnox import FileOrganizer, __version__
+from organize_conflicts import STRATEGIES
+from organize_reload import RulesReloader
+from organize_template import PathTemplate
+
+
+def parse_size(text):
+    """Parses sizes like '4096', '64K', '4M' or '1G' into bytes."""
+    try:
+        return organize_rules.parse_size(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid size: {text!r}")
+
+
+def parse_duration(text):
+    """Parses durations like '90', '90s', '15m' or '2h' into seconds."""
+    try:
+        seconds = organize_rules.parse_duration(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid duration: {text!r}")
+    if seconds <= 0:
+        raise argparse.ArgumentTypeError(f"duration must be positive: {text!r}")
+    return seconds
+
+
+def positive_int(text):
+    """Parses a count of threads or workers, which must be at least 1."""
+    try:
+        value = int(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid number: {text!r}")
+    if value < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1: {text!r}")
+    return value
+
+
+def read_paths(stream, separator=b"\n", chunk_size=64 * 1024):
+    """
+    Yields the paths in a binary stream of separator-terminated entries as they arrive,
+    so a pipeline is processed while it is still running. Empty entries are ignored.
+    """
+    read = getattr(stream, "read1", stream.read)
+    tail = b""
+    while True:
+        chunk = read(chunk_size)
+        if not chunk:
+            break
+        parts = (tail + chunk).split(separator)
+        tail = parts.pop()
+        for part in parts:
+            if part:
+                yield os.fsdecode(part)
+    if tail:
+        yield os.fsdecode(tail)
+
+
+class LogBuffer:
+    """
+    Collects the run's log lines in a temporary file rather than a list, so runs over
+    millions of files keep a flat memory profile.
+    """
+    def __init__(self):
+        self._fh = tempfile.TemporaryFile("w+", encoding="utf-8")
+        self._empty = True
+
+    def append(self, line):
+        if not self._empty:
+            self._fh.write("\n")
+        self._fh.write(line)
+        self._empty = False
+
+    def write_to(self, path):
+        self._fh.seek(0)
+        with open(path, "w", encoding="utf-8") as fh:
+            shutil.copyfileobj(self._fh, fh)
+        self._fh.seek(0, os.SEEK_END)
 
 
 def main():
     parser = argparse.ArgumentParser(description="Run boBnox organizer in headless mode")
     parser.add_argument("--path", "-p", required=True, help="Path to the directory to organize (host path mounted into container)")
+    parser.add_argument("--recursive", "-r", action="store_true", help="Also organize every subdirectory in place")
+    parser.add_argument("--walk-threads", type=positive_int, default=None, help="Threads used to walk subdirectories in recursive mode")
+    parser.add_argument("--one-file-system", action="store_true", help="In recursive mode, do not cross mount points")
+    parser.add_argument("--follow-symlinks", action="store_true", help="In recursive mode, descend into symlinked directories")
+    parser.add_argument("--incremental", action="store_true", help="Keep a scan index between runs and skip unchanged directories")
+    parser.add_argument("--scanner", choices=["scandir", "getdents"], default="scandir",
+                        help="Directory enumerator; getdents uses large getdents64 buffers (Linux) for huge directories")
+    parser.add_argument("--scan-buffer", type=parse_size, default="1M", help="Buffer size per getdents64 call, e.g. 4M")
+    parser.add_argument("--rules", metavar="FILE",
+                        help="JSON file with routing rules checked before the built-in extension map; "
+                             "in watch mode it is reloaded when it changes or on SIGHUP")
+    parser.add_argument("--template", metavar="TEMPLATE",
+                        help="Destination folder template, e.g. '{category}/{year}/{month}' "
+                             "(fields: category, ext, year, month, day, size, taken_year, taken_month, "
+                             "taken_day, artist, album)")
+    parser.add_argument("--on-conflict", choices=STRATEGIES, default="rename",
+                        help="When the destination folder already has the name: rename to 'name (1).ext' (default), "
+                             "skip, overwrite-if-newer, or hash-suffix ('name (<content hash>).ext')")
+    parser.add_argument("--workers", type=positive_int, default=None, metavar="N",
+                        help="Move up to N files at a time, e.g. 16 on network filesystems (default: one at a time)")
+    parser.add_argument("--sniff", action="store_true",
+                        help="Classify files without a known extension by their content (magic bytes, #! lines)")
+    parser.add_argument("--max-memory", type=parse_size, default=None,
+                        help="Plan the whole run within this memory budget (e.g. 256M), spilling to temp files")
+    parser.add_argument("--time-budget", type=parse_duration, default=None,
+                        help="Stop after this long (e.g. 15m) and continue where it left off on the next run")
+    parser.add_argument("--paths-from", metavar="FILE",
+                        help="Organize only the files listed in FILE ('-' for stdin) instead of listing --path")
+    parser.add_argument("--null", "-0", action="store_true", help="Paths in --paths-from are NUL-terminated, as from find -print0")
+    parser.add_argument("--watch", "-w", action="store_true", help="Keep running and organize new files as they arrive (stop with Ctrl+C)")
+    parser.add_argument("--watch-mode", choices=["auto", "inotify", "poll"], default="auto",
+                        help="How to detect new files in watch mode; auto polls on network and FUSE mounts")
+    parser.add_argument("--debounce", type=float, default=0.2, help="Seconds of quiet before a batch of new files is organized in watch mode")
     args = parser.parse_args()
+    if args.paths_from and (args.watch or args.recursive):
+        parser.error("--paths-from cannot be combined with --watch or --recursive")
+    if args.watch and args.recursive:
+        parser.error("--watch only watches the top directory and cannot be combined with --recursive")
+    if args.paths_from:
+        # Nothing is listed or scanned, so these have nothing to act on
+        unused = [flag for flag, value in [("--incremental", args.incremental), ("--sniff", args.sniff),
+                                           ("--max-memory", args.max_memory), ("--time-budget", args.time_budget),
+                                           ("--scanner", args.scanner != "scandir")] if value]
+        if unused:
+            parser.error(f"--paths-from cannot be combined with {', '.join(unused)}")
 
     directory = args.path
     if not os.path.isdir(directory):
         print(f"Error: '{directory}' is not a valid directory")
         raise SystemExit(1)
 
-    organizer = FileOrganizer()
-    log_lines = []
+    rules = None
+    if args.rules:
+        try:
+            rules = organize_rules.RuleSet.load(args.rules, version=__version__)
+        except (OSError, ValueError) as e:
+            print(f"Error: cannot load rules: {e}")
+            raise SystemExit(1)
+    template = None
+    if args.template:
+        try:
+            template = PathTemplate(args.template)
+        except ValueError as e:
+            parser.error(str(e))
+    organizer = FileOrganizer(rules, template, args.on_conflict)
+    log_lines = LogBuffer()
+    # The rules reloader reports from its own thread
+    log_lock = threading.Lock()
 
     def status_cb(message, progress):
-        print(message)
-        log_lines.append(message)
+        with log_lock:
+            print(message)
+            log_lines.append(message)
 
     start_ts = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     log_lines.append(f"=== Organization started at {start_ts} ===")
@@ -28,18 +169,64 @@ def main():
     log_lines.append("")
 
     try:
-        moved = organizer.organize_directory(directory, status_cb)
+        options = dict(
+            recursive=args.recursive,
+            walk_threads=args.walk_threads,
+            same_filesystem=args.one_file_system,
+            follow_symlinks=args.follow_symlinks,
+            incremental=args.incremental,
+            scanner=args.scanner,
+            scan_buffer=args.scan_buffer,
+            max_memory=args.max_memory,
+            time_budget=args.time_budget,
+            sniff=args.sniff,
+            workers=args.workers,
+        )
+        if args.paths_from:
+            separator = b"\0" if args.null else b"\n"
+            if args.paths_from == "-":
+                moved = organizer.organize_paths(read_paths(sys.stdin.buffer, separator), status_cb, root=directory,
+                                                 workers=args.workers)
+            else:
+                with open(args.paths_from, "rb") as fh:
+                    moved = organizer.organize_paths(read_paths(fh, separator), status_cb, root=directory,
+                                                     workers=args.workers)
+        elif args.watch:
+            # Stop cleanly on Ctrl+C / docker stop so the log still gets written
+            for sig in (signal.SIGINT, signal.SIGTERM):
+                signal.signal(sig, lambda signum, frame: organizer.stop_watching())
+            reloader = None
+            if args.rules:
+                reloader = RulesReloader(
+                    organizer, args.rules, version=__version__,
+                    on_reload=lambda version, path: status_cb(f"Reloaded rules from {path} (version {version})", 1.0),
+                    on_error=lambda error, path: status_cb(f"Keeping the current rules: {error}", 1.0),
+                ).start()
+                if hasattr(signal, "SIGHUP"):
+                    signal.signal(signal.SIGHUP, lambda signum, frame: reloader.reload())
+            try:
+                moved = organizer.watch_directory(
+                    directory, status_cb, mode=args.watch_mode, debounce=args.debounce, **options
+                )
+            finally:
+                if reloader is not None:
+                    reloader.stop()
+        else:
+            moved = organizer.organize_directory(directory, status_cb, **options)
         end_ts = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         log_lines.append("")
         log_lines.append(f"=== Organization completed at {end_ts} ===")
         log_lines.append(f"Files moved: {moved}")
+        if organizer.stopped_early:
+            note = "Time budget used up; run again with --time-budget to continue where this run stopped."
+            print(note)
+            log_lines.append(note)
 
         # write log
         ts = datetime.now().strftime("%Y%m%d-%H%M%S")
         fname = f"bobnox-log-{ts}.txt"
         path = os.path.join(directory, fname)
-        with open(path, "w", encoding="utf-8") as fh:
-            fh.write("\n".join(log_lines))
+        log_lines.write_to(path)
         print(f"Log saved to: {path}")
 
     except Exception as e:
@@ -48,8 +235,7 @@ def main():
         fname = f"bobnox-log-error-{ts}.txt"
         path = os.path.join(directory, fname)
         try:
-            with open(path, "w", encoding="utf-8") as fh:
-                fh.write("\n".join(log_lines))
+            log_lines.write_to(path)
             print(f"Error log saved to: {path}")
         except Exception:
             print("Failed to write log file")
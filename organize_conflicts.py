@@ -0,0 +1,258 @@
+"""
+Destination names for moved files: what happens when a folder already has the name.
+"""
+import errno
+import hashlib
+import os
+import threading
+
+# rename:             'name (1).ext', 'name (2).ext', ... (the first free number)
+# skip:               leave the file where it is
+# overwrite-if-newer: replace the existing file if ours was modified later, else skip
+# hash-suffix:        'name (1a2b3c4d).ext' from the content, so the name does not depend
+#                     on the order files come in; skipped if that name exists as well,
+#                     as it then almost certainly holds the same content
+STRATEGIES = ("rename", "skip", "overwrite-if-newer", "hash-suffix")
+
+HASH_CHUNK = 1 << 20
+
+
+def content_hash(path, length=8):
+    """The first length hex digits of the SHA-256 of a file's content."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for chunk in iter(lambda: fh.read(HASH_CHUNK), b""):
+            digest.update(chunk)
+    return digest.hexdigest()[:length]
+
+
+# Whether directories can be opened and used as dir_fd for stat, mkdir and rename (POSIX)
+DIR_FDS = hasattr(os, "O_DIRECTORY") and {os.open, os.stat, os.mkdir, os.rename} <= os.supports_dir_fd
+_DIR_FLAGS = os.O_RDONLY | getattr(os, "O_DIRECTORY", 0) | getattr(os, "O_CLOEXEC", 0)
+
+
+def make_folder(folder_name, dir_fd):
+    """
+    Creates folder_name (relative, e.g. 'Images/2026') inside the directory dir_fd, one
+    component at a time relative to the fd of the one before, as os.makedirs does by
+    path. Returns an fd of the folder. Raises OSError if a component cannot be created.
+    """
+    fd = dir_fd
+    try:
+        for part in folder_name.split(os.sep):
+            if not part or part == ".":
+                continue
+            try:
+                os.mkdir(part, dir_fd=fd)
+            except FileExistsError:
+                pass
+            child = os.open(part, _DIR_FLAGS, dir_fd=fd)
+            if fd != dir_fd:
+                os.close(fd)
+            fd = child
+    except BaseException:
+        if fd != dir_fd:
+            os.close(fd)
+        raise
+    return fd if fd != dir_fd else os.dup(dir_fd)
+
+
+def make_folders(directory_path, folder_names, dir_fds=DIR_FDS):
+    """
+    Creates the folders folder_names inside directory_path, relative to one fd of it
+    where the platform has DIR_FDS. Returns the folder names that could not be created.
+    """
+    try:
+        dir_fd = os.open(directory_path, _DIR_FLAGS) if dir_fds else None
+    except OSError:
+        return list(folder_names)
+    failed = []
+    try:
+        for folder_name in folder_names:
+            try:
+                if dir_fd is None:
+                    os.makedirs(os.path.join(directory_path, folder_name), exist_ok=True)
+                else:
+                    os.close(make_folder(folder_name, dir_fd))
+            except OSError:
+                failed.append(folder_name)
+    finally:
+        if dir_fd is not None:
+            os.close(dir_fd)
+    return failed
+
+
+class _Folder:
+    """A destination folder: its path, its fd (or None), the names in it and their next free numbers."""
+    __slots__ = ("path", "fd", "names", "suffixes", "lock")
+
+    def __init__(self, path, fd, names):
+        self.path = path
+        self.fd = fd
+        self.names = names
+        # (base, ext) -> lowest number that may still be free for 'base (n)ext'
+        self.suffixes = {}
+        self.lock = threading.Lock()
+
+
+class _Directory:
+    """A directory being organized: its fd (or None) and its destination folders by name."""
+    __slots__ = ("fd", "folders")
+
+    def __init__(self, fd):
+        self.fd = fd
+        self.folders = {}
+
+
+class NameIndex:
+    """
+    The names in every destination folder of a run, listed with one os.scandir the
+    first time a file goes to the folder (which is created then if need be), and kept up
+    to date in memory as files are moved in. Conflicts are resolved without touching
+    the filesystem: the next free 'name (n)' is remembered per base name, so a thousand
+    IMG_0001.jpg cost no more than one. Only overwrite-if-newer stats the file in the way
+    and only hash-suffix reads the file being moved.
+
+    Where the platform supports it (DIR_FDS), every directory being organized and each of
+    its destination folders is opened once, and the fds of directory_fd() and
+    _Folder.fd serve as dir_fd for the moves: a move then resolves two bare names
+    instead of two full paths, which saves a lookup per path component on network
+    filesystems. Missing folders are created relative to the directory's fd as well
+    (make_folder()). close_directory() closes the fds of a directory once it is done, and
+    close() the rest at the end of the run.
+
+    split(name) gives the (base, extension) a numbered or hashed name is built from.
+
+    The names claim() hands out are reserved until release(), so threads moving files
+    into the same folder never pick the same name. Safe to use from several threads.
+    """
+    def __init__(self, strategy="rename", split=os.path.splitext, dir_fds=DIR_FDS):
+        if strategy not in STRATEGIES:
+            raise ValueError(f"unknown conflict strategy {strategy!r}; use one of {', '.join(STRATEGIES)}")
+        self.strategy = strategy
+        self.split = split
+        self.dir_fds = dir_fds
+        self._directories = {}
+        self._lock = threading.Lock()
+
+    def folder(self, directory_path, folder_name):
+        """
+        The _Folder folder_name (relative, e.g. 'Images/2026') inside directory_path,
+        created, opened and listed the first time. Raises OSError if that fails.
+        """
+        directory = self._directory(directory_path)
+        folder = directory.folders.get(folder_name)
+        if folder is not None:
+            return folder
+        path = os.path.join(directory_path, folder_name)
+        try:
+            fd = self._open(folder_name, directory.fd)
+            try:
+                with os.scandir(fd if fd is not None else path) as it:
+                    names = {entry.name for entry in it}
+            except BaseException:
+                if fd is not None:
+                    os.close(fd)
+                raise
+        except FileNotFoundError:
+            # Not there yet: creating it is cheaper than checking for it first
+            if directory.fd is not None:
+                fd = make_folder(folder_name, directory.fd)
+            else:
+                os.makedirs(path, exist_ok=True)
+                fd = None
+            names = set()
+        with self._lock:
+            folder = directory.folders.setdefault(folder_name, _Folder(path, fd, names))
+        if folder.fd != fd and fd is not None:
+            # Another thread got there first
+            os.close(fd)
+        return folder
+
+    def directory_fd(self, directory_path):
+        """An fd of directory_path to use as dir_fd, or None without DIR_FDS."""
+        return self._directory(directory_path).fd
+
+    def claim(self, folder, name, source):
+        """
+        Reserves the name a file called name gets in the _Folder folder and returns
+        (name, replace): the name it is to be moved to, and whether an older file of that
+        name is to be overwritten. source is the DirEntry-like object of the file. Raises
+        FileExistsError when the file is to stay where it is.
+        """
+        with folder.lock:
+            if name not in folder.names:
+                folder.names.add(name)
+                return name, False
+        base, ext = self.split(name)
+        if self.strategy == "rename":
+            return self._next_free(folder, base, ext), False
+        if self.strategy == "overwrite-if-newer":
+            try:
+                if folder.fd is not None:
+                    existing = os.stat(name, dir_fd=folder.fd)
+                else:
+                    existing = os.stat(os.path.join(folder.path, name))
+                newer = source.stat().st_mtime_ns > existing.st_mtime_ns
+            except FileNotFoundError:
+                # Gone in the meantime: the name is free after all
+                newer = True
+            if newer:
+                return name, True
+        elif self.strategy == "hash-suffix":
+            hashed = f"{base} ({content_hash(source.path)}){ext}"
+            with folder.lock:
+                if hashed not in folder.names:
+                    folder.names.add(hashed)
+                    return hashed, False
+            name = hashed
+        raise FileExistsError(errno.EEXIST, "a file of that name is already there", os.path.join(folder.path, name))
+
+    def release(self, folder, name):
+        """Gives up a claimed name after the move to it failed."""
+        with folder.lock:
+            folder.names.discard(name)
+
+    def close_directory(self, directory_path):
+        """Forgets a directory that is done, closing its fds and those of its destination folders."""
+        with self._lock:
+            directory = self._directories.pop(directory_path, None)
+        if directory is None:
+            return
+        for folder in directory.folders.values():
+            if folder.fd is not None:
+                os.close(folder.fd)
+        if directory.fd is not None:
+            os.close(directory.fd)
+
+    def close(self):
+        """Closes every fd that is still open."""
+        for directory_path in list(self._directories):
+            self.close_directory(directory_path)
+
+    def _directory(self, directory_path):
+        directory = self._directories.get(directory_path)
+        if directory is not None:
+            return directory
+        fd = os.open(directory_path, _DIR_FLAGS) if self.dir_fds else None
+        with self._lock:
+            directory = self._directories.setdefault(directory_path, _Directory(fd))
+        if directory.fd != fd:
+            os.close(fd)
+        return directory
+
+    @staticmethod
+    def _open(folder_name, dir_fd):
+        # Without a directory fd the folder is not opened either
+        return os.open(folder_name, _DIR_FLAGS, dir_fd=dir_fd) if dir_fd is not None else None
+
+    @staticmethod
+    def _next_free(folder, base, ext):
+        with folder.lock:
+            n = folder.suffixes.get((base, ext), 1)
+            while f"{base} ({n}){ext}" in folder.names:
+                n += 1
+            name = f"{base} ({n}){ext}"
+            folder.names.add(name)
+            folder.suffixes[(base, ext)] = n + 1
+            return name
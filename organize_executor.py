@@ -0,0 +1,84 @@
+"""
+Thread pool for running moves concurrently, in order per key.
+"""
+import queue
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+
+class KeyedExecutor:
+    """
+    Runs jobs on a pool of threads. Jobs with the same key run one after the
+    other in the order they were submitted, jobs with different keys run in parallel.
+    Moves are keyed by destination folder and base name, so that the files competing
+    for 'name (1).ext', 'name (2).ext', ... claim them in scan order whatever the
+    timing, while a network filesystem gets as many requests in flight as there are
+    workers instead of one.
+
+    run() may be called from several threads at once; they share the pool.
+    """
+    def __init__(self, workers, window=None):
+        self.workers = workers
+        # Jobs taken on but not yet handed back per run(), which bounds memory and the
+        # work still to finish when a run stops early
+        self.window = window or workers * 4
+        self._pool = ThreadPoolExecutor(workers, thread_name_prefix="bobnox-move")
+
+    def run(self, jobs):
+        """
+        Runs the (key, func) pairs of an iterable, which is consumed as results come in,
+        and yields func() of each in the order they finish. At most window jobs are
+        taken from the iterable ahead of the results handed back.
+        """
+        done = queue.Queue()
+        waiting = {}
+        lock = threading.Lock()
+
+        def finished(key, future):
+            with lock:
+                backlog = waiting[key]
+                follow = backlog.popleft() if backlog else None
+                if follow is None:
+                    del waiting[key]
+            if follow is not None:
+                submit(key, follow)
+            done.put(future)
+
+        def submit(key, func):
+            self._pool.submit(func).add_done_callback(lambda future: finished(key, future))
+
+        in_flight = 0
+        try:
+            for key, func in jobs:
+                while in_flight >= self.window:
+                    in_flight -= 1
+                    yield done.get().result()
+                with lock:
+                    backlog = waiting.get(key)
+                    if backlog is None:
+                        waiting[key] = deque()
+                    else:
+                        backlog.append(func)
+                if backlog is None:
+                    submit(key, func)
+                in_flight += 1
+                # Hand back whatever is finished without waiting for it
+                while in_flight:
+                    try:
+                        future = done.get_nowait()
+                    except queue.Empty:
+                        break
+                    in_flight -= 1
+                    yield future.result()
+            while in_flight:
+                in_flight -= 1
+                yield done.get().result()
+        finally:
+            # Stopped early: the jobs taken from the iterable are still carried out (their
+            # results are lost), so nothing is left half done when the caller cleans up
+            for _ in range(in_flight):
+                done.get()
+
+    def shutdown(self):
+        self._pool.shutdown(wait=True)
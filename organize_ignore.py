@@ -0,0 +1,205 @@
+"""
+.bobnoxignore files: gitignore-style patterns for files and folders boBnox leaves alone.
+"""
+import functools
+import hashlib
+import os
+import re
+import threading
+
+IGNORE_FILE = ".bobnoxignore"
+# Always in effect, as if at the top of the root's ignore file; '!' patterns there can
+# take them back
+DEFAULT_PATTERNS = ("bobnox-log-*.txt", IGNORE_FILE)
+
+
+def translate(pattern, base=""):
+    """
+    Translates one gitignore-style pattern line from the ignore file of the directory
+    base (relative to the root, '' for the root itself) into (regex, negate). The regex
+    matches paths relative to the root, with a trailing '/' for directories. Returns
+    None for blank lines and comments.
+
+    As in .gitignore: '!' negates, a trailing '/' matches directories only, a pattern
+    with any other '/' is relative to the ignore file's directory while one without
+    matches names at any depth below it, '*' and '?' do not match '/', and '**' matches
+    any number of directories.
+    """
+    pattern = pattern.rstrip("\n\r")
+    if pattern.endswith(" ") and not pattern.endswith("\\ "):
+        pattern = pattern.rstrip(" ")
+    if not pattern or pattern.startswith("#"):
+        return None
+    negate = pattern.startswith("!")
+    if negate or pattern.startswith("\\#") or pattern.startswith("\\!"):
+        pattern = pattern[1:]
+    dir_only = pattern.endswith("/")
+    pattern = pattern.rstrip("/")
+    if not pattern:
+        return None
+    anchored = "/" in pattern
+    segments = pattern.lstrip("/").split("/")
+    out = [re.escape(base + "/")] if base else []
+    if not anchored:
+        out.append("(?:.*/)?")
+    for i, segment in enumerate(segments):
+        last = i == len(segments) - 1
+        if segment == "**":
+            out.append(".*" if last else "(?:.*/)?")
+        else:
+            out.append(_translate_segment(segment) + ("" if last else "/"))
+    out.append("/" if dir_only else "/?")
+    return "".join(out) + "\\Z", negate
+
+
+def _translate_segment(segment):
+    """A glob for one path segment; like organize_rules.glob_to_regex, but stopping at '/'."""
+    out = []
+    i, n = 0, len(segment)
+    while i < n:
+        c = segment[i]
+        i += 1
+        if c == "*":
+            out.append("[^/]*")
+        elif c == "?":
+            out.append("[^/]")
+        elif c == "\\" and i < n:
+            out.append(re.escape(segment[i]))
+            i += 1
+        elif c == "[":
+            j = i + 1 if i < n and segment[i] in "!^" else i
+            j = segment.find("]", j + 1 if j < n and segment[j] == "]" else j)
+            if j < 0:
+                out.append("\\[")
+                continue
+            chars = segment[i:j].replace("\\", "\\\\")
+            i = j + 1
+            if chars[:1] in ("!", "^"):
+                chars = "^/" + chars[1:]
+            out.append(f"[{chars}]")
+        else:
+            out.append(re.escape(c))
+    return "".join(out)
+
+
+@functools.lru_cache(maxsize=4096)
+def _read_patterns(path, mtime_ns, size, base):
+    """The translated patterns of one ignore file; cached until the file changes."""
+    try:
+        with open(path, encoding="utf-8", errors="surrogateescape") as fh:
+            lines = fh.read().splitlines()
+    except OSError:
+        return ()
+    return tuple(filter(None, (translate(line, base) for line in lines)))
+
+
+@functools.lru_cache(maxsize=1024)
+def _compile(rules):
+    """
+    One regex for a tuple of (regex, negate) rules. The last matching rule decides, as
+    in .gitignore, so the alternatives are tried last rule first and m.lastindex tells
+    which one matched.
+    """
+    if not rules:
+        return None, ()
+    reversed_rules = rules[::-1]
+    regex = re.compile("|".join(f"({source})" for source, _ in reversed_rules), re.DOTALL)
+    return regex, tuple(negate for _, negate in reversed_rules)
+
+
+@functools.lru_cache(maxsize=1024)
+def _rules_key(rules):
+    """A short digest of a tuple of rules that stays the same from one run to the next."""
+    return hashlib.sha1(repr(rules).encode("utf-8", "surrogateescape")).hexdigest()[:16]
+
+
+class IgnoreMatcher:
+    """
+    All ignore rules in effect for the entries of one directory, as a single regex.
+    key identifies the rules across runs, so a ScanIndex can tell when they changed.
+    """
+    __slots__ = ("prefix", "key", "_match", "_negated")
+
+    def __init__(self, prefix, rules):
+        self.prefix = prefix
+        self.key = _rules_key(rules)
+        regex, self._negated = _compile(rules)
+        self._match = regex.match if regex is not None else None
+
+    def ignored(self, name, is_dir=False):
+        """True if the entry name of this directory is ignored."""
+        if self._match is None:
+            return False
+        m = self._match(f"{self.prefix}{name}/" if is_dir else f"{self.prefix}{name}")
+        return m is not None and not self._negated[m.lastindex - 1]
+
+
+class IgnoreRules:
+    """
+    The ignore rules of a tree: DEFAULT_PATTERNS plus the IGNORE_FILE of root and of
+    every directory below it, each applying to its own directory and everything beneath.
+
+    matcher(dirpath) gives the compiled rules for one directory. Directories without an
+    ignore file share their parent's compiled regex, and ignore files are only read and
+    compiled again when they change (for the life of the process), so a tree costs one
+    stat per directory. Safe to use from several threads.
+
+    Nothing is cached on disk: a compiled regex cannot be stored (a pickled pattern is
+    compiled again when loaded, see RuleSet.load), and reading and translating an
+    ignore file costs less than loading a cache entry for it would. Across runs it is
+    the ScanIndex that saves the work, by not listing unchanged directories at all.
+    """
+    def __init__(self, root, defaults=DEFAULT_PATTERNS):
+        self.root = os.path.abspath(root)
+        self._defaults = tuple(filter(None, (translate(pattern) for pattern in defaults)))
+        self._rules = {}
+        self._matchers = {}
+        self._lock = threading.Lock()
+
+    def matcher(self, dirpath):
+        """The IgnoreMatcher for the entries directly inside dirpath, a directory below root."""
+        dirpath = os.path.abspath(dirpath)
+        matcher = self._matchers.get(dirpath)
+        if matcher is None:
+            rel = os.path.relpath(dirpath, self.root).replace(os.sep, "/")
+            rel = "" if rel == "." else rel
+            matcher = IgnoreMatcher(f"{rel}/" if rel else "", self._rules_for(dirpath, rel))
+            with self._lock:
+                matcher = self._matchers.setdefault(dirpath, matcher)
+        return matcher
+
+    def skips_dir(self, path):
+        """True if the directory path is ignored, so its subtree need not be walked."""
+        parent, name = os.path.split(os.path.abspath(path))
+        return self.matcher(parent).ignored(name, is_dir=True)
+
+    def ignored(self, path, is_dir=False):
+        """True if path, below root, or any directory between it and root is ignored."""
+        path = os.path.abspath(path)
+        rel = os.path.relpath(path, self.root)
+        if rel == "." or rel == os.pardir or rel.startswith(os.pardir + os.sep):
+            return False
+        current = self.root
+        for part in rel.split(os.sep)[:-1]:
+            if self.matcher(current).ignored(part, is_dir=True):
+                return True
+            current = os.path.join(current, part)
+        return self.matcher(current).ignored(os.path.basename(path), is_dir)
+
+    def _rules_for(self, dirpath, rel):
+        rules = self._rules.get(dirpath)
+        if rules is not None:
+            return rules
+        if rel:
+            inherited = self._rules_for(os.path.dirname(dirpath), os.path.dirname(rel))
+        else:
+            inherited = self._defaults
+        try:
+            st = os.stat(os.path.join(dirpath, IGNORE_FILE))
+        except OSError:
+            rules = inherited
+        else:
+            rules = inherited + _read_patterns(os.path.join(dirpath, IGNORE_FILE), st.st_mtime_ns,
+                                               st.st_size, rel)
+        with self._lock:
+            return self._rules.setdefault(dirpath, rules)
@@ -0,0 +1,209 @@
+"""
+Persistent per-root scan index that lets repeated runs skip unchanged directories.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+
+from organize_spill import SpillingSorter
+
+
+def cache_dir():
+    """Directory for boBnox's persistent state, following the XDG base directory spec."""
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "bobnox")
+
+
+def cache_file(prefix, root, suffix=".json"):
+    """Path of a per-root state file, e.g. ~/.cache/bobnox/index-<hash>.json."""
+    key = hashlib.sha1(os.fsencode(os.path.realpath(root))).hexdigest()[:16]
+    return os.path.join(cache_dir(), f"{prefix}-{key}{suffix}")
+
+
+def still_at(key, path):
+    """
+    True when path still leads to the file of a '<st_dev>:<st_ino>' cache key, as used
+    by the per-file caches to drop entries of files that are gone.
+    """
+    try:
+        st = os.stat(path, follow_symlinks=False)
+    except (OSError, TypeError, ValueError):
+        return False
+    return f"{st.st_dev}:{st.st_ino}" == key
+
+
+class ScanIndex:
+    """
+    Remembers, for every directory below a root, its (st_ino, st_mtime_ns) after the last
+    run together with its subdirectories and the file names that were left in place.
+
+    Creating, renaming or deleting an entry always bumps the mtime of its directory, so a
+    directory whose inode and mtime are unchanged does not need to be listed again: its
+    cached subdirectories are walked directly. Changed directories are listed, but files
+    that were already there last time are skipped.
+
+    Filesystem timestamps are coarse, so a directory recorded within RACY_WINDOW_NS of
+    its last modification is always listed again on the next run.
+
+    Files left in place because .bobnoxignore rules ignored them count as seen, so each
+    directory's entry also records the key of those rules (IgnoreMatcher.key). When the
+    rules change, e.g. a pattern is removed from an ignore file further up, the entry
+    no longer applies and the directory is listed and looked at in full again.
+    """
+    VERSION = 1
+    RACY_WINDOW_NS = 2 * 10**9
+
+    def __init__(self, root, path=None):
+        self.root = os.path.abspath(root)
+        self.path = path or cache_file("index", self.root)
+        self._entries = {}
+        self._touched = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, root, path=None):
+        """Loads the index of root, starting empty if there is none or it is unreadable."""
+        index = cls(root, path)
+        try:
+            with open(index.path, encoding="utf-8") as fh:
+                data = json.load(fh)
+            if data.get("version") == cls.VERSION and data.get("root") == index.root:
+                index._entries = data["dirs"]
+        except (OSError, ValueError, KeyError):
+            pass
+        return index
+
+    def save(self, partial=False):
+        """
+        Atomically writes the index. Only directories reached during this run are kept,
+        so deleted subtrees drop out of the index on their own. After a partial run the
+        directories that were not reached keep their old entries.
+        """
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with self._lock:
+            dirs = dict(self._entries, **self._touched) if partial else self._touched
+            data = {"version": self.VERSION, "root": self.root, "dirs": dirs}
+            with open(tmp_path, "w", encoding="utf-8") as fh:
+                json.dump(data, fh, separators=(",", ":"))
+        os.replace(tmp_path, self.path)
+
+    def _key(self, dirpath):
+        return os.path.relpath(dirpath, self.root)
+
+    def unchanged_subdirs(self, dirpath, st, ignore_key=None):
+        """
+        Returns the cached subdirectory names of dirpath when it has not changed since the
+        last run (st is its current stat result) and neither have its ignore rules
+        (ignore_key), or None when it has to be listed.
+        """
+        key = self._key(dirpath)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry["mtime_ns"] is None or entry.get("ignore") != ignore_key:
+                return None
+            if entry["ino"] != st.st_ino or entry["mtime_ns"] != st.st_mtime_ns:
+                return None
+            self._touched[key] = entry
+            return list(entry["dirs"])
+
+    def seen_files(self, dirpath, ignore_key=None):
+        """
+        File names that were left in dirpath by the previous run, or none at all if the
+        directory's ignore rules have changed since.
+        """
+        with self._lock:
+            entry = self._entries.get(self._key(dirpath))
+            return set(entry["seen"]) if entry and entry.get("ignore") == ignore_key else set()
+
+    def record(self, dirpath, st, seen, dirs, clean=True, ignore_key=None):
+        """
+        Records the state of dirpath once it has been organized. st must be taken before
+        the final listing that produced seen and dirs, so that anything arriving later
+        changes the mtime. clean=False forces the directory to be listed again next time.
+        ignore_key is the IgnoreMatcher.key of the rules that applied.
+        """
+        mtime_ns = st.st_mtime_ns
+        if not clean or time.time_ns() - mtime_ns < self.RACY_WINDOW_NS:
+            mtime_ns = None
+        with self._lock:
+            self._touched[self._key(dirpath)] = {
+                "ino": st.st_ino, "mtime_ns": mtime_ns, "dirs": sorted(dirs), "seen": sorted(seen),
+                "ignore": ignore_key,
+            }
+
+
+class ResumeCursor:
+    """
+    Where a time-budgeted run stopped, so the next run continues instead of starting
+    over: the directories that still have to be scanned, the getdents64 position inside
+    a flat directory, and for planned runs the rest of the move plan as a run file.
+    A cursor only applies to runs with the same recursive/planned settings.
+
+    directory is the [st_dev, st_ino] of the directory the position belongs to; a
+    position is only saved on filesystems with stable offsets (see
+    organize_linux.stable_offsets()), so a resumed scan never skips files.
+    """
+    VERSION = 2
+
+    def __init__(self, root, recursive, planned):
+        self.root = os.path.abspath(root)
+        self.recursive = recursive
+        self.planned = planned
+        self.path = cache_file("resume", self.root)
+        self.plan_path = cache_file("resume-plan", self.root, ".run")
+        # The rest of the plan is written here while plan_path may still be read
+        self.next_plan_path = f"{self.plan_path}.new"
+        self.pending_dirs = None
+        self.position = 0
+        self.directory = None
+        self.plan_count = 0
+
+    @classmethod
+    def load(cls, root, recursive, planned):
+        """The saved cursor for root, or a blank one when there is none that fits."""
+        cursor = cls(root, recursive, planned)
+        try:
+            with open(cursor.path, encoding="utf-8") as fh:
+                data = json.load(fh)
+            if (data.get("version"), data.get("root"), data.get("recursive"), data.get("planned")) != (
+                    cls.VERSION, cursor.root, recursive, planned):
+                cursor.clear()
+                return cls(root, recursive, planned)
+            cursor.pending_dirs = data["pending_dirs"]
+            cursor.position = data["position"]
+            cursor.directory = data["directory"]
+            cursor.plan_count = data["plan_count"] if os.path.exists(cursor.plan_path) else 0
+        except (OSError, ValueError, KeyError):
+            pass
+        return cursor
+
+    def write_plan(self, records):
+        """Stores the sorted plan records that are left; save() makes them current."""
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self.plan_count = SpillingSorter.write_run(records, self.next_plan_path)
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        data = {
+            "version": self.VERSION, "root": self.root, "recursive": self.recursive,
+            "planned": self.planned, "pending_dirs": self.pending_dirs,
+            "position": self.position, "directory": self.directory, "plan_count": self.plan_count,
+        }
+        if self.plan_count:
+            os.replace(self.next_plan_path, self.plan_path)
+        elif os.path.exists(self.plan_path):
+            os.remove(self.plan_path)
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as fh:
+            json.dump(data, fh)
+        os.replace(tmp_path, self.path)
+
+    def clear(self):
+        for path in (self.path, self.plan_path, self.next_plan_path):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
@@ -0,0 +1,84 @@
+"""
+Keyword routing: sends files whose names contain a keyword ('Screenshot', 'Invoice',
+'IMG_') to that keyword's folder, matching all keywords in one pass per name.
+"""
+
+
+class KeywordRouter:
+    """
+    An Aho-Corasick automaton over a set of keywords, built once. Matching walks the
+    name a single time, whatever the number of keywords, instead of testing each
+    keyword with `in`.
+
+    When several keywords occur in a name, the one with the highest priority wins;
+    among equal priorities the longest keyword, then the one found first. Matching is
+    case-insensitive unless ignore_case is False.
+    """
+    def __init__(self, keywords, ignore_case=True):
+        """keywords is an iterable of (keyword, folder, priority) tuples."""
+        self.ignore_case = ignore_case
+        # Per state: transitions, failure link and the best keyword ending here,
+        # as (priority, length, folder) or None
+        self._goto = [{}]
+        self._fail = [0]
+        self._best = [None]
+        self.folders = set()
+        for keyword, folder, priority in keywords:
+            if not keyword:
+                raise ValueError("keywords must not be empty")
+            if ignore_case:
+                keyword = keyword.lower()
+            state = 0
+            for c in keyword:
+                nxt = self._goto[state].get(c)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._best.append(None)
+                    self._goto[state][c] = nxt
+                state = nxt
+            candidate = (priority, len(keyword), folder)
+            if self._best[state] is None or candidate[:2] > self._best[state][:2]:
+                self._best[state] = candidate
+            self.folders.add(folder)
+        self._alphabet = frozenset(c for transitions in self._goto for c in transitions)
+        self._link()
+
+    def _link(self):
+        """Computes failure links breadth first and folds each state's outputs in."""
+        queue = list(self._goto[0].values())
+        for state in queue:
+            for c, nxt in self._goto[state].items():
+                fail = self._fail[state]
+                while fail and c not in self._goto[fail]:
+                    fail = self._fail[fail]
+                target = self._goto[fail].get(c, 0)
+                self._fail[nxt] = target if target != nxt else 0
+                # Keywords ending at the failure state end here as well
+                inherited = self._best[self._fail[nxt]]
+                if inherited is not None and (self._best[nxt] is None
+                                              or inherited[:2] > self._best[nxt][:2]):
+                    self._best[nxt] = inherited
+                queue.append(nxt)
+
+    def match(self, name):
+        """The folder of the best keyword contained in name, or None."""
+        goto, fail, best_at, alphabet = self._goto, self._fail, self._best, self._alphabet
+        if self.ignore_case:
+            name = name.lower()
+        state = 0
+        best = None
+        for c in name:
+            if c not in alphabet:
+                # No keyword contains c, so every partial match ends here
+                state = 0
+                continue
+            while state and c not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(c, 0)
+            found = best_at[state]
+            # Strictly better only, so the first of equal keywords is kept
+            if found is not None and (best is None or found[:2] > best[:2]):
+                best = found
+        return best[2] if best is not None else None
@@ -0,0 +1,322 @@
+"""
+Linux-specific fast paths, called through ctypes. Every feature here has a portable
+fallback in the callers, so nothing breaks on other platforms.
+"""
+import ctypes
+import ctypes.util
+import errno
+import os
+import platform
+import re
+import stat
+import struct
+import sys
+from array import array
+
+# d_type values from <dirent.h>
+DT_UNKNOWN = 0
+DT_DIR = 4
+DT_REG = 8
+DT_LNK = 10
+
+# getdents64 syscall numbers, for C libraries older than glibc 2.30 without a wrapper
+_SYS_GETDENTS64 = {
+    "x86_64": 217, "aarch64": 61, "riscv64": 61, "i386": 220, "i686": 220,
+    "armv7l": 217, "ppc64le": 202, "s390x": 220,
+}
+
+# renameat2 syscall numbers, for C libraries older than glibc 2.28 without a wrapper
+_SYS_RENAMEAT2 = {
+    "x86_64": 316, "aarch64": 276, "riscv64": 276, "i386": 353, "i686": 353,
+    "armv7l": 382, "ppc64le": 357, "s390x": 347,
+}
+AT_FDCWD = -100
+RENAME_NOREPLACE = 1
+
+# Filesystems whose d_off cookies name an entry (a name hash or a per-entry index)
+# instead of counting entries, so that a position saved before files were moved out of
+# the directory still leads back to the same place. On others (tmpfs before Linux 6.6,
+# many FUSE and network filesystems) it would skip as many entries as were removed.
+STABLE_OFFSET_FILESYSTEMS = {"ext2", "ext3", "ext4", "xfs", "btrfs", "f2fs", "zfs"}
+
+_DIRENT_HEADER = struct.Struct("<QqHB")
+
+_libc = None
+
+
+def load_libc():
+    """The C library, loaded once with errno support."""
+    global _libc
+    if _libc is None:
+        _libc = ctypes.CDLL(ctypes.util.find_library("c") or None, use_errno=True)
+    return _libc
+
+
+def _raise_errno(*args):
+    err = ctypes.get_errno()
+    raise OSError(err, os.strerror(err), *args)
+
+
+_getdents64 = None
+
+
+def _load_getdents64():
+    global _getdents64
+    if _getdents64 is None:
+        libc = load_libc()
+        if hasattr(libc, "getdents64"):
+            func = libc.getdents64
+            func.argtypes = [ctypes.c_int, ctypes.c_void_p, ctypes.c_size_t]
+            func.restype = ctypes.c_ssize_t
+            _getdents64 = func
+        else:
+            number = _SYS_GETDENTS64[platform.machine()]
+            syscall = libc.syscall
+            syscall.restype = ctypes.c_long
+
+            def _getdents64(fd, buf, size):
+                return syscall(ctypes.c_long(number), ctypes.c_int(fd), buf, ctypes.c_size_t(size))
+    return _getdents64
+
+
+def getdents_available():
+    """True when the getdents64 fast path can be used on this machine."""
+    if not sys.platform.startswith("linux"):
+        return False
+    try:
+        _load_getdents64()
+        return True
+    except (OSError, KeyError, AttributeError):
+        return False
+
+
+_renameat2 = None
+# Set once renameat2 turned out to be unavailable, e.g. on kernels older than 3.15
+_renameat2_missing = False
+
+
+def _load_renameat2():
+    global _renameat2
+    if _renameat2 is None:
+        libc = load_libc()
+        if hasattr(libc, "renameat2"):
+            func = libc.renameat2
+            func.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_int, ctypes.c_char_p, ctypes.c_uint]
+            func.restype = ctypes.c_int
+            _renameat2 = func
+        else:
+            number = _SYS_RENAMEAT2[platform.machine()]
+            syscall = libc.syscall
+            syscall.restype = ctypes.c_long
+
+            def _renameat2(olddirfd, oldpath, newdirfd, newpath, flags):
+                return syscall(ctypes.c_long(number), ctypes.c_int(olddirfd), ctypes.c_char_p(oldpath),
+                               ctypes.c_int(newdirfd), ctypes.c_char_p(newpath), ctypes.c_uint(flags))
+    return _renameat2
+
+
+def renameat2_available():
+    """True when rename_noreplace() may work on this machine; it can still fail per filesystem."""
+    if not sys.platform.startswith("linux") or _renameat2_missing:
+        return False
+    try:
+        _load_renameat2()
+        return True
+    except (OSError, KeyError, AttributeError):
+        return False
+
+
+def rename_noreplace(source_path, destination_path, src_dir_fd=None, dst_dir_fd=None):
+    """
+    Renames source_path to destination_path in one renameat2(RENAME_NOREPLACE) call,
+    which fails with FileExistsError instead of replacing a destination that exists,
+    atomically. Returns False without doing anything when the kernel or the
+    filesystem does not support the flag (e.g. older NFS and many FUSE filesystems);
+    the caller then has to rename some other way. Other errors raise OSError.
+    Relative paths are resolved against src_dir_fd and dst_dir_fd, as with os.rename.
+    """
+    global _renameat2_missing
+    if _renameat2 is None:
+        if _renameat2_missing or not renameat2_available():
+            _renameat2_missing = True
+            return False
+    if _renameat2(AT_FDCWD if src_dir_fd is None else src_dir_fd, os.fsencode(source_path),
+                  AT_FDCWD if dst_dir_fd is None else dst_dir_fd, os.fsencode(destination_path),
+                  RENAME_NOREPLACE) == 0:
+        return True
+    err = ctypes.get_errno()
+    if err == errno.ENOSYS:
+        _renameat2_missing = True
+        return False
+    if err in (errno.EINVAL, errno.EOPNOTSUPP):
+        return False
+    raise OSError(err, os.strerror(err), source_path, None, destination_path)
+
+
+class DirentBatch:
+    """
+    The entries returned by one getdents64 call, kept in compact form: the raw record
+    buffer plus parallel arrays of name offsets, name lengths, d_type, inode numbers and
+    d_off cookies. Names are only decoded when asked for, so directories and skipped
+    entries never cost a Python string.
+
+    The d_off of an entry is the directory position right after it; seeking there
+    resumes the enumeration behind that entry.
+    """
+    __slots__ = ("data", "offsets", "lengths", "types", "inodes", "positions")
+
+    def __init__(self, data):
+        self.data = data
+        self.offsets = array("I")
+        self.lengths = array("H")
+        self.types = bytearray()
+        self.inodes = array("Q")
+        self.positions = array("q")
+
+    def __len__(self):
+        return len(self.types)
+
+    def name(self, i):
+        """Decoded name of entry i."""
+        start = self.offsets[i]
+        return os.fsdecode(self.data[start:start + self.lengths[i]])
+
+    def __iter__(self):
+        """Yields (name, d_type, inode) tuples."""
+        for i in range(len(self.types)):
+            yield self.name(i), self.types[i], self.inodes[i]
+
+
+def iter_dirent_batches(directory_path, buffer_size=1 << 20, position=0):
+    """
+    Enumerates a directory with getdents64 and buffers of buffer_size bytes (1 MiB by
+    default, versus the 32 KiB glibc uses for readdir), yielding one DirentBatch per
+    system call. '.' and '..' are left out. position is a d_off cookie from an earlier
+    enumeration to continue from.
+    """
+    getdents64 = _load_getdents64()
+    buf = ctypes.create_string_buffer(buffer_size)
+    fd = os.open(directory_path, os.O_RDONLY | os.O_DIRECTORY | os.O_CLOEXEC)
+    try:
+        if position:
+            os.lseek(fd, position, os.SEEK_SET)
+        while True:
+            nread = getdents64(fd, buf, buffer_size)
+            if nread < 0:
+                _raise_errno(directory_path)
+            if nread == 0:
+                return
+            yield _parse_dirents(buf.raw[:nread])
+    finally:
+        os.close(fd)
+
+
+def _parse_dirents(data):
+    """
+    Splits a buffer of struct linux_dirent64 records:
+    u64 d_ino, s64 d_off, u16 d_reclen, u8 d_type, char d_name[] (NUL terminated).
+    """
+    batch = DirentBatch(data)
+    offsets, lengths, types, inodes = batch.offsets, batch.lengths, batch.types, batch.inodes
+    positions = batch.positions
+    unpack_from = _DIRENT_HEADER.unpack_from
+    find = data.find
+    pos, end = 0, len(data)
+    while pos < end:
+        ino, d_off, reclen, d_type = unpack_from(data, pos)
+        start = pos + 19
+        length = find(b"\0", start, pos + reclen) - start
+        # Skip '.' and '..'
+        if length > 2 or data[start] != 0x2E or (length == 2 and data[start + 1] != 0x2E):
+            offsets.append(start)
+            lengths.append(length)
+            types.append(d_type)
+            inodes.append(ino)
+            positions.append(d_off)
+        pos += reclen
+    return batch
+
+
+class DentEntry:
+    """
+    os.DirEntry look-alike built from a getdents64 record, so batches can flow through
+    the same organizer pipeline as os.scandir results. d_type answers is_file() without
+    a stat; only DT_UNKNOWN and symlinks fall back to one. position is the entry's d_off.
+    """
+    __slots__ = ("name", "path", "position", "_d_type", "_ino", "_stat")
+
+    def __init__(self, name, path, d_type, ino, position=0):
+        self.name = name
+        self.path = path
+        self.position = position
+        self._d_type = d_type
+        self._ino = ino
+        self._stat = None
+
+    def inode(self):
+        return self._ino
+
+    def stat(self, follow_symlinks=True):
+        if self._stat is None:
+            self._stat = os.stat(self.path)
+        return self._stat
+
+    def is_file(self, follow_symlinks=True):
+        if self._d_type == DT_REG:
+            return True
+        if self._d_type in (DT_UNKNOWN, DT_LNK):
+            try:
+                return stat.S_ISREG(self.stat().st_mode)
+            except OSError:
+                return False
+        return False
+
+
+def filesystem_type(path):
+    """
+    Type of the filesystem holding path according to /proc/self/mountinfo (e.g. 'ext4'
+    or 'fuse.sshfs'), or None when it cannot be determined.
+    """
+    path = os.path.realpath(path)
+    best, best_type = "", None
+    try:
+        with open("/proc/self/mountinfo", encoding="utf-8", errors="replace") as fh:
+            for line in fh:
+                fields = line.split()
+                sep = fields.index("-")
+                # Mount points escape blanks as octal sequences
+                mount_point = re.sub(r"\\([0-7]{3})", lambda m: chr(int(m.group(1), 8)), fields[4])
+                fs_type = fields[sep + 1]
+                inside = path == mount_point or path.startswith(mount_point.rstrip("/") + "/")
+                if inside and len(mount_point) >= len(best):
+                    best, best_type = mount_point, fs_type
+    except (OSError, ValueError, IndexError):
+        return None
+    return best_type
+
+
+def stable_offsets(directory_path):
+    """
+    True when a getdents64 position in directory_path may be used again after entries
+    were removed from it, as far as its filesystem type tells.
+    """
+    return filesystem_type(directory_path) in STABLE_OFFSET_FILESYSTEMS
+
+
+def scan_files(directory_path, buffer_size=1 << 20, position=0):
+    """
+    Yields a DentEntry for every regular file in directory_path, batch by batch,
+    optionally continuing from a d_off position.
+    """
+    prefix = os.path.join(directory_path, "")
+    encoding, errors = sys.getfilesystemencoding(), sys.getfilesystemencodeerrors()
+    for batch in iter_dirent_batches(directory_path, buffer_size, position):
+        data, offsets, lengths, inodes = batch.data, batch.offsets, batch.lengths, batch.inodes
+        positions = batch.positions
+        for i, d_type in enumerate(batch.types):
+            if d_type == DT_REG or d_type == DT_UNKNOWN or d_type == DT_LNK:
+                start = offsets[i]
+                name = data[start:start + lengths[i]].decode(encoding, errors)
+                entry = DentEntry(name, prefix + name, d_type, inodes[i], positions[i])
+                if d_type == DT_REG or entry.is_file():
+                    yield entry
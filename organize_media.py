@@ -0,0 +1,439 @@
+"""
+Media metadata: capture dates, artists and albums read from EXIF, ID3 and MP4 headers.
+"""
+import json
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from organize_index import cache_dir, still_at
+
+# Extension -> header format
+FORMATS = {
+    ".jpg": "jpeg", ".jpeg": "jpeg", ".jpe": "jpeg",
+    ".tif": "tiff", ".tiff": "tiff", ".dng": "tiff", ".nef": "tiff", ".cr2": "tiff", ".arw": "tiff",
+    ".mp3": "id3",
+    ".mp4": "mp4", ".m4v": "mp4", ".m4a": "mp4", ".mov": "mp4", ".3gp": "mp4",
+}
+
+# TIFF structures referenced from IFD0 are usually within the first few KiB; raw
+# formats put the image data after them
+TIFF_READ_SIZE = 64 * 1024
+# Seconds from 1904-01-01, the MP4 epoch, to 1970-01-01
+MP4_EPOCH_OFFSET = 2082844800
+# Seconds from 1970-01-01 to 9999-12-31; later mvhd times are corrupt
+MAX_UNIX_SECONDS = 253402214400
+
+
+def media_format(extension):
+    """The header format of files with this extension ('.JPG' -> 'jpeg'), or None."""
+    return FORMATS.get(extension.lower())
+
+
+def read_metadata(path, fmt):
+    """
+    Reads the metadata of one file of the given format. Returns a dict with any of
+    'date' ([year] up to [year, month, day]), 'artist' and 'album'; empty when the file
+    has none or cannot be parsed. Only the header structures are read, never the media.
+    """
+    try:
+        with open(path, "rb") as fh:
+            return _READERS[fmt](fh) or {}
+    except (OSError, ValueError, IndexError, KeyError, OverflowError):
+        return {}
+
+
+def _parse_date(text):
+    """[year, month, day] from the leading digits of '2026:10:17 12:00:00', '2026-10' or '2026'."""
+    parts = []
+    for start, end in ((0, 4), (5, 7), (8, 10)):
+        field = text[start:end]
+        if len(field) != end - start or not field.isdigit() or (start and text[start - 1] not in ":-"):
+            break
+        parts.append(int(field))
+    # Cameras without a clock write zeros
+    if not parts or parts[0] == 0 or (len(parts) > 1 and not 1 <= parts[1] <= 12) or \
+            (len(parts) > 2 and not 1 <= parts[2] <= 31):
+        return None
+    return parts
+
+
+# --- EXIF (JPEG, TIFF and TIFF-based raw formats) ---
+
+def _read_jpeg(fh):
+    """Walks the JPEG segments up to the Exif APP1 segment; image data is never read."""
+    if fh.read(2) != b"\xff\xd8":
+        return None
+    while True:
+        header = fh.read(4)
+        if len(header) < 4 or header[0] != 0xFF:
+            return None
+        marker, length = header[1], int.from_bytes(header[2:4], "big")
+        if marker in (0xDA, 0xD9) or length < 2:
+            # Start of scan or end of image: the metadata segments are behind us
+            return None
+        if marker == 0xE1:
+            data = fh.read(length - 2)
+            if data.startswith(b"Exif\0\0"):
+                return _parse_tiff(data[6:])
+        else:
+            fh.seek(length - 2, os.SEEK_CUR)
+
+
+def _read_tiff(fh):
+    return _parse_tiff(fh.read(TIFF_READ_SIZE))
+
+
+def _parse_tiff(data):
+    order = {b"II": "little", b"MM": "big"}.get(data[:2])
+    if order is None:
+        return None
+    ifd0 = _ifd_entries(data, int.from_bytes(data[4:8], order), order)
+    date = None
+    exif = ifd0.get(0x8769)
+    if exif is not None:
+        # DateTimeOriginal, then DateTimeDigitized
+        sub = _ifd_entries(data, int.from_bytes(exif[2], order), order)
+        date = _ifd_date(data, sub.get(0x9003), order) or _ifd_date(data, sub.get(0x9004), order)
+    # DateTime of IFD0 is the last modification, which most cameras set at capture
+    date = date or _ifd_date(data, ifd0.get(0x0132), order)
+    return {"date": date} if date else None
+
+
+def _ifd_entries(data, offset, order):
+    """{tag: (type, count, raw value/offset)} of the IFD at offset."""
+    entries = {}
+    if not 8 <= offset <= len(data) - 2:
+        return entries
+    count = int.from_bytes(data[offset:offset + 2], order)
+    for pos in range(offset + 2, min(offset + 2 + 12 * count, len(data) - 11), 12):
+        tag = int.from_bytes(data[pos:pos + 2], order)
+        entries[tag] = (int.from_bytes(data[pos + 2:pos + 4], order),
+                        int.from_bytes(data[pos + 4:pos + 8], order), data[pos + 8:pos + 12])
+    return entries
+
+
+def _ifd_date(data, entry, order):
+    if entry is None or entry[0] != 2:
+        return None
+    _, count, raw = entry
+    if count <= 4:
+        value = raw[:count]
+    else:
+        start = int.from_bytes(raw, order)
+        value = data[start:start + count]
+    return _parse_date(value.split(b"\0", 1)[0].decode("ascii", "replace"))
+
+
+# --- ID3 (MP3) ---
+
+# Frame ID -> field, for ID3v2.3/2.4 and the three-letter IDs of ID3v2.2
+ID3_FRAMES = {
+    b"TPE1": "artist", b"TALB": "album", b"TDRC": "date", b"TYER": "date", b"TORY": "date",
+    b"TP1": "artist", b"TAL": "album", b"TYE": "date",
+}
+ID3_ENCODINGS = ("latin-1", "utf-16", "utf-16-be", "utf-8")
+
+
+def _read_id3(fh):
+    """Reads the text frames of an ID3v2 tag, skipping cover art and the like; ID3v1 as a fallback."""
+    header = fh.read(10)
+    if len(header) < 10 or header[:3] != b"ID3":
+        return _read_id3v1(fh)
+    major, flags = header[3], header[5]
+    end = 10 + _syncsafe(header[6:10])
+    pos = 10
+    if flags & 0x40 and major >= 3:
+        # Extended header; its size excludes itself in v2.3 and includes itself in v2.4
+        size = fh.read(4)
+        pos += _syncsafe(size) if major == 4 else 4 + int.from_bytes(size, "big")
+    id_size, header_size = (3, 6) if major == 2 else (4, 10)
+    found = {}
+    while pos + header_size <= end and len(found) < 3:
+        fh.seek(pos)
+        frame = fh.read(header_size)
+        if len(frame) < header_size or frame[0] == 0:
+            # Padding
+            break
+        raw_size = frame[id_size:id_size + (3 if major == 2 else 4)]
+        size = _syncsafe(raw_size) if major == 4 else int.from_bytes(raw_size, "big")
+        field = ID3_FRAMES.get(frame[:id_size])
+        if field is not None and field not in found and 0 < size <= 4096:
+            text = _id3_text(fh.read(size))
+            value = _parse_date(text) if field == "date" else text
+            if value:
+                found[field] = value
+        pos += header_size + size
+    return found or _read_id3v1(fh)
+
+
+def _read_id3v1(fh):
+    fh.seek(0, os.SEEK_END)
+    if fh.tell() < 128:
+        return None
+    fh.seek(-128, os.SEEK_END)
+    tag = fh.read(128)
+    if tag[:3] != b"TAG":
+        return None
+    found = {}
+    for field, start, end in (("artist", 33, 63), ("album", 63, 93)):
+        value = tag[start:end].split(b"\0", 1)[0].decode("latin-1").strip()
+        if value:
+            found[field] = value
+    date = _parse_date(tag[93:97].decode("latin-1"))
+    if date:
+        found["date"] = date
+    return found
+
+
+def _syncsafe(data):
+    return (data[0] << 21) | (data[1] << 14) | (data[2] << 7) | data[3]
+
+
+def _id3_text(body):
+    if not body or body[0] >= len(ID3_ENCODINGS):
+        return ""
+    text = body[1:].decode(ID3_ENCODINGS[body[0]], "replace")
+    # Multiple values are NUL-separated; the first one is enough for a folder name
+    return text.split("\0", 1)[0].strip()
+
+
+# --- MP4 / QuickTime atoms ---
+
+MP4_TAGS = {b"\xa9ART": "artist", b"aART": "artist", b"\xa9alb": "album", b"\xa9day": "date"}
+
+
+def _read_mp4(fh):
+    """Seeks from atom header to atom header to moov; mdat is skipped however large it is."""
+    end = os.fstat(fh.fileno()).st_size
+    for kind, start, stop in _atoms(fh, 0, end):
+        if kind == b"moov":
+            return _read_moov(fh, start, stop)
+    return None
+
+
+def _atoms(fh, start, end):
+    """Yields (type, body start, body end) of the atoms between start and end."""
+    pos = start
+    while pos + 8 <= end:
+        fh.seek(pos)
+        header = fh.read(8)
+        if len(header) < 8:
+            return
+        size, kind, body = int.from_bytes(header[:4], "big"), header[4:], pos + 8
+        if size == 1:
+            size, body = int.from_bytes(fh.read(8), "big"), pos + 16
+        elif size == 0:
+            size = end - pos
+        if size < body - pos:
+            return
+        yield kind, body, min(pos + size, end)
+        pos += size
+
+
+def _read_moov(fh, start, stop):
+    found = {}
+    for kind, body, end in _atoms(fh, start, stop):
+        if kind == b"mvhd":
+            fh.seek(body)
+            header = fh.read(12)
+            seconds = int.from_bytes(header[4:12] if header[:1] == b"\x01" else header[4:8], "big")
+            if MP4_EPOCH_OFFSET < seconds <= MP4_EPOCH_OFFSET + MAX_UNIX_SECONDS:
+                found.setdefault("date", list(time.localtime(seconds - MP4_EPOCH_OFFSET)[:3]))
+        elif kind == b"udta":
+            tags = _read_udta(fh, body, end)
+            if "date" in tags:
+                # ©day is the recording date; mvhd only says when the file was written
+                found["date"] = tags.pop("date")
+            found.update(tags)
+    return found
+
+
+def _read_udta(fh, start, stop):
+    found = {}
+    for kind, body, end in _atoms(fh, start, stop):
+        if kind != b"meta":
+            continue
+        fh.seek(body + 4)
+        # An ISO meta atom is a full box with 4 bytes of version and flags; QuickTime's is not
+        if fh.read(4) != b"hdlr":
+            body += 4
+        for ilst, ilst_body, ilst_end in _atoms(fh, body, end):
+            if ilst != b"ilst":
+                continue
+            for tag, tag_body, tag_end in _atoms(fh, ilst_body, ilst_end):
+                field = MP4_TAGS.get(tag)
+                if field is None or field in found:
+                    continue
+                for data, data_body, data_end in _atoms(fh, tag_body, tag_end):
+                    if data == b"data" and data_end - data_body <= 4096 + 8:
+                        fh.seek(data_body + 8)
+                        text = fh.read(data_end - data_body - 8).decode("utf-8", "replace").strip("\0 ")
+                        value = _parse_date(text) if field == "date" else text
+                        if value:
+                            found[field] = value
+                        break
+    return found
+
+
+_READERS = {"jpeg": _read_jpeg, "tiff": _read_tiff, "id3": _read_id3, "mp4": _read_mp4}
+
+
+class MediaReader:
+    """
+    Reads media metadata for a stream of files. Cached results are looked up in this
+    process; only files that are new or changed are parsed, in batches spread over a
+    process pool so that parsing runs on all cores.
+
+    The cache is keyed by (st_dev, st_ino, st_size, st_mtime_ns) and lives in the boBnox
+    cache directory. Files modified within RACY_WINDOW_NS may still be written to and
+    are not cached. As with ContentSniffer, each entry keeps the path the file was read
+    at, and save() drops the entries this run did not use whose file is gone from it.
+    """
+    VERSION = 2
+    RACY_WINDOW_NS = 2 * 10**9
+    # Batches with fewer files to parse than this are parsed in this process
+    POOL_THRESHOLD = 32
+
+    def __init__(self, path=None, workers=None, batch_size=512):
+        self.path = path or os.path.join(cache_dir(), "media.json")
+        self.workers = workers or os.cpu_count() or 1
+        self.batch_size = batch_size
+        self._cache = {}
+        # Keys looked up or added during this run
+        self._used = set()
+        self._dirty = False
+        self._lock = threading.Lock()
+        self._pool = None
+
+    @classmethod
+    def load(cls, path=None, **kwargs):
+        reader = cls(path, **kwargs)
+        try:
+            with open(reader.path, encoding="utf-8") as fh:
+                data = json.load(fh)
+            if data.get("version") == cls.VERSION:
+                reader._cache = data["files"]
+        except (OSError, ValueError, KeyError):
+            pass
+        return reader
+
+    def save(self):
+        """
+        Prunes the cache, atomically writes it if anything changed, and stops the process
+        pool.
+        """
+        self.prune()
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+        if not self._dirty:
+            return
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with self._lock:
+            data = {"version": self.VERSION, "files": self._cache}
+            with open(tmp_path, "w", encoding="utf-8") as fh:
+                json.dump(data, fh, separators=(",", ":"))
+            self._dirty = False
+        os.replace(tmp_path, self.path)
+
+    def prune(self):
+        """Drops the entries not used in this run whose file is gone from its path."""
+        unused = [key for key in list(self._cache) if key not in self._used]
+        if not unused:
+            return
+        if self.workers > 1 and len(unused) > 1:
+            # Stats wait on the filesystem, so threads will do
+            with ThreadPoolExecutor(self.workers, thread_name_prefix="bobnox-media") as pool:
+                alive = list(pool.map(self._alive, unused))
+        else:
+            alive = map(self._alive, unused)
+        gone = [key for key, found in zip(unused, alive) if not found]
+        if gone:
+            with self._lock:
+                for key in gone:
+                    del self._cache[key]
+                self._dirty = True
+
+    def _alive(self, key):
+        entry = self._cache[key]
+        return len(entry) > 3 and still_at(key, entry[3])
+
+    def read_entries(self, items, locate):
+        """
+        Yields (item, metadata) for a stream of items, in order. locate(item) returns the
+        (DirEntry-like object, format) to read for an item, or None to skip it; skipped
+        items get None.
+        """
+        batch = []
+        for item in items:
+            batch.append(item)
+            if len(batch) >= self.batch_size:
+                yield from self._read_batch(batch, locate)
+                batch = []
+        if batch:
+            yield from self._read_batch(batch, locate)
+
+    def read(self, entry, fmt):
+        """The metadata of one DirEntry-like object, read in this process."""
+        key, st, metadata = self._lookup(entry)
+        if metadata is None:
+            metadata = read_metadata(entry.path, fmt)
+            self._store(key, st, metadata, entry.path)
+        return metadata
+
+    def _lookup(self, entry):
+        """(cache key, stat result, cached metadata or None); (None, None, {}) if the stat fails."""
+        try:
+            st = entry.stat()
+        except OSError:
+            return None, None, {}
+        key = f"{st.st_dev}:{st.st_ino}"
+        self._used.add(key)
+        cached = self._cache.get(key)
+        if cached is not None and cached[0] == st.st_size and cached[1] == st.st_mtime_ns:
+            if cached[3:] != [entry.path]:
+                # Renamed or moved since: remember where it is now, for prune()
+                with self._lock:
+                    self._cache[key] = cached[:3] + [entry.path]
+                    self._dirty = True
+            return key, st, cached[2]
+        return key, st, None
+
+    def _store(self, key, st, metadata, path):
+        if key is not None and time.time_ns() - st.st_mtime_ns > self.RACY_WINDOW_NS:
+            with self._lock:
+                self._cache[key] = [st.st_size, st.st_mtime_ns, metadata, path]
+                self._dirty = True
+
+    def _read_batch(self, batch, locate):
+        found, todo = {}, []
+        for item in batch:
+            located = locate(item)
+            if located is None:
+                continue
+            entry, fmt = located
+            key, st, metadata = self._lookup(entry)
+            if metadata is not None:
+                found[id(item)] = metadata
+            else:
+                todo.append((item, entry, fmt, key, st))
+        if len(todo) < self.POOL_THRESHOLD or self.workers <= 1:
+            results = (read_metadata(entry.path, fmt) for _, entry, fmt, _, _ in todo)
+        else:
+            if self._pool is None:
+                with self._lock:
+                    if self._pool is None:
+                        # spawn rather than fork: the walker's threads may hold locks
+                        self._pool = ProcessPoolExecutor(self.workers,
+                                                         mp_context=multiprocessing.get_context("spawn"))
+            results = self._pool.map(read_metadata, [entry.path for _, entry, _, _, _ in todo],
+                                     [fmt for _, _, fmt, _, _ in todo],
+                                     chunksize=max(len(todo) // self.workers, 1))
+        for (item, entry, _, key, st), metadata in zip(todo, results):
+            self._store(key, st, metadata, entry.path)
+            found[id(item)] = metadata
+        return ((item, found.get(id(item))) for item in batch)
@@ -0,0 +1,85 @@
+"""
+Hot reloading of the routing rules of a long-running organizer (watch mode).
+"""
+import os
+import threading
+
+from organize_rules import RuleSet
+
+
+class RulesReloader:
+    """
+    Keeps a FileOrganizer's rules in step with a rules file. A background thread checks
+    the file's inode, size and mtime every interval seconds; reload() (safe to call from
+    a signal handler, e.g. on SIGHUP) asks for a reload right away.
+
+    The new RuleSet is compiled (or loaded from the rules cache, see RuleSet.load) on the
+    reloader's own thread and then handed to FileOrganizer.set_rules(), a single swap, so
+    moves keep going meanwhile and every file is classified by one rules version. A
+    config that fails to load or has an invalid pattern leaves the current rules in
+    effect, whatever the error.
+
+    on_reload(version, path) and on_error(error, path) are called from the reloader's thread.
+    """
+    def __init__(self, organizer, path, version="", interval=1.0, on_reload=None, on_error=None):
+        self.organizer = organizer
+        self.path = path
+        self.version = version
+        self.interval = interval
+        self.on_reload = on_reload
+        self.on_error = on_error
+        self._signature = self._stat()
+        self._wake = threading.Event()
+        self._requested = False
+        self._stopped = False
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="bobnox-rules-reloader", daemon=True)
+        self._thread.start()
+        return self
+
+    def reload(self):
+        """Reloads the rules file on the reloader's thread as soon as possible."""
+        self._requested = True
+        self._wake.set()
+
+    def stop(self):
+        self._stopped = True
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _stat(self):
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return st.st_ino, st.st_size, st.st_mtime_ns
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            if self._stopped:
+                return
+            signature = self._stat()
+            if not self._requested and (signature is None or signature == self._signature):
+                # Unchanged, or gone for the moment while an editor replaces it
+                continue
+            self._requested = False
+            self._signature = signature
+            try:
+                # Checks every pattern, so rules that would fail while matching never
+                # get swapped in
+                rules = RuleSet.load(self.path, version=self.version)
+            except Exception as e:
+                # Whatever is wrong with the new config, the thread has to survive it,
+                # or reloading would stop for the rest of the session
+                if self.on_error is not None:
+                    self.on_error(e, self.path)
+                continue
+            version = self.organizer.set_rules(rules)
+            if self.on_reload is not None:
+                self.on_reload(version, self.path)
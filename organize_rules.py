@@ -0,0 +1,571 @@
+"""
+User-defined routing rules, loaded from a JSON config file and compiled for fast matching.
+
+    {
+      "rules": [
+        {"folder": "Invoices", "glob": "invoice*.pdf", "ignore_case": true},
+        {"folder": "Large Videos", "extension": [".mp4", ".mkv"], "min_size": "1G"},
+        {"folder": "Old Downloads", "older_than": "180d"}
+      ],
+      "keywords": [
+        {"keyword": "Screenshot", "folder": "Screenshots"},
+        {"keyword": "Invoice", "folder": "Invoices", "priority": 10}
+      ]
+    }
+
+A rule sends matching files to its folder. Conditions: extension (one or a list;
+compound extensions such as .tar.gz work), glob or regex on the file name (regexes
+are searched, globs must match the whole name; ignore_case applies to both and
+takes the place of an inline '(?i)', which regexes cannot start with here),
+min_size/max_size (bytes or e.g. '10M') and older_than/newer_than (seconds or e.g.
+'30d', by modification time). All conditions of a rule have to hold. The first rule
+in file order that matches wins unless rules carry a "priority" (higher wins first).
+
+Files no rule matches are routed by keywords contained anywhere in their name (see
+KeywordRouter; "keywords" may also be a plain {"keyword": "folder"} object, and
+"keywords_ignore_case": false makes them case-sensitive).
+
+RuleSet.load() caches the compiled tables on disk; see there.
+"""
+import hashlib
+import json
+import os
+import pickle
+import re
+import time
+
+from organize_classify import SuffixClassifier
+from organize_index import cache_dir
+from organize_keywords import KeywordRouter
+
+# Bumped whenever the layout of the compiled classes changes, so old pickles are ignored
+CACHE_FORMAT = 3
+# Compiled configs kept in the cache directory
+CACHE_ENTRIES = 8
+
+_SIZE_UNITS = {"K": 1 << 10, "M": 1 << 20, "G": 1 << 30, "T": 1 << 40}
+_DURATION_UNITS = {"S": 1, "M": 60, "H": 3600, "D": 86400, "W": 7 * 86400}
+
+
+def parse_size(text):
+    """Parses sizes like 4096, '64K', '4M' or '1G' into bytes."""
+    if isinstance(text, int):
+        return text
+    text = str(text).strip().upper().rstrip("B")
+    if text and text[-1] in _SIZE_UNITS:
+        return int(float(text[:-1]) * _SIZE_UNITS[text[-1]])
+    return int(text)
+
+
+def parse_duration(text):
+    """Parses durations like 90, '90s', '15m', '2h', '30d' or '1w' into seconds."""
+    if isinstance(text, (int, float)):
+        return float(text)
+    text = str(text).strip().upper()
+    if text and text[-1] in _DURATION_UNITS:
+        return float(text[:-1]) * _DURATION_UNITS[text[-1]]
+    return float(text)
+
+
+def glob_to_regex(pattern):
+    """
+    Translates a shell glob ('*', '?', '[...]') into a regex matching whole names, like
+    fnmatch.translate but without capturing groups, so several can share one regex.
+    """
+    out = []
+    i, n = 0, len(pattern)
+    while i < n:
+        c = pattern[i]
+        i += 1
+        if c == "*":
+            out.append(".*")
+        elif c == "?":
+            out.append(".")
+        elif c == "[":
+            # A ']' right after '[' or '[!' is part of the set
+            j = i + 1 if i < n and pattern[i] == "!" else i
+            j = pattern.find("]", j + 1 if j < n and pattern[j] == "]" else j)
+            if j < 0:
+                out.append("\\[")
+                continue
+            chars = pattern[i:j].replace("\\", "\\\\")
+            i = j + 1
+            if chars.startswith("!"):
+                chars = "^" + chars[1:]
+            elif chars.startswith("^"):
+                chars = "\\" + chars
+            out.append(f"[{chars}]")
+        else:
+            out.append(re.escape(c))
+    return "(?s:%s)\\Z" % "".join(out)
+
+
+# A Windows drive such as 'C:', which would make a folder absolute
+_DRIVE = re.compile(r"[A-Za-z]:")
+
+
+def relative_folder(folder):
+    """
+    folder as a normalized '/'-separated path inside the organized directory. Raises
+    ValueError for empty, absolute and drive paths and for paths with '..' components,
+    which would send files out of the directory.
+    """
+    if not isinstance(folder, str):
+        raise ValueError(f"folder must be a string: {folder!r}")
+    path = folder.replace("\\", "/")
+    if path.startswith("/") or _DRIVE.match(path):
+        raise ValueError(f"folder must be relative: {folder!r}")
+    parts = [part for part in path.split("/") if part not in ("", ".")]
+    if not parts or ".." in parts:
+        raise ValueError(f"folder must stay inside the organized directory: {folder!r}")
+    return "/".join(parts)
+
+
+def refers_to_groups(regex):
+    """
+    True if regex refers to its groups by number: a backreference such as \\1 or a
+    conditional (?(1)...). Those numbers shift when the regex is merged with others.
+    """
+    in_class = False
+    i, n = 0, len(regex)
+    while i < n:
+        c = regex[i]
+        if c == "\\":
+            nxt = regex[i + 1:i + 2]
+            # \1 to \99 outside a set; \0 and three octal digits are character escapes
+            if not in_class and nxt.isdigit() and nxt != "0" and not (
+                    len(regex[i + 1:i + 4]) == 3 and all(d in "01234567" for d in regex[i + 1:i + 4])):
+                return True
+            i += 2
+            continue
+        if in_class:
+            if c == "]":
+                in_class = False
+        elif c == "[":
+            in_class = True
+            # A ']' right after '[' or '[^' is part of the set
+            if regex[i + 1:i + 2] == "^":
+                i += 1
+            if regex[i + 1:i + 2] == "]":
+                i += 1
+        elif regex.startswith("(?(", i):
+            return True
+        i += 1
+    return False
+
+
+def _number(value, what):
+    """value if it is an int or float (but not a bool), else ValueError."""
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise ValueError(f"{what} must be a number: {value!r}")
+    return value
+
+
+def _strings(value, what):
+    """A tuple of the string or list of strings value, else ValueError."""
+    if isinstance(value, str):
+        return (value,)
+    if not isinstance(value, (list, tuple)) or not all(isinstance(item, str) for item in value):
+        raise ValueError(f"{what} must be a string or a list of strings: {value!r}")
+    return tuple(value)
+
+
+# Regex characters that end the literal prefix of a pattern
+_REGEX_SPECIAL = set(".^$*+?{}[]\\|()")
+_GLOB_SPECIAL = set("*?[")
+MAX_PREFIX = 16
+
+
+class Rule:
+    """One routing rule; see the module docstring for the conditions."""
+    __slots__ = ("folder", "priority", "extensions", "pattern", "prefix", "min_size", "max_size",
+                 "min_age", "max_age", "alone", "_compiled")
+
+    KEYS = {"folder", "priority", "extension", "glob", "regex", "ignore_case", "min_size", "max_size",
+            "older_than", "newer_than"}
+
+    def __init__(self, folder, priority=0, extensions=(), glob=None, regex=None, ignore_case=False,
+                 min_size=None, max_size=None, min_age=None, max_age=None):
+        self.folder = folder
+        self.priority = priority
+        self.extensions = tuple("." + ext.lower().lstrip(".") for ext in extensions)
+        self.min_size = min_size
+        self.max_size = max_size
+        self.min_age = min_age
+        self.max_age = max_age
+        # pattern is the regex source for the name (None: any name); prefix is a
+        # lowercased literal every matching name starts with, used for indexing
+        self.pattern = None
+        self.prefix = ""
+        # A pattern that refers to its groups by number cannot share a combined regex
+        self.alone = False
+        self._compiled = None
+        if glob is not None and regex is not None:
+            raise ValueError("a rule takes a glob or a regex, not both")
+        if glob is not None:
+            self.pattern = glob_to_regex(glob)
+            self.prefix = self._literal_prefix(glob, _GLOB_SPECIAL)
+        elif regex is not None:
+            self.pattern = f"(?s:.*?)(?:{regex})"
+            self.alone = refers_to_groups(regex)
+            if regex.startswith("^") and "|" not in regex:
+                self.prefix = self._literal_prefix(regex[1:], _REGEX_SPECIAL, "*?{")
+        if self.pattern is not None and ignore_case:
+            self.pattern = f"(?i:{self.pattern})"
+        if self.pattern is not None:
+            # Compiled as it will run, so that e.g. a '(?i)' that is no longer at the
+            # start fails here rather than in the middle of a run
+            self._compiled = re.compile(self.pattern)
+            if self._compiled.groupindex:
+                raise ValueError(f"named groups are not supported in rule regexes: {regex!r}")
+
+    @staticmethod
+    def _literal_prefix(source, special, quantifiers=""):
+        prefix = []
+        for c in source[:MAX_PREFIX]:
+            if c in special:
+                # A regex quantifier can make the character before it optional
+                if c in quantifiers and prefix:
+                    prefix.pop()
+                break
+            prefix.append(c)
+        return "".join(prefix).lower()
+
+    @classmethod
+    def from_config(cls, data):
+        """Builds a rule from its config dict. Raises ValueError for invalid rules."""
+        if not isinstance(data, dict):
+            raise ValueError(f"rules must be objects: {data!r}")
+        unknown = set(data) - cls.KEYS
+        if unknown:
+            raise ValueError(f"unknown rule keys: {', '.join(sorted(unknown))}")
+        for key in ("glob", "regex"):
+            if key in data and not isinstance(data[key], str):
+                raise ValueError(f"{key} must be a string: {data!r}")
+        try:
+            folder = relative_folder(data.get("folder"))
+        except ValueError as e:
+            raise ValueError(f"rule needs a relative folder name: {data!r} ({e})") from None
+        try:
+            return cls(
+                folder,
+                priority=_number(data.get("priority", 0), "priority"),
+                extensions=_strings(data.get("extension", ()), "extension"),
+                glob=data.get("glob"),
+                regex=data.get("regex"),
+                ignore_case=bool(data.get("ignore_case")),
+                min_size=parse_size(data["min_size"]) if "min_size" in data else None,
+                max_size=parse_size(data["max_size"]) if "max_size" in data else None,
+                min_age=parse_duration(data["older_than"]) if "older_than" in data else None,
+                max_age=parse_duration(data["newer_than"]) if "newer_than" in data else None,
+            )
+        except (TypeError, ValueError, re.error) as e:
+            raise ValueError(f"invalid rule {data!r}: {e}") from None
+
+    def compiled(self):
+        """
+        The compiled pattern, or None for rules without one. A rule loaded from the
+        cache compiles it again on first use.
+        """
+        if self._compiled is None and self.pattern is not None:
+            self._compiled = re.compile(self.pattern)
+        return self._compiled
+
+    def __getstate__(self):
+        # Compiled patterns are left out of pickles; see RuleSet.load()
+        return None, {slot: getattr(self, slot) for slot in self.__slots__ if slot != "_compiled"}
+
+    def __setstate__(self, state):
+        for slot, value in state[1].items():
+            setattr(self, slot, value)
+        self._compiled = None
+
+    @property
+    def needs_stat(self):
+        return not (self.min_size is None and self.max_size is None
+                    and self.min_age is None and self.max_age is None)
+
+    def stat_matches(self, st, now):
+        if self.min_size is not None and st.st_size < self.min_size:
+            return False
+        if self.max_size is not None and st.st_size > self.max_size:
+            return False
+        age = now - st.st_mtime
+        if self.min_age is not None and age < self.min_age:
+            return False
+        if self.max_age is not None and age > self.max_age:
+            return False
+        return True
+
+
+class _Bucket:
+    """
+    The rules that can apply to names with one particular extension, in priority
+    order, with all their name patterns merged into one regex. A rule without a
+    pattern contributes an empty alternative, which matches any name, and so does a
+    rule whose pattern has to run alone (Rule.alone); that one is then tried by itself.
+
+    The regex is only built when the first name reaches the bucket: a rule set has a
+    bucket for every extension and prefix, and a run typically meets few of them.
+    """
+    __slots__ = ("rules", "combined", "groups", "direct")
+
+    def __init__(self, rules):
+        self.rules = rules
+        self.combined = None
+        self.groups = None
+        # The top rule matches every name unconditionally: no regex needed at all
+        self.direct = rules[0].folder if rules and rules[0].pattern is None and not rules[0].needs_stat else None
+
+    def __getstate__(self):
+        return None, {"rules": self.rules, "direct": self.direct}
+
+    def __setstate__(self, state):
+        self.rules, self.direct = state[1]["rules"], state[1]["direct"]
+        self.combined = self.groups = None
+
+    def _compile(self):
+        # Alternatives are tried left to right, so the first one that matches is the
+        # rule with the highest priority whose pattern accepts the name. lastindex
+        # names the outermost group of that alternative.
+        parts, groups = [], {}
+        group = 1
+        for i, rule in enumerate(self.rules):
+            if rule.alone:
+                parts.append("()")
+                groups[group] = i
+                group += 1
+                continue
+            compiled = rule.compiled()
+            parts.append(f"({rule.pattern or ''})")
+            groups[group] = i
+            group += 1 + (compiled.groups if compiled is not None else 0)
+        # Other threads may use the bucket meanwhile; combined is published last
+        self.groups = groups
+        self.combined = re.compile("|".join(parts))
+        return self.combined
+
+    def match(self, name, entry):
+        if self.direct is not None:
+            return self.direct
+        if not self.rules:
+            return None
+        combined = self.combined
+        if combined is None:
+            combined = self._compile()
+        m = combined.match(name)
+        if m is None:
+            return None
+        first = self.groups[m.lastindex]
+        st = None
+        now = 0.0
+        for i in range(first, len(self.rules)):
+            rule = self.rules[i]
+            if (i > first or rule.alone) and rule.pattern is not None and rule.compiled().match(name) is None:
+                continue
+            if rule.needs_stat:
+                if st is None:
+                    try:
+                        st = entry.stat()
+                    except OSError:
+                        return None
+                    now = time.time()
+                if not rule.stat_matches(st, now):
+                    continue
+            return rule.folder
+        return None
+
+
+class _PrefixIndex:
+    """
+    Splits a list of rules by the literal prefix of their patterns, so a name only
+    meets the rules whose prefix it starts with (plus those without a prefix). The
+    prefixes form a character trie; every node where a prefix ends holds a _Bucket
+    of the rules that apply to names reaching it, and a name uses the deepest such
+    node on its path. Keeps the combined regexes short when there are hundreds of
+    keyword globs such as 'invoice*' or 'Screenshot*'.
+    """
+    __slots__ = ("root", "bucket")
+
+    def __init__(self, rules):
+        # Node: [children, bucket or None]
+        self.root = [{}, None]
+        for rule in rules:
+            node = self.root
+            for c in rule.prefix:
+                node = node[0].setdefault(c, [{}, None])
+            node[1] = True
+        self.bucket = _Bucket([rule for rule in rules if not rule.prefix])
+        self._build(self.root, "", rules)
+
+    def _build(self, node, path, rules):
+        if node[1] is True:
+            node[1] = _Bucket([rule for rule in rules if path.startswith(rule.prefix)])
+        for c, child in node[0].items():
+            self._build(child, path + c, rules)
+
+    def match(self, name, entry):
+        bucket = self.bucket
+        node = self.root
+        for c in name[:MAX_PREFIX].lower():
+            node = node[0].get(c)
+            if node is None:
+                break
+            if node[1] is not None:
+                bucket = node[1]
+        return bucket.match(name, entry)
+
+
+class RuleSet:
+    """
+    A compiled set of routing rules. Instead of trying the rules one after another,
+    matching looks up the file's extension in an index (rules without an extension
+    condition are part of every entry), narrows the candidates down by the literal
+    prefix of their patterns and runs a single combined regex over the name, so the
+    cost per file barely grows with the number of rules. Only when the best name match
+    fails its size or age condition are the remaining candidates checked.
+
+    Names no rule matches are then checked against the optional KeywordRouter.
+    """
+    def __init__(self, rules, keywords=None):
+        self.rules = sorted(rules, key=lambda rule: -rule.priority)
+        self.keywords = keywords
+        folders = [rule.folder for rule in self.rules]
+        if keywords is not None:
+            folders.extend(keywords.folders)
+        self.folders = frozenset(folder.split("/", 1)[0] for folder in folders)
+        # Levels of the deepest folder, e.g. 2 for 'Docs/Invoices'
+        self.depth = max((folder.count("/") + 1 for folder in folders), default=1)
+        extensions = {ext for rule in self.rules for ext in rule.extensions}
+        # Finds the longest rule extension a name ends with, compound ones included
+        self._suffixes = SuffixClassifier({ext: ext for ext in extensions})
+        generic = [rule for rule in self.rules if not rule.extensions]
+        self._generic = _PrefixIndex(generic)
+        self._buckets = {}
+        # Extensions with the same applicable rules share one index
+        shared = {}
+        for ext in extensions:
+            # A name ending in .tar.gz also ends in .gz, so those rules apply as well
+            applicable = tuple(i for i, rule in enumerate(self.rules)
+                               if not rule.extensions or any(ext.endswith(other) for other in rule.extensions))
+            index = shared.get(applicable)
+            if index is None:
+                index = shared[applicable] = _PrefixIndex([self.rules[i] for i in applicable])
+            self._buckets[ext] = index
+
+    @classmethod
+    def from_config(cls, data):
+        if not isinstance(data, dict) or not isinstance(data.get("rules", []), list) or not (
+                "rules" in data or "keywords" in data):
+            raise ValueError("rules config must be an object with a 'rules' list and/or 'keywords'")
+        rules = [Rule.from_config(rule) for rule in data.get("rules", [])]
+        keywords = None
+        if "keywords" in data:
+            keywords = KeywordRouter(_keyword_entries(data["keywords"]),
+                                     ignore_case=bool(data.get("keywords_ignore_case", True)))
+        return cls(rules, keywords)
+
+    @classmethod
+    def load(cls, path, version="", cache=True):
+        """
+        Reads and compiles a JSON rules file. Raises ValueError if it is invalid.
+
+        The compiled tables are pickled to the cache directory under a hash of the file's
+        content, CACHE_FORMAT and version (the caller's release), so later runs with the
+        same config skip compiling; regexes are not part of the pickle and are compiled
+        on first use. cache=False neither reads nor writes the cache.
+        """
+        with open(path, "rb") as fh:
+            content = fh.read()
+        cache_path = None
+        if cache:
+            key = hashlib.sha256(f"{CACHE_FORMAT}:{version}:".encode() + content).hexdigest()[:32]
+            cache_path = os.path.join(cache_dir(), f"rules-{key}.pickle")
+            ruleset = _load_cached(cache_path)
+            if ruleset is not None:
+                return ruleset
+        try:
+            data = json.loads(content.decode("utf-8"))
+        except ValueError as e:
+            raise ValueError(f"{path}: {e}") from None
+        ruleset = cls.from_config(data)
+        if cache_path is not None:
+            _save_cached(cache_path, ruleset)
+        return ruleset
+
+    def match(self, entry):
+        """
+        The folder of the first rule matching a DirEntry-like object, else of the best
+        keyword in its name, or None.
+        """
+        name = entry.name
+        ext = self._suffixes.split(name)[2]
+        bucket = self._buckets[ext] if ext is not None else self._generic
+        folder = bucket.match(name, entry)
+        if folder is None and self.keywords is not None:
+            folder = self.keywords.match(name)
+        return folder
+
+
+def _load_cached(cache_path):
+    """The RuleSet pickled at cache_path, or None if there is none or it is unusable."""
+    try:
+        with open(cache_path, "rb") as fh:
+            ruleset = pickle.load(fh)
+    except Exception:
+        # Missing, truncated, or from a build whose classes no longer match
+        return None
+    if not isinstance(ruleset, RuleSet):
+        return None
+    try:
+        # Marks the entry as recently used, see _save_cached()
+        os.utime(cache_path)
+    except OSError:
+        pass
+    return ruleset
+
+
+def _save_cached(cache_path, ruleset):
+    """Atomically writes the pickle and drops all but the CACHE_ENTRIES newest ones."""
+    directory = os.path.dirname(cache_path)
+    tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(directory, exist_ok=True)
+        with open(tmp_path, "wb") as fh:
+            pickle.dump(ruleset, fh, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, cache_path)
+        entries = []
+        with os.scandir(directory) as it:
+            for entry in it:
+                if entry.name.startswith("rules-") and entry.name.endswith(".pickle"):
+                    entries.append((entry.stat().st_mtime_ns, entry.path))
+        entries.sort(reverse=True)
+        for _, stale in entries[CACHE_ENTRIES:]:
+            os.unlink(stale)
+    except (OSError, pickle.PicklingError):
+        # The cache is only an optimization
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+
+
+def _keyword_entries(config):
+    """
+    (keyword, folder, priority) tuples from the 'keywords' config, either a mapping of
+    keyword to folder or a list of {"keyword", "folder", "priority"} objects.
+    """
+    if isinstance(config, dict):
+        return [(keyword, relative_folder(folder), 0) for keyword, folder in config.items()]
+    if not isinstance(config, list):
+        raise ValueError("'keywords' must be an object or a list")
+    entries = []
+    for item in config:
+        try:
+            keyword, folder = item["keyword"], item["folder"]
+        except (TypeError, KeyError):
+            raise ValueError(f"keyword entries need 'keyword' and 'folder': {item!r}") from None
+        if not isinstance(keyword, str):
+            raise ValueError(f"keywords must be strings: {keyword!r}")
+        entries.append((keyword, relative_folder(folder), _number(item.get("priority", 0), "priority")))
+    return entries
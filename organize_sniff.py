@@ -0,0 +1,253 @@
+"""
+Content sniffing: tells a file's type from its first bytes when the name does not.
+"""
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from organize_index import cache_dir, still_at
+
+# (extension, ((offset, magic), ...)); every part has to match. More specific
+# signatures come first where they share a prefix (RIFF). ISO media files ('ftyp' at
+# offset 4) are told apart by their brands, see FTYP_BRANDS.
+SIGNATURES = [
+    (".png", ((0, b"\x89PNG\r\n\x1a\n"),)),
+    (".jpg", ((0, b"\xff\xd8\xff"),)),
+    (".gif", ((0, b"GIF87a"),)),
+    (".gif", ((0, b"GIF89a"),)),
+    (".tiff", ((0, b"II*\x00"),)),
+    (".tiff", ((0, b"MM\x00*"),)),
+    (".webp", ((0, b"RIFF"), (8, b"WEBP"))),
+    (".wav", ((0, b"RIFF"), (8, b"WAVE"))),
+    (".avi", ((0, b"RIFF"), (8, b"AVI "))),
+    (".mkv", ((0, b"\x1a\x45\xdf\xa3"),)),
+    (".mp3", ((0, b"ID3"),)),
+    (".flac", ((0, b"fLaC"),)),
+    (".ogg", ((0, b"OggS"),)),
+    (".pdf", ((0, b"%PDF-"),)),
+    (".rtf", ((0, b"{\\rtf"),)),
+    (".doc", ((0, b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1"),)),
+    (".zip", ((0, b"PK\x03\x04"),)),
+    (".rar", ((0, b"Rar!\x1a\x07"),)),
+    (".7z", ((0, b"7z\xbc\xaf\x27\x1c"),)),
+    (".gz", ((0, b"\x1f\x8b"),)),
+    (".bz2", ((0, b"BZh"),)),
+    (".xz", ((0, b"\xfd7zXZ\x00"),)),
+    (".zst", ((0, b"\x28\xb5\x2f\xfd"),)),
+    (".tar", ((257, b"ustar"),)),
+    (".dcm", ((128, b"DICM"),)),
+    (".exe", ((0, b"MZ"),)),
+    (".exe", ((0, b"\x7fELF"),)),
+    (".html", ((0, b"<!DOCTYPE html"),)),
+    (".html", ((0, b"<!doctype html"),)),
+    (".html", ((0, b"<html"),)),
+]
+
+# ISO base media brands and the extension they stand for. The major brand decides; a
+# generic major brand ('mif1', 'msf1', 'isom', ...) is looked up among the compatible
+# brands, and anything unknown is taken for MP4 video.
+FTYP_BRANDS = {
+    b"avif": ".avif", b"avis": ".avif",
+    b"heic": ".heic", b"heix": ".heic", b"heim": ".heic", b"heis": ".heic",
+    b"hevc": ".heic", b"hevx": ".heic",
+    b"M4A ": ".m4a", b"M4B ": ".m4a",
+    b"qt  ": ".mov",
+    b"3gp4": ".3gp", b"3gp5": ".3gp", b"3gp6": ".3gp", b"3g2a": ".3gp",
+}
+# Major brands that only say which family of specs the file follows
+GENERIC_BRANDS = {b"mif1": ".heif", b"msf1": ".heif", b"isom": ".mp4", b"iso2": ".mp4", b"mp41": ".mp4",
+                  b"mp42": ".mp4"}
+
+# Script interpreters named on a '#!' line; anything else counts as a shell script
+INTERPRETERS = {
+    "python": ".py", "python2": ".py", "python3": ".py", "pypy": ".py", "pypy3": ".py",
+    "node": ".js", "nodejs": ".js", "deno": ".js",
+    "sh": ".sh", "bash": ".sh", "dash": ".sh", "zsh": ".sh", "ksh": ".sh",
+}
+
+HEADER_SIZE = max(offset + len(magic) for _, parts in SIGNATURES for offset, magic in parts)
+
+
+def sniff_header(header):
+    """Returns the extension that the first bytes of a file point to, or None."""
+    if header.startswith(b"#!"):
+        return _shebang_extension(header)
+    if header.startswith(b"ftyp", 4):
+        return _ftyp_extension(header)
+    for extension, parts in SIGNATURES:
+        if all(header.startswith(magic, offset) for offset, magic in parts):
+            return extension
+    return None
+
+
+def _ftyp_extension(header):
+    major = header[8:12]
+    extension = FTYP_BRANDS.get(major)
+    if extension is not None:
+        return extension
+    # The compatible brands follow the minor version, up to the end of the ftyp box
+    end = min(int.from_bytes(header[:4], "big"), len(header))
+    for start in range(16, end - 3, 4):
+        extension = FTYP_BRANDS.get(header[start:start + 4])
+        if extension is not None:
+            return extension
+    return GENERIC_BRANDS.get(major, ".mp4")
+
+
+def _shebang_extension(header):
+    words = header[2:].split(b"\n", 1)[0].split()
+    if not words:
+        return None
+    program = os.path.basename(words[0])
+    if program == b"env":
+        # '#!/usr/bin/env -S python3 -u'
+        program = next((word for word in words[1:] if not word.startswith(b"-")), b"")
+    program = os.fsdecode(program)
+    return INTERPRETERS.get(program) or INTERPRETERS.get(program.rstrip("0123456789.")) or ".sh"
+
+
+class ContentSniffer:
+    """
+    Reads at most HEADER_SIZE bytes of the files it is asked about and matches them
+    against SIGNATURES. Reads are batched through a thread pool, which keeps a network
+    filesystem busy with several requests at once.
+
+    Results are cached by (st_dev, st_ino, st_size, st_mtime_ns) in the boBnox cache
+    directory, so a file is only ever read again once it changed. Files modified within
+    RACY_WINDOW_NS may still be written to and are not cached.
+
+    Each entry also keeps the path the file was sniffed at. save() drops the entries this
+    run did not use whose path no longer leads to that inode (the file was deleted, or
+    moved away and organized), so the cache does not grow with every file ever seen.
+    """
+    VERSION = 2
+    RACY_WINDOW_NS = 2 * 10**9
+
+    def __init__(self, path=None, workers=8, batch_size=256):
+        self.path = path or os.path.join(cache_dir(), "sniff.json")
+        self.workers = workers
+        self.batch_size = batch_size
+        self._cache = {}
+        # Keys looked up or added during this run
+        self._used = set()
+        self._dirty = False
+        self._lock = threading.Lock()
+        self._pool = None
+
+    @classmethod
+    def load(cls, path=None, **kwargs):
+        sniffer = cls(path, **kwargs)
+        try:
+            with open(sniffer.path, encoding="utf-8") as fh:
+                data = json.load(fh)
+            if data.get("version") == cls.VERSION:
+                sniffer._cache = data["files"]
+        except (OSError, ValueError, KeyError):
+            pass
+        return sniffer
+
+    def save(self):
+        """
+        Prunes the cache, atomically writes it if anything changed, and stops the thread
+        pool.
+        """
+        self.prune()
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+        if not self._dirty:
+            return
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with self._lock:
+            data = {"version": self.VERSION, "files": self._cache}
+            with open(tmp_path, "w", encoding="utf-8") as fh:
+                json.dump(data, fh, separators=(",", ":"))
+            self._dirty = False
+        os.replace(tmp_path, self.path)
+
+    def prune(self):
+        """Drops the entries not used in this run whose file is gone from its path."""
+        unused = [key for key in list(self._cache) if key not in self._used]
+        if not unused:
+            return
+        if self.workers > 1 and len(unused) > 1:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(self.workers, thread_name_prefix="bobnox-sniff")
+            alive = self._pool.map(self._alive, unused)
+        else:
+            alive = map(self._alive, unused)
+        gone = [key for key, found in zip(unused, alive) if not found]
+        if gone:
+            with self._lock:
+                for key in gone:
+                    del self._cache[key]
+                self._dirty = True
+
+    def _alive(self, key):
+        entry = self._cache[key]
+        return len(entry) > 3 and still_at(key, entry[3])
+
+    def sniff_entries(self, entries, wanted):
+        """
+        Yields (entry, extension) for a stream of DirEntry-like objects, in order.
+        Only entries for which wanted(entry) is true are sniffed; the others, and files
+        that match no signature, get None.
+        """
+        batch = []
+        for entry in entries:
+            batch.append(entry)
+            if len(batch) >= self.batch_size:
+                yield from self._sniff_batch(batch, wanted)
+                batch = []
+        if batch:
+            yield from self._sniff_batch(batch, wanted)
+
+    def sniff(self, entry):
+        """The sniffed extension of one DirEntry-like object, or None."""
+        try:
+            st = entry.stat()
+        except OSError:
+            return None
+        key = f"{st.st_dev}:{st.st_ino}"
+        self._used.add(key)
+        cached = self._cache.get(key)
+        if cached is not None and cached[0] == st.st_size and cached[1] == st.st_mtime_ns:
+            if cached[3:] != [entry.path]:
+                # Renamed or moved since: remember where it is now, for prune()
+                with self._lock:
+                    self._cache[key] = cached[:3] + [entry.path]
+                    self._dirty = True
+            return cached[2] or None
+        try:
+            fd = os.open(entry.path, os.O_RDONLY | getattr(os, "O_CLOEXEC", 0))
+        except OSError:
+            return None
+        try:
+            header = os.read(fd, HEADER_SIZE)
+        except OSError:
+            return None
+        finally:
+            os.close(fd)
+        extension = sniff_header(header)
+        if time.time_ns() - st.st_mtime_ns > self.RACY_WINDOW_NS:
+            with self._lock:
+                self._cache[key] = [st.st_size, st.st_mtime_ns, extension or "", entry.path]
+                self._dirty = True
+        return extension
+
+    def _sniff_batch(self, batch, wanted):
+        todo = [entry for entry in batch if wanted(entry)]
+        if not todo:
+            return ((entry, None) for entry in batch)
+        if len(todo) == 1 or self.workers <= 1:
+            found = {id(entry): self.sniff(entry) for entry in todo}
+        else:
+            if self._pool is None:
+                with self._lock:
+                    if self._pool is None:
+                        self._pool = ThreadPoolExecutor(self.workers, thread_name_prefix="bobnox-sniff")
+            found = dict(zip(map(id, todo), self._pool.map(self.sniff, todo)))
+        return ((entry, found.get(id(entry))) for entry in batch)
@@ -0,0 +1,134 @@
+"""
+External sorting of move plans, so planning stays within a memory budget.
+"""
+import heapq
+import os
+import tempfile
+import threading
+
+
+class SpillingSorter:
+    """
+    Collects records (tuples of strings with a fixed number of fields) and hands them
+    back sorted. Records are buffered in memory until their estimated size reaches
+    budget bytes; the buffer is then sorted and written to a temporary run file. Reading
+    merges all runs with heapq.merge, holding one chunk per run, so memory use is bounded
+    by the budget however many records are added.
+
+    Run files store every field as fsencoded bytes followed by a NUL, which no file name
+    can contain. add() is thread-safe.
+    """
+    # Rough CPython cost of a record: the tuple plus one str object per field
+    RECORD_OVERHEAD = 72
+    FIELD_OVERHEAD = 56
+    # Largest read per run during the merge; a chunk expands about 4x once split
+    READ_CHUNK = 256 * 1024
+    MIN_READ_CHUNK = 4096
+
+    def __init__(self, fields, budget, tmpdir=None):
+        self.fields = fields
+        self.budget = budget
+        self.tmpdir = tmpdir
+        self.count = 0
+        self._buffer = []
+        self._buffered_bytes = 0
+        self._runs = []
+        self._borrowed = set()
+        self._lock = threading.Lock()
+
+    def add(self, record):
+        size = self.RECORD_OVERHEAD + sum(self.FIELD_OVERHEAD + len(field) for field in record)
+        with self._lock:
+            self._buffer.append(record)
+            self._buffered_bytes += size
+            self.count += 1
+            if self._buffered_bytes >= self.budget:
+                self._spill()
+
+    def add_run(self, path, count):
+        """
+        Merges in an existing sorted run file (see write_run) holding count records.
+        The file belongs to the caller and is left in place by close().
+        """
+        with self._lock:
+            self._runs.append(path)
+            self._borrowed.add(path)
+            self.count += count
+
+    @staticmethod
+    def write_run(records, path):
+        """Writes sorted records to a run file that add_run() can adopt; returns the count."""
+        count = 0
+        fsencode = os.fsencode
+        with open(path, "wb") as fh:
+            for record in records:
+                fh.write(b"".join(fsencode(field) + b"\0" for field in record))
+                count += 1
+        return count
+
+    def __iter__(self):
+        """Yields all records in sorted order, each distinct record once. Consumes the sorter."""
+        previous = None
+        for record in self._merged():
+            if record != previous:
+                yield record
+                previous = record
+
+    def _merged(self):
+        if not self._runs:
+            buffer, self._buffer = self._buffer, []
+            buffer.sort()
+            yield from buffer
+            return
+        # Flush what is left so the buffer's memory is free during the merge, and share
+        # the budget between the runs that are read side by side
+        self._spill()
+        chunk = max(self.MIN_READ_CHUNK, min(self.READ_CHUNK, self.budget // (4 * len(self._runs))))
+        yield from heapq.merge(*(self._read_run(path, chunk) for path in self._runs))
+
+    def close(self):
+        """Removes the run files."""
+        for path in self._runs:
+            if path in self._borrowed:
+                continue
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        self._runs = []
+        self._buffer = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _spill(self):
+        if not self._buffer:
+            return
+        self._buffer.sort()
+        fd, path = tempfile.mkstemp(prefix="bobnox-plan-", suffix=".run", dir=self.tmpdir)
+        os.close(fd)
+        self.write_run(self._buffer, path)
+        self._runs.append(path)
+        self._buffer = []
+        self._buffered_bytes = 0
+
+    def _read_run(self, path, chunk_size):
+        """Streams the records of one run file back, chunk_size bytes at a time."""
+        fields, fsdecode = self.fields, os.fsdecode
+        with open(path, "rb") as fh:
+            pending = []
+            tail = b""
+            while True:
+                chunk = fh.read(chunk_size)
+                if not chunk:
+                    return
+                parts = (tail + chunk).split(b"\0")
+                tail = parts.pop()
+                for part in parts:
+                    pending.append(fsdecode(part))
+                    if len(pending) == fields:
+                        yield tuple(pending)
+                        pending = []
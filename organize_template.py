@@ -0,0 +1,117 @@
+"""
+Destination path templates such as '{category}/{year}/{month}'.
+"""
+import string
+import time
+
+# Upper bounds (exclusive) of the {size} buckets
+SIZE_BUCKETS = [(1 << 20, "small"), (100 << 20, "medium"), (1 << 30, "large")]
+
+
+def size_bucket(size):
+    for limit, label in SIZE_BUCKETS:
+        if size < limit:
+            return label
+    return "huge"
+
+
+def path_component(text, default):
+    """text made safe to use as a single folder name, or default if nothing is left."""
+    text = text.replace("/", "-").replace("\\", "-").replace("\0", "")[:100].strip(" .")
+    return text or default
+
+
+# Field name -> getter(category, extension, st, date, taken, metadata). date is the
+# local time of st_mtime and taken the (year, month, day) of the capture date, each
+# worked out once per file and only when a field needs it.
+FIELDS = {
+    "category": lambda category, extension, st, date, taken, metadata: category,
+    "ext": lambda category, extension, st, date, taken, metadata: extension[1:].lower() or "none",
+    "year": lambda category, extension, st, date, taken, metadata: str(date.tm_year),
+    "month": lambda category, extension, st, date, taken, metadata: "%02d" % date.tm_mon,
+    "day": lambda category, extension, st, date, taken, metadata: "%02d" % date.tm_mday,
+    "size": lambda category, extension, st, date, taken, metadata: size_bucket(st.st_size),
+    "taken_year": lambda category, extension, st, date, taken, metadata: str(taken[0]),
+    "taken_month": lambda category, extension, st, date, taken, metadata: "%02d" % taken[1],
+    "taken_day": lambda category, extension, st, date, taken, metadata: "%02d" % taken[2],
+    "artist": lambda category, extension, st, date, taken, metadata:
+        path_component(metadata.get("artist", ""), "Unknown Artist"),
+    "album": lambda category, extension, st, date, taken, metadata:
+        path_component(metadata.get("album", ""), "Unknown Album"),
+}
+DATE_FIELDS = frozenset(["year", "month", "day"])
+SIZE_FIELDS = frozenset(["size"])
+# Field -> parts of the capture date it needs
+TAKEN_FIELDS = {"taken_year": 1, "taken_month": 2, "taken_day": 3}
+METADATA_FIELDS = frozenset(TAKEN_FIELDS) | {"artist", "album"}
+
+
+class PathTemplate:
+    """
+    A destination template, parsed once into a formatter closure. Fields:
+
+        {category}  the folder the file would go to without a template, e.g. Images
+        {ext}       the lower-case extension without the dot ('tar.gz'), or 'none'
+        {year} {month} {day}  the modification date, zero-padded
+        {size}      small (< 1 MiB), medium (< 100 MiB), large (< 1 GiB) or huge
+        {taken_year} {taken_month} {taken_day}  the capture date from EXIF, ID3 or MP4
+                    metadata, or the modification date if the file has none
+        {artist} {album}  from ID3 or MP4 tags, 'Unknown Artist' / 'Unknown Album'
+
+    Date and size come from the file's stat result, which the scan entry caches, so
+    templates without them never stat at all. Fields in METADATA_FIELDS set
+    needs_metadata; see organize_media. The first path component has to be
+    {category} or plain text, so that recursive runs recognize and skip the folders a
+    template creates.
+    """
+    def __init__(self, template):
+        self.template = template
+        parts = [part for part in template.replace("\\", "/").split("/") if part]
+        if not parts or any(part in (".", "..") for part in parts):
+            raise ValueError(f"invalid path template: {template!r}")
+        self.root = None if parts[0] == "{category}" else parts[0]
+        # Folder levels a rendered path spans, counting {category} as one
+        self.depth = len(parts)
+        fmt, getters, fields = [], [], set()
+        for literal, field, spec, conversion in string.Formatter().parse("/".join(parts)):
+            fmt.append(literal.replace("{", "{{").replace("}", "}}"))
+            if field is None:
+                continue
+            if field not in FIELDS or conversion or spec:
+                raise ValueError(f"unknown template field {{{field}}} in {template!r}; "
+                                 f"use one of {', '.join(sorted(FIELDS))}")
+            fmt.append(f"{{{len(getters)}}}")
+            getters.append(FIELDS[field])
+            fields.add(field)
+        if self.root is not None and "{" in self.root:
+            raise ValueError(f"the first folder of a template must be {{category}} or plain text: {template!r}")
+        precision = max((TAKEN_FIELDS.get(field, 0) for field in fields), default=0)
+        self.needs_metadata = bool(fields & METADATA_FIELDS)
+        self.needs_stat = bool(fields & (DATE_FIELDS | SIZE_FIELDS)) or precision > 0
+        self.render = self._compile("".join(fmt), getters, bool(fields & DATE_FIELDS), precision)
+
+    @staticmethod
+    def _compile(fmt, getters, dated, precision):
+        """
+        Returns render(category, extension, st, metadata=None): the relative destination
+        folder of a file. extension is its extension with the dot ('.tar.gz' or ''), st
+        its stat result and metadata what organize_media.read_metadata() found; either
+        may be None unless needs_stat or needs_metadata is set.
+        """
+        format_ = fmt.format
+        localtime = time.localtime
+        if not getters:
+            fmt = fmt.format()
+            return lambda category, extension, st, metadata=None: fmt
+
+        def render(category, extension, st, metadata=None):
+            date = localtime(st.st_mtime) if dated else None
+            taken = None
+            if precision:
+                # All taken_* fields of a file come from the same date
+                taken = metadata.get("date") if metadata else None
+                if not taken or len(taken) < precision:
+                    taken = localtime(st.st_mtime)[:3]
+            metadata = metadata or {}
+            return format_(*[getter(category, extension, st, date, taken, metadata) for getter in getters])
+        return render
@@ -0,0 +1,234 @@
+"""
+Parallel directory walker used by the recursive organize mode.
+"""
+import os
+import queue
+import random
+import stat
+import threading
+from collections import deque
+
+
+class _Raised:
+    """An exception other than OSError raised on a worker, re-raised by walk() in the consumer."""
+    __slots__ = ("error",)
+
+    def __init__(self, error):
+        self.error = error
+
+
+class ParallelWalker:
+    """
+    Walks a directory tree with a pool of threads. Every worker keeps its own deque of
+    directories: it pushes and pops subdirectories at the tail (depth first, cache
+    friendly) and, when it runs dry, steals from the head of another worker's deque.
+    Listing directories is latency bound on network filesystems, so throughput grows
+    roughly with the number of workers.
+
+    Directories are identified by (st_dev, st_ino), so symlink loops and bind mounts are
+    only entered once. skip_dir(name) lets the caller prune subdirectories by name, and
+    with IgnoreRules, ignored subdirectories are pruned before they are ever listed.
+    With a ScanIndex, directories that did not change since the last run are not listed;
+    their cached subdirectories are walked instead. A walker runs one walk at a time.
+    """
+    def __init__(self, workers=None, follow_symlinks=False, same_filesystem=False, skip_dir=None,
+                 index=None, ignore=None):
+        if workers is not None and workers < 1:
+            raise ValueError(f"workers must be at least 1, not {workers}")
+        self.workers = workers or min(32, (os.cpu_count() or 1) * 4)
+        self.follow_symlinks = follow_symlinks
+        self.same_filesystem = same_filesystem
+        self.skip_dir = skip_dir
+        self.index = index
+        self.ignore = ignore
+
+    def walk(self, root, handler=None, seeds=None):
+        """
+        Walks root and yields the results of handler(dirpath, files) for every directory,
+        where files is an iterator over the DirEntry of each file in that directory.
+        The handler runs on the worker threads while the directory is being scanned, so
+        subdirectories are already available to other workers before it finishes.
+
+        Without a handler, (dirpath, [file entries]) is yielded once per directory.
+        Directories that cannot be listed produce (dirpath, OSError) tuples. Any other
+        exception the handler raises ends the walk and is raised here.
+
+        seeds resumes an interrupted walk: only those directories (as returned by
+        unfinished()) and their subtrees are walked instead of all of root.
+        """
+        if handler is None:
+            handler = lambda dirpath, files: [(dirpath, list(files))]
+
+        root_stat = os.stat(root)
+        self._root_dev = root_stat.st_dev
+        self._visited = set()
+        self._visited_lock = threading.Lock()
+        self._deques = [deque() for _ in range(self.workers)]
+        self._active = [None] * self.workers
+        self._cond = threading.Condition()
+        self._pending = 0
+        self._stop = threading.Event()
+        self._closed = threading.Event()
+        self._results = queue.Queue(maxsize=self.workers * 256)
+        self._done = object()
+        if seeds is None:
+            self._enqueue(0, root, root_stat)
+        else:
+            for i, path in enumerate(seeds):
+                self._push_cached(i % self.workers, path)
+
+        threads = [
+            threading.Thread(target=self._work, args=(i, handler), daemon=True)
+            for i in range(self.workers)
+        ]
+        for thread in threads:
+            thread.start()
+
+        finished = 0
+        try:
+            while finished < len(threads):
+                item = self._results.get()
+                if item is self._done:
+                    finished += 1
+                elif type(item) is _Raised:
+                    raise item.error
+                else:
+                    yield item
+        finally:
+            # Also reached when the consumer stops early: the workers drop what they are
+            # doing and unfinished() tells which directories are left
+            self._stop.set()
+            self._closed.set()
+            for thread in threads:
+                thread.join()
+
+    def stop(self):
+        """
+        Asks the workers to stop after their current step; the walk then ends once their
+        last results are delivered. Safe to call from any thread.
+        """
+        self._stop.set()
+
+    def unfinished(self):
+        """
+        After a walk was stopped early, the directories that were queued or only partly
+        handled. Passing them as seeds to a later walk covers everything that is left.
+        """
+        paths = [path for dq in self._deques for path, _ in dq]
+        paths.extend(path for path in self._active if path is not None)
+        return paths
+
+    # --- WORKER SIDE ---
+
+    def _work(self, me, handler):
+        try:
+            while not self._stop.is_set():
+                item = self._next_dir(me)
+                if item is None:
+                    with self._cond:
+                        if self._pending == 0:
+                            return
+                        self._cond.wait(0.05)
+                    continue
+                dirpath, st = item
+                try:
+                    if self.index is not None:
+                        ignore_key = self.ignore.matcher(dirpath).key if self.ignore is not None else None
+                        cached = self.index.unchanged_subdirs(dirpath, st, ignore_key)
+                        if cached is not None:
+                            for name in cached:
+                                self._push_cached(me, os.path.join(dirpath, name))
+                            continue
+                    self._active[me] = dirpath
+                    for result in handler(dirpath, self._scan(me, dirpath)):
+                        self._put(result)
+                        if self._stop.is_set():
+                            break
+                    else:
+                        if not self._stop.is_set():
+                            self._active[me] = None
+                except OSError as e:
+                    self._active[me] = None
+                    self._put((dirpath, e))
+                except Exception as e:
+                    # A bug rather than a directory problem: the whole walk fails, instead of
+                    # the results of this directory going missing without a word
+                    self._stop.set()
+                    self._put(_Raised(e))
+                finally:
+                    with self._cond:
+                        self._pending -= 1
+                        if self._pending == 0:
+                            self._cond.notify_all()
+        finally:
+            self._put(self._done)
+
+    def _next_dir(self, me):
+        """
+        Pops local work first, then steals the oldest directory of a random victim.
+        Work items are (path, stat_result) tuples.
+        """
+        try:
+            return self._deques[me].pop()
+        except IndexError:
+            pass
+        count = len(self._deques)
+        start = random.randrange(count)
+        for offset in range(count):
+            try:
+                return self._deques[(start + offset) % count].popleft()
+            except IndexError:
+                continue
+        return None
+
+    def _put(self, result):
+        while not self._closed.is_set():
+            try:
+                self._results.put(result, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def _scan(self, me, dirpath):
+        """Yields the files of dirpath and queues its subdirectories along the way."""
+        with os.scandir(dirpath) as it:
+            for entry in it:
+                try:
+                    if entry.is_dir(follow_symlinks=self.follow_symlinks):
+                        self._push_dir(me, entry)
+                    elif entry.is_file():
+                        yield entry
+                except OSError:
+                    # Vanished or unreadable entry; nothing to organize
+                    continue
+
+    def _push_dir(self, me, entry):
+        if self.skip_dir is not None and self.skip_dir(entry.name):
+            return
+        if self.ignore is not None and self.ignore.matcher(os.path.dirname(entry.path)).ignored(entry.name, True):
+            return
+        self._enqueue(me, entry.path, entry.stat(follow_symlinks=self.follow_symlinks))
+
+    def _push_cached(self, me, path):
+        """Queues a subdirectory known from the index, if it still is one and is not ignored."""
+        if self.ignore is not None and self.ignore.skips_dir(path):
+            return
+        try:
+            st = os.stat(path, follow_symlinks=self.follow_symlinks)
+        except OSError:
+            return
+        if stat.S_ISDIR(st.st_mode):
+            self._enqueue(me, path, st)
+
+    def _enqueue(self, me, path, st):
+        if self.same_filesystem and st.st_dev != self._root_dev:
+            return
+        key = (st.st_dev, st.st_ino)
+        with self._visited_lock:
+            if key in self._visited:
+                return
+            self._visited.add(key)
+        with self._cond:
+            self._pending += 1
+            self._deques[me].append((path, st))
+            self._cond.notify()
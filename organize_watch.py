@@ -0,0 +1,299 @@
+"""
+Directory watchers used by the continuous (watch) organize mode.
+"""
+import ctypes
+import errno
+import os
+import selectors
+import struct
+import sys
+import threading
+import time
+
+from organize_linux import filesystem_type, load_libc
+
+# inotify constants from <sys/inotify.h>
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = getattr(os, "O_CLOEXEC", 0o2000000)
+
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+def inotify_available():
+    """True when the platform provides inotify (Linux only)."""
+    if not sys.platform.startswith("linux"):
+        return False
+    try:
+        return hasattr(load_libc(), "inotify_init1")
+    except OSError:
+        return False
+
+
+# Filesystems on which inotify only sees local changes, if any
+REMOTE_FILESYSTEMS = {
+    "nfs", "nfs4", "cifs", "smb3", "smbfs", "9p", "ceph", "glusterfs", "afs", "lustre",
+    "fuse", "fuseblk", "davfs", "vboxsf", "virtiofs",
+}
+
+
+def is_remote_filesystem(path):
+    fs_type = filesystem_type(path)
+    return fs_type is not None and (fs_type in REMOTE_FILESYSTEMS or fs_type.startswith("fuse."))
+
+
+def create_watcher(directory_path, mode="auto", debounce=0.2, max_delay=1.0):
+    """
+    Picks a watcher for directory_path. mode is "inotify", "poll" or "auto"; the latter
+    uses inotify on local filesystems and polling on network and FUSE mounts, where
+    inotify never hears about changes made by other machines.
+    """
+    if mode == "auto":
+        mode = "inotify" if inotify_available() and not is_remote_filesystem(directory_path) else "poll"
+    if mode == "inotify":
+        if not inotify_available():
+            raise OSError(errno.ENOSYS, "Watching with inotify requires Linux")
+        return InotifyWatcher(directory_path, debounce=debounce, max_delay=max_delay)
+    if mode == "poll":
+        return PollingWatcher(directory_path, debounce=debounce, max_delay=max_delay)
+    raise ValueError(f"Unknown watch mode: {mode}")
+
+
+class InotifyWatcher:
+    """
+    Watches one directory through Linux inotify and reports files that are ready to be
+    organized. Only IN_CLOSE_WRITE and IN_MOVED_TO are used, so files that are still
+    being written are never reported.
+
+    Events are coalesced into batches: a batch is handed out once no new event arrived
+    for `debounce` seconds, but never later than `max_delay` seconds after its first
+    event, so a steady stream of arrivals still gets organized promptly. While idle the
+    watcher blocks in select() and uses no CPU.
+    """
+    MASK = IN_CLOSE_WRITE | IN_MOVED_TO | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR
+
+    # Returned by batches() when the kernel queue overflowed and events were lost
+    RESCAN = None
+
+    def __init__(self, directory_path, debounce=0.2, max_delay=1.0):
+        self.directory_path = directory_path
+        self.debounce = debounce
+        self.max_delay = max_delay
+
+        libc = load_libc()
+        self._fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self._fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err))
+        wd = libc.inotify_add_watch(self._fd, os.fsencode(directory_path), self.MASK)
+        if wd < 0:
+            err = ctypes.get_errno()
+            os.close(self._fd)
+            raise OSError(err, os.strerror(err), directory_path)
+
+        self._wake_r, self._wake_w = os.pipe()
+        self._selector = selectors.DefaultSelector()
+        self._selector.register(self._fd, selectors.EVENT_READ)
+        self._selector.register(self._wake_r, selectors.EVENT_READ)
+        self._stopped = False
+        self._gone = False
+
+    def stop(self):
+        """Makes batches() return. Safe to call from any thread."""
+        self._stopped = True
+        try:
+            os.write(self._wake_w, b"x")
+        except OSError:
+            pass
+
+    def close(self):
+        self._selector.close()
+        for fd in (self._fd, self._wake_r, self._wake_w):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+
+    def batches(self):
+        """
+        Yields sets of file names that arrived in the directory, or RESCAN when events
+        were dropped and the whole directory has to be looked at again. Returns when
+        stop() is called or the directory itself goes away.
+        """
+        pending = set()
+        first = last = 0.0
+        while not self._stopped and not self._gone:
+            if pending:
+                deadline = min(last + self.debounce, first + self.max_delay)
+                timeout = max(deadline - time.monotonic(), 0)
+            else:
+                timeout = None
+
+            overflow = False
+            for key, _ in self._selector.select(timeout):
+                if key.fd == self._wake_r:
+                    return
+                before = len(pending)
+                overflow |= self._read_events(pending)
+                now = time.monotonic()
+                if len(pending) != before:
+                    if before == 0:
+                        first = now
+                    last = now
+
+            if overflow:
+                pending.clear()
+                yield self.RESCAN
+                continue
+
+            now = time.monotonic()
+            if pending and (now >= last + self.debounce or now >= first + self.max_delay):
+                batch, pending = pending, set()
+                yield batch
+
+    def _read_events(self, pending):
+        """Drains the inotify fd into pending. Returns True if the queue overflowed."""
+        overflow = False
+        while True:
+            try:
+                data = os.read(self._fd, 64 * 1024)
+            except BlockingIOError:
+                return overflow
+            offset = 0
+            while offset < len(data):
+                _, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+                offset += _EVENT_HEADER.size
+                name = data[offset:offset + length].rstrip(b"\0")
+                offset += length
+                if mask & IN_Q_OVERFLOW:
+                    overflow = True
+                elif mask & (IN_IGNORED | IN_DELETE_SELF | IN_MOVE_SELF):
+                    self._gone = True
+                elif name and not mask & IN_ISDIR:
+                    pending.add(os.fsdecode(name))
+
+
+class PollingWatcher:
+    """
+    Watches a directory by polling, for mounts that do not deliver inotify events.
+
+    Every poll costs a single stat of the directory as long as its mtime is unchanged;
+    only when it moves is the directory listed and diffed against the previous snapshot.
+    New files are reported once their size and mtime stayed the same for `settle`
+    seconds, the polling equivalent of IN_CLOSE_WRITE. The interval drops to min_interval
+    while files are arriving and backs off by `backoff` per idle poll up to max_interval.
+
+    Settled files are coalesced into batches as in InotifyWatcher: a batch is handed out
+    once no further file settled for `debounce` seconds, but never later than
+    `max_delay` seconds after its first file settled.
+
+    A directory modified within RACY_WINDOW_NS is listed again even if its mtime looks
+    unchanged, because an entry added in the same timestamp tick would not move it.
+    """
+    RESCAN = None
+    RACY_WINDOW_NS = 2 * 10**9
+
+    def __init__(self, directory_path, min_interval=0.25, max_interval=5.0, backoff=1.5, settle=0.5,
+                 debounce=0.2, max_delay=1.0):
+        self.directory_path = directory_path
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.settle = settle
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self.interval = min_interval
+        self._stop = threading.Event()
+        self._mtime_ns = None
+        self._snapshot = set()
+        self._candidates = {}
+        self._take_snapshot()
+
+    def stop(self):
+        """Makes batches() return. Safe to call from any thread."""
+        self._stop.set()
+
+    def close(self):
+        pass
+
+    def batches(self):
+        """Yields sets of file names that arrived and are no longer being written to."""
+        pending = set()
+        first = last = 0.0
+        timeout = self.interval
+        while not self._stop.wait(timeout):
+            try:
+                changed = self._take_snapshot()
+            except FileNotFoundError:
+                return
+            ready = self._settled_candidates()
+            if changed or self._candidates:
+                self.interval = self.min_interval
+            else:
+                self.interval = min(self.interval * self.backoff, self.max_interval)
+
+            now = time.monotonic()
+            if ready - pending:
+                if not pending:
+                    first = now
+                last = now
+                pending |= ready
+            timeout = self.interval
+            if pending:
+                deadline = min(last + self.debounce, first + self.max_delay)
+                if now >= deadline:
+                    batch, pending = pending, set()
+                    yield batch
+                else:
+                    # Wake up in time for the batch instead of after a backed-off interval
+                    timeout = min(timeout, deadline - now)
+
+    def _take_snapshot(self):
+        """
+        Lists the directory if its mtime moved and queues files that were not in the
+        previous snapshot as candidates. Returns True if the set of files changed.
+        """
+        mtime_ns = os.stat(self.directory_path).st_mtime_ns
+        if mtime_ns == self._mtime_ns and time.time_ns() - mtime_ns > self.RACY_WINDOW_NS:
+            return False
+        current = set()
+        with os.scandir(self.directory_path) as it:
+            for entry in it:
+                try:
+                    if not entry.is_file():
+                        continue
+                    current.add(entry.name)
+                    if entry.name not in self._snapshot and self._mtime_ns is not None:
+                        st = entry.stat()
+                        self._candidates[entry.name] = ((st.st_size, st.st_mtime_ns), time.monotonic())
+                except OSError:
+                    continue
+        changed = current != self._snapshot
+        self._snapshot = current
+        self._mtime_ns = mtime_ns
+        return changed
+
+    def _settled_candidates(self):
+        """Returns the candidates whose size and mtime did not change for `settle` seconds."""
+        ready = set()
+        now = time.monotonic()
+        for name, (signature, since) in list(self._candidates.items()):
+            try:
+                st = os.stat(os.path.join(self.directory_path, name))
+            except OSError:
+                del self._candidates[name]
+                continue
+            current = (st.st_size, st.st_mtime_ns)
+            if current != signature:
+                self._candidates[name] = (current, now)
+            elif now - since >= self.settle:
+                ready.add(name)
+                del self._candidates[name]
+        return ready
@@ -0,0 +1,143 @@
+import pytest
+
+from bobnox import FileOrganizer
+from organize_classify import SuffixClassifier
+
+
+@pytest.fixture
+def classifier():
+    return SuffixClassifier(FileOrganizer.EXTENSION_MAP)
+
+
+@pytest.mark.parametrize("name, parts", [
+    ("backup.tar.gz", ("backup", ".tar.gz", "Archives")),
+    ("scan.nii.gz", ("scan", ".nii.gz", "Medical Images")),
+    ("notes.gz", ("notes", ".gz", "Archives")),
+    ("photo.v2.tar.gz", ("photo.v2", ".tar.gz", "Archives")),
+    ("a.b.gz", ("a.b", ".gz", "Archives")),
+    ("BACKUP.TAR.GZ", ("BACKUP", ".TAR.GZ", "Archives")),
+    ("Photo.JpG", ("Photo", ".JpG", "Images")),
+    ("file.xyz", ("file", ".xyz", None)),
+    ("README", ("README", "", None)),
+    (".bashrc", (".bashrc", "", None)),
+    ("..hidden", ("..hidden", "", None)),
+    (".config.json", (".config", ".json", None)),
+    (".tar.gz", (".tar", ".gz", "Archives")),
+    ("a..jpg", ("a.", ".jpg", "Images")),
+])
+def test_split(classifier, name, parts):
+    assert classifier.split(name) == parts
+
+
+@pytest.mark.parametrize("name, folder", [
+    ("backup.tar.gz", "Archives"),
+    ("scan.nii.gz", "Medical Images"),
+    ("SCAN.NII.GZ", "Medical Images"),
+    ("notes.gz", "Archives"),
+    ("Photo.JPG", "Images"),
+    ("photo.jpeg", "Images"),
+    ("file.xyz", "XYZ Files"),
+    ("file.XyZ", "XYZ Files"),
+    ("a.tar.part", "PART Files"),
+    ("README", "Other Files"),
+    (".bashrc", "Other Files"),
+    ("..hidden", "Other Files"),
+    ("...", "Other Files"),
+    ("", "Other Files"),
+    (".hidden.jpg", "Images"),
+    ("a..jpg", "Images"),
+])
+def test_classify_name(classifier, name, folder):
+    # Twice: the second call takes the memoized fast path
+    assert classifier.classify_name(name) == folder
+    assert classifier.classify_name(name) == folder
+
+
+def test_fast_path_never_shortcuts_compound_extensions(classifier):
+    assert classifier.classify_name("notes.gz") == "Archives"
+    assert classifier.classify_name("scan.nii.gz") == "Medical Images"
+    assert classifier.classify_name("x.tar.GZ") == "Archives"
+    # Leading dots are not an extension, however often the same last part was seen
+    assert classifier.classify_name("a.bashrc") == "BASHRC Files"
+    assert classifier.classify_name(".bashrc") == "Other Files"
+
+
+def test_classify_extension(classifier):
+    assert classifier.classify_extension(".png") == "Images"
+    assert classifier.classify_extension(".tar.gz") == "Archives"
+    assert classifier.classify_extension(".abc") == "ABC Files"
+
+
+def test_custom_map_with_overlapping_extensions():
+    classifier = SuffixClassifier({".gz": "Zipped", ".tar.gz": "Tarballs", ".b.tar.gz": "Special"})
+    assert classifier.classify_name("x.gz") == "Zipped"
+    assert classifier.classify_name("x.tar.gz") == "Tarballs"
+    assert classifier.classify_name("x.b.tar.gz") == "Special"
+    assert classifier.classify_name("x.c.tar.gz") == "Tarballs"
+    assert classifier.split("x.c.tar.gz") == ("x.c", ".tar.gz", "Tarballs")
+
+
+NAMES = [
+    "photo.jpg", "PHOTO.JPG", "Photo.JpEg", "backup.tar.gz", "BACKUP.TAR.GZ", "scan.nii.gz", "scan.NII.gz",
+    "notes.gz", "a.b.gz", "x.c.tar.gz", "archive.tar.zst", "file.xyz", "file.XYZ", "README", "", ".", "..",
+    ".bashrc", "..hidden", ".config.json", ".tar.gz", "a..jpg", "a.", "trailing.dot.", "café.jpg",
+    "photo.jpé", "naïve.ÉXT", "日本語.PNG", "file.verylongext", "file.exactly8", "x.12345678.gz",
+    "long.verylongpart.tar.gz", "no_dot_at_all", "dir.v1/file", "tab\t.txt", "space .pdf", "a.tar.GZ",
+    "emoji.😀", "x.gz.tar", "UPPER.TXT", "mixed.TxT", "m.Tar.Bz2",
+]
+
+
+def expected(classifier, names):
+    return [classifier.classify_name(name) for name in names]
+
+
+def folders(codes, table):
+    return [table[code] for code in list(codes)]
+
+
+@pytest.fixture(params=["numpy", "pure Python"])
+def numpy_or_not(request, monkeypatch):
+    import organize_classify
+
+    if request.param == "numpy":
+        if not organize_classify.HAS_NUMPY:
+            pytest.skip("needs NumPy")
+    else:
+        monkeypatch.setattr(organize_classify, "HAS_NUMPY", False)
+    return request.param
+
+
+def test_classify_many_matches_classify_name(classifier, numpy_or_not):
+    codes, table = classifier.classify_many(NAMES)
+    assert len(codes) == len(NAMES)
+    assert folders(codes, table) == expected(SuffixClassifier(FileOrganizer.EXTENSION_MAP), NAMES)
+    # Each folder once in the table
+    assert len(table) == len(set(table))
+
+
+def test_classify_many_empty(classifier, numpy_or_not):
+    codes, table = classifier.classify_many([])
+    assert len(codes) == 0 and table == []
+
+
+def test_classify_many_over_chunks(classifier, monkeypatch, numpy_or_not):
+    monkeypatch.setattr(SuffixClassifier, "CHUNK_SIZE", 5)
+    names = NAMES * 3
+    codes, table = classifier.classify_many(iter(names))
+    assert folders(codes, table) == expected(classifier, names)
+
+
+def test_classify_many_array_input(classifier, monkeypatch):
+    np = pytest.importorskip("numpy")
+    monkeypatch.setattr(SuffixClassifier, "CHUNK_SIZE", 7)
+    codes, table = classifier.classify_many(np.asarray(NAMES))
+    assert folders(codes, table) == expected(classifier, NAMES)
+    assert codes.dtype == np.uint16
+
+
+def test_classify_many_custom_compound_map(numpy_or_not):
+    classifier = SuffixClassifier({".gz": "Zipped", ".tar.gz": "Tarballs", ".b.tar.gz": "Special",
+                                   ".longpart1.gz": "Long"})
+    names = ["x.gz", "x.tar.gz", "x.b.tar.gz", "x.c.tar.gz", "x.B.TAR.GZ", "x.longpart1.gz", "x.tar", "x"]
+    codes, table = classifier.classify_many(names)
+    assert folders(codes, table) == expected(classifier, names)
@@ -0,0 +1,37 @@
+import sys
+
+import pytest
+
+import organize_cli
+
+
+@pytest.mark.parametrize("flags", [
+    ["--incremental"], ["--sniff"], ["--max-memory", "64M"], ["--time-budget", "1m"], ["--scanner", "getdents"],
+    ["--recursive"], ["--watch"],
+])
+def test_paths_from_refuses_options_it_would_ignore(tmp_path, monkeypatch, capsys, flags):
+    monkeypatch.setattr(sys, "argv", ["bobnox", "-p", str(tmp_path), "--paths-from", "-", *flags])
+    with pytest.raises(SystemExit) as raised:
+        organize_cli.main()
+    assert raised.value.code == 2
+    assert flags[0] in capsys.readouterr().err
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_watch_refuses_recursive(tmp_path, monkeypatch, capsys):
+    monkeypatch.setattr(sys, "argv", ["bobnox", "-p", str(tmp_path), "--watch", "--recursive"])
+    with pytest.raises(SystemExit) as raised:
+        organize_cli.main()
+    assert raised.value.code == 2
+    assert "--recursive" in capsys.readouterr().err
+
+
+@pytest.mark.parametrize("flags", [["--walk-threads", "-1"], ["--walk-threads", "0"], ["--workers", "0"],
+                                   ["--workers", "x"]])
+def test_thread_counts_must_be_positive(tmp_path, monkeypatch, capsys, flags):
+    monkeypatch.setattr(sys, "argv", ["bobnox", "-p", str(tmp_path), "--recursive", *flags])
+    with pytest.raises(SystemExit) as raised:
+        organize_cli.main()
+    assert raised.value.code == 2
+    assert flags[0] in capsys.readouterr().err
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,137 @@
+import os
+import time
+
+import pytest
+
+from bobnox import FileOrganizer
+from organize_conflicts import DIR_FDS, NameIndex, content_hash, make_folders
+
+
+def touch(path, data=b"", mtime=None):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as fh:
+        fh.write(data)
+    if mtime is not None:
+        os.utime(path, (mtime, mtime))
+
+
+def organize(directory, strategy):
+    return list(FileOrganizer(conflict=strategy).iter_organize(str(directory)))
+
+
+def test_unknown_strategy():
+    with pytest.raises(ValueError):
+        NameIndex("replace")
+
+
+def test_rename_numbers_past_taken_names(tmp_path):
+    touch(str(tmp_path / "Images" / "a.jpg"), b"old")
+    touch(str(tmp_path / "Images" / "a (1).jpg"), b"old 1")
+    touch(str(tmp_path / "Archives" / "b.tar.gz"))
+    touch(str(tmp_path / "a.jpg"), b"new")
+    touch(str(tmp_path / "b.tar.gz"))
+    events = organize(tmp_path, "rename")
+    assert sorted(os.path.basename(event.destination) for event in events) == ["a (2).jpg", "b (1).tar.gz"]
+    with open(tmp_path / "Images" / "a (2).jpg", "rb") as fh:
+        assert fh.read() == b"new"
+    with open(tmp_path / "Images" / "a.jpg", "rb") as fh:
+        assert fh.read() == b"old"
+
+
+def test_rename_hands_out_each_number_once(tmp_path):
+    touch(str(tmp_path / "Images" / "a.jpg"))
+    index = NameIndex("rename")
+    try:
+        folder = index.folder(str(tmp_path), "Images")
+        claimed = [index.claim(folder, "a.jpg", None) for _ in range(3)]
+        assert claimed == [("a (1).jpg", False), ("a (2).jpg", False), ("a (3).jpg", False)]
+        index.release(folder, "a (2).jpg")
+        assert index.claim(folder, "a (2).jpg", None) == ("a (2).jpg", False)
+    finally:
+        index.close()
+
+
+def test_skip_leaves_the_file(tmp_path):
+    touch(str(tmp_path / "Images" / "a.jpg"), b"old")
+    touch(str(tmp_path / "a.jpg"), b"new")
+    [event] = organize(tmp_path, "skip")
+    assert event.destination is None and isinstance(event.error, FileExistsError)
+    assert os.path.exists(tmp_path / "a.jpg")
+    with open(tmp_path / "Images" / "a.jpg", "rb") as fh:
+        assert fh.read() == b"old"
+
+
+@pytest.mark.parametrize("source_mtime, moved", [(2_000_000_000, True), (1_000_000_000, False)])
+def test_overwrite_if_newer(tmp_path, source_mtime, moved):
+    touch(str(tmp_path / "Images" / "a.jpg"), b"old", mtime=1_500_000_000)
+    touch(str(tmp_path / "a.jpg"), b"new", mtime=source_mtime)
+    [event] = organize(tmp_path, "overwrite-if-newer")
+    assert (event.error is None) == moved
+    assert os.path.exists(tmp_path / "a.jpg") != moved
+    assert os.listdir(tmp_path / "Images") == ["a.jpg"]
+    with open(tmp_path / "Images" / "a.jpg", "rb") as fh:
+        assert fh.read() == (b"new" if moved else b"old")
+
+
+def test_hash_suffix(tmp_path):
+    touch(str(tmp_path / "Images" / "a.jpg"), b"old")
+    touch(str(tmp_path / "a.jpg"), b"new")
+    [event] = organize(tmp_path, "hash-suffix")
+    hashed = f"a ({content_hash(event.destination)}).jpg"
+    assert event.destination == str(tmp_path / "Images" / hashed)
+
+    # The same content again is a duplicate and stays where it is
+    touch(str(tmp_path / "a.jpg"), b"new")
+    [event] = organize(tmp_path, "hash-suffix")
+    assert isinstance(event.error, FileExistsError)
+    assert sorted(os.listdir(tmp_path / "Images")) == sorted(["a.jpg", hashed])
+
+
+@pytest.mark.parametrize("recursive", [False, True])
+def test_skipped_files_are_not_reported_again_by_incremental_runs(tmp_path, recursive):
+    # Not tmp_path itself, which holds the cache
+    tmp_path = tmp_path / "inbox"
+    touch(str(tmp_path / "Images" / "a.jpg"), b"old")
+    touch(str(tmp_path / "a.jpg"), b"new", mtime=1_000_000_000)
+    organizer = FileOrganizer(conflict="skip")
+    [event] = organizer.iter_organize(str(tmp_path), incremental=True, recursive=recursive)
+    assert isinstance(event.error, FileExistsError)
+    for _ in range(2):
+        assert list(organizer.iter_organize(str(tmp_path), incremental=True, recursive=recursive)) == []
+    assert os.path.exists(tmp_path / "a.jpg")
+
+    # A new file makes the directory change; the skipped one stays seen
+    touch(str(tmp_path / "b.jpg"))
+    events = list(organizer.iter_organize(str(tmp_path), incremental=True, recursive=recursive))
+    assert [event.name for event in events] == ["b.jpg"]
+
+
+@pytest.mark.skipif(not DIR_FDS, reason="needs dir_fd support")
+@pytest.mark.parametrize("options", [dict(), dict(max_memory=1 << 40)])
+def test_folders_are_created_relative_to_the_directory_fd(tmp_path, monkeypatch, options):
+    from organize_template import PathTemplate
+
+    touch(str(tmp_path / "inbox" / "a.jpg"), mtime=1_000_000_000)
+    touch(str(tmp_path / "inbox" / "b.pdf"), mtime=1_000_000_000)
+
+    def no_paths(*args, **kwargs):
+        raise AssertionError("created by path")
+    monkeypatch.setattr(os, "makedirs", no_paths)
+    organizer = FileOrganizer(template=PathTemplate("{category}/{year}/{month}"))
+    events = list(organizer.iter_organize(str(tmp_path / "inbox"), **options))
+    assert all(event.error is None for event in events)
+    year, month = time.strftime("%Y %m", time.localtime(1_000_000_000)).split()
+    assert os.path.exists(tmp_path / "inbox" / "Images" / year / month / "a.jpg")
+    assert os.path.exists(tmp_path / "inbox" / "Documents" / year / month / "b.pdf")
+
+
+@pytest.mark.parametrize("dir_fds", [True, False] if DIR_FDS else [False])
+def test_make_folders(tmp_path, dir_fds):
+    touch(str(tmp_path / "blocked"))
+    failed = make_folders(str(tmp_path), ["A/B/C", "A/D", "blocked/E", "A"], dir_fds)
+    assert failed == ["blocked/E"]
+    assert sorted(os.listdir(tmp_path / "A")) == ["B", "D"]
+    assert os.path.isdir(tmp_path / "A" / "B" / "C")
+    if dir_fds:
+        # Folders only ever go inside a directory being organized, which exists
+        assert make_folders(str(tmp_path / "missing"), ["X"], dir_fds) == ["X"]
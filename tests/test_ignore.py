@@ -0,0 +1,114 @@
+import os
+
+import pytest
+
+from bobnox import FileOrganizer
+from organize_ignore import IGNORE_FILE, IgnoreRules, translate
+
+
+def write(path, text=""):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as fh:
+        fh.write(text)
+
+
+def rules_for(tmp_path, files):
+    for rel, text in files.items():
+        write(str(tmp_path / rel), text)
+    return IgnoreRules(str(tmp_path))
+
+
+@pytest.mark.parametrize("lines", ["", "   ", "# comment", "/", "!"])
+def test_blank_and_comment_lines(lines):
+    assert translate(lines) is None
+
+
+@pytest.mark.parametrize("pattern, path, is_dir, expected", [
+    ("*.part", "a.part", False, True),
+    ("*.part", "sub/deep/a.part", False, True),
+    ("*.part", "a.part.txt", False, False),
+    ("build/", "build", True, True),
+    ("build/", "build", False, False),
+    ("build/", "src/build", True, True),
+    ("/top.txt", "top.txt", False, True),
+    ("/top.txt", "sub/top.txt", False, False),
+    ("doc/*.txt", "doc/a.txt", False, True),
+    ("doc/*.txt", "doc/sub/a.txt", False, False),
+    ("doc/**/*.txt", "doc/sub/deep/a.txt", False, True),
+    ("**/logs", "a/b/logs", True, True),
+    ("a?c", "abc", False, True),
+    ("a?c", "a/c", False, False),
+    ("[!x]*.log", "y.log", False, True),
+    ("[!x]*.log", "x.log", False, False),
+    ("\\#hash", "#hash", False, True),
+    ("\\!bang", "!bang", False, True),
+    ("trailing\\ ", "trailing ", False, True),
+])
+def test_pattern_matching(tmp_path, pattern, path, is_dir, expected):
+    rules = rules_for(tmp_path, {IGNORE_FILE: pattern + "\n"})
+    assert rules.ignored(str(tmp_path / path), is_dir) is expected
+
+
+def test_last_matching_pattern_wins(tmp_path):
+    rules = rules_for(tmp_path, {IGNORE_FILE: "*.log\n!keep.log\n"})
+    assert rules.ignored(str(tmp_path / "a.log"))
+    assert not rules.ignored(str(tmp_path / "keep.log"))
+
+
+def test_nested_file_applies_below_its_directory(tmp_path):
+    rules = rules_for(tmp_path, {IGNORE_FILE: "*.tmp\n", "sub/" + IGNORE_FILE: "!b.tmp\n/local.txt\n"})
+    assert rules.ignored(str(tmp_path / "b.tmp"))
+    assert not rules.ignored(str(tmp_path / "sub" / "b.tmp"))
+    assert rules.ignored(str(tmp_path / "sub" / "a.tmp"))
+    assert rules.ignored(str(tmp_path / "sub" / "local.txt"))
+    assert not rules.ignored(str(tmp_path / "local.txt"))
+
+
+def test_ignored_directory_ignores_its_content(tmp_path):
+    rules = rules_for(tmp_path, {IGNORE_FILE: "cache/\n"})
+    assert rules.skips_dir(str(tmp_path / "cache"))
+    assert rules.ignored(str(tmp_path / "cache" / "a.jpg"))
+
+
+def test_defaults_can_be_negated(tmp_path):
+    assert rules_for(tmp_path, {}).ignored(str(tmp_path / "bobnox-log-20260101-000000.txt"))
+    rules = rules_for(tmp_path, {IGNORE_FILE: "!bobnox-log-*.txt\n"})
+    assert not rules.ignored(str(tmp_path / "bobnox-log-20260101-000000.txt"))
+
+
+def test_matcher_key_follows_the_rules(tmp_path):
+    first = rules_for(tmp_path, {IGNORE_FILE: "*.part\n"}).matcher(str(tmp_path)).key
+    assert IgnoreRules(str(tmp_path)).matcher(str(tmp_path)).key == first
+    write(str(tmp_path / IGNORE_FILE), "*.tmp\n")
+    assert IgnoreRules(str(tmp_path)).matcher(str(tmp_path)).key != first
+
+
+@pytest.mark.parametrize("recursive", [False, True])
+def test_incremental_run_notices_removed_pattern(tmp_path, recursive):
+    root = tmp_path / "root"
+    write(str(root / IGNORE_FILE), "*.part\n")
+    write(str(root / "keep.part"))
+    write(str(root / "a.jpg"))
+    organizer = FileOrganizer()
+    list(organizer.iter_organize(str(root), incremental=True, recursive=recursive))
+    assert (root / "keep.part").exists()
+    assert (root / "Images" / "a.jpg").exists()
+
+    write(str(root / IGNORE_FILE), "# nothing ignored any more\n")
+    list(organizer.iter_organize(str(root), incremental=True, recursive=recursive))
+    assert not (root / "keep.part").exists()
+    assert (root / "PART Files" / "keep.part").exists()
+
+
+def test_incremental_run_notices_parent_ignore_change(tmp_path):
+    root = tmp_path / "root"
+    write(str(root / IGNORE_FILE), "*.part\n")
+    write(str(root / "sub" / "keep.part"))
+    organizer = FileOrganizer()
+    list(organizer.iter_organize(str(root), incremental=True, recursive=True))
+    assert (root / "sub" / "keep.part").exists()
+
+    # The subdirectory itself does not change, only the rules it inherits
+    write(str(root / IGNORE_FILE), "")
+    list(organizer.iter_organize(str(root), incremental=True, recursive=True))
+    assert (root / "sub" / "PART Files" / "keep.part").exists()
@@ -0,0 +1,88 @@
+import random
+
+import pytest
+
+from organize_keywords import KeywordRouter
+
+
+def router(*keywords, ignore_case=True):
+    return KeywordRouter([(keyword, keyword.upper(), priority) for keyword, priority in keywords], ignore_case)
+
+
+def test_no_match():
+    assert router(("invoice", 0)).match("holiday.jpg") is None
+    assert KeywordRouter([]).match("anything") is None
+
+
+def test_empty_keyword():
+    with pytest.raises(ValueError):
+        KeywordRouter([("", "Folder", 0)])
+
+
+def test_priority_wins_over_length_and_position():
+    keywords = router(("scan", 10), ("screenshot", 0))
+    assert keywords.match("screenshot scan.png") == "SCAN"
+    assert keywords.match("scan screenshot.png") == "SCAN"
+
+
+def test_longest_keyword_wins_among_equal_priorities():
+    keywords = router(("img", 0), ("img_2026", 0))
+    assert keywords.match("IMG_2026_01.jpg") == "IMG_2026"
+    assert keywords.match("img_2025.jpg") == "IMG"
+
+
+def test_first_keyword_found_wins_among_equal_ones():
+    keywords = router(("cat", 0), ("dog", 0))
+    assert keywords.match("dog and cat.jpg") == "DOG"
+    assert keywords.match("cat and dog.jpg") == "CAT"
+    # The same keyword twice: the first one listed keeps it
+    assert KeywordRouter([("x", "First", 0), ("x", "Second", 0)]).match("x") == "First"
+    assert KeywordRouter([("x", "Low", 0), ("x", "High", 1)]).match("x") == "High"
+
+
+def test_case():
+    assert router(("Invoice", 0)).match("INVOICE-7.pdf") == "INVOICE"
+    keywords = router(("Invoice", 0), ignore_case=False)
+    assert keywords.match("INVOICE-7.pdf") is None
+    assert keywords.match("my Invoice.pdf") == "INVOICE"
+
+
+@pytest.mark.parametrize("name, folder", [
+    ("ushers", "HERS"),
+    ("usher", "SHE"),
+    ("ahis", "HIS"),
+    ("shis", "HIS"),
+    ("xhe", "HE"),
+    ("hhers", "HERS"),
+    ("sh", None),
+])
+def test_overlapping_keywords_follow_failure_links(name, folder):
+    assert router(("he", 0), ("she", 0), ("his", 0), ("hers", 0)).match(name) == folder
+
+
+def test_keyword_inside_a_longer_one_counts_through_the_failure_link():
+    # 'she' is never completed, but the 'he' it contains ends at the failure state
+    assert router(("shed", 0), ("he", 1)).match("shex") == "HE"
+    assert router(("abcd", 0), ("bc", 0)).match("abcx") == "BC"
+
+
+def reference(keywords, name):
+    """Brute force: the best keyword by (priority, length), the first found on ties."""
+    best = None
+    for end in range(1, len(name) + 1):
+        for keyword, folder, priority in keywords:
+            if name[:end].endswith(keyword) and (best is None or (priority, len(keyword)) > best[:2]):
+                best = (priority, len(keyword), folder)
+    return best[2] if best is not None else None
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_random_keywords_match_brute_force(seed):
+    rng = random.Random(seed)
+    alphabet = "abc"
+    keywords = [("".join(rng.choice(alphabet) for _ in range(rng.randint(1, 4))), f"F{i}", rng.randint(0, 2))
+                for i in range(rng.randint(1, 12))]
+    automaton = KeywordRouter(keywords, ignore_case=False)
+    for _ in range(200):
+        name = "".join(rng.choice(alphabet + "x") for _ in range(rng.randint(0, 12)))
+        assert automaton.match(name) == reference(keywords, name), (keywords, name)
@@ -0,0 +1,196 @@
+import os
+import struct
+import time
+
+import pytest
+
+from organize_media import MP4_EPOCH_OFFSET, MediaReader, read_metadata
+
+
+def write(path, data):
+    with open(path, "wb") as fh:
+        fh.write(data)
+    # Old enough to be cached
+    os.utime(path, (1_000_000_000, 1_000_000_000))
+    return str(path)
+
+
+# --- JPEG / EXIF ---
+
+def tiff(order="little", date_time=None, original=None):
+    """A TIFF header with IFD0 and, for original, an Exif IFD with DateTimeOriginal."""
+    pack = (lambda fmt, *values: struct.pack(("<" if order == "little" else ">") + fmt, *values))
+    ifd0, exif, extra = [], [], b""
+    # Header (8) + IFD0 (2 + 12 * n + 4) + Exif IFD (2 + 12 + 4), then the strings
+    n0 = (date_time is not None) + (original is not None)
+    strings_at = 8 + 2 + 12 * n0 + 4 + (18 if original is not None else 0)
+    if date_time is not None:
+        ifd0.append(pack("HHI", 0x0132, 2, 20) + pack("I", strings_at + len(extra)))
+        extra += date_time + b"\0"
+    if original is not None:
+        ifd0.append(pack("HHI", 0x8769, 4, 1) + pack("I", 8 + 2 + 12 * n0 + 4))
+        exif.append(pack("HHI", 0x9003, 2, 20) + pack("I", strings_at + len(extra)))
+        extra += original + b"\0"
+    data = (b"II" if order == "little" else b"MM") + pack("HI", 42, 8)
+    data += pack("H", len(ifd0)) + b"".join(ifd0) + pack("I", 0)
+    if exif:
+        data += pack("H", len(exif)) + b"".join(exif) + pack("I", 0)
+    return data + extra
+
+
+def jpeg(exif):
+    app0 = b"\xff\xe0" + struct.pack(">H", 16) + b"JFIF\0" + b"\0" * 9
+    app1 = b"\xff\xe1" + struct.pack(">H", len(exif) + 8) + b"Exif\0\0" + exif
+    return b"\xff\xd8" + app0 + app1 + b"\xff\xda\0\x02" + b"\0" * 64
+
+
+@pytest.mark.parametrize("order", ["little", "big"])
+def test_jpeg_exif_prefers_the_original_date(tmp_path, order):
+    data = jpeg(tiff(order, b"2026:01:02 03:04:05", b"2025:10:17 12:00:00"))
+    assert read_metadata(write(tmp_path / "a.jpg", data), "jpeg") == {"date": [2025, 10, 17]}
+
+
+def test_jpeg_exif_falls_back_to_datetime(tmp_path):
+    data = jpeg(tiff("little", b"2026:01:02 03:04:05"))
+    assert read_metadata(write(tmp_path / "a.jpg", data), "jpeg") == {"date": [2026, 1, 2]}
+
+
+def test_jpeg_exif_zero_date(tmp_path):
+    data = jpeg(tiff("little", b"0000:00:00 00:00:00"))
+    assert read_metadata(write(tmp_path / "a.jpg", data), "jpeg") == {}
+
+
+# --- ID3 ---
+
+def syncsafe(n):
+    return bytes((n >> shift) & 0x7F for shift in (21, 14, 7, 0))
+
+
+def id3v2(frames, major=3):
+    body = b""
+    for frame_id, text in frames:
+        payload = b"\x03" + text.encode("utf-8")
+        size = syncsafe(len(payload)) if major == 4 else struct.pack(">I", len(payload))
+        body += frame_id + size + b"\0\0" + payload
+    body += b"\0" * 32
+    return b"ID3" + bytes([major, 0, 0]) + syncsafe(len(body)) + body
+
+
+def id3v1(artist, album, year):
+    return (b"TAG" + b"title".ljust(30, b"\0") + artist.ljust(30, b"\0") + album.ljust(30, b"\0")
+            + year + b"\0" * 31)
+
+
+@pytest.mark.parametrize("major", [3, 4])
+def test_id3v2(tmp_path, major):
+    data = id3v2([(b"APIC", "x" * 100), (b"TPE1", "Artist"), (b"TALB", "Album"), (b"TDRC", "2024-05-06")], major)
+    assert read_metadata(write(tmp_path / "a.mp3", data + b"\xff\xfb" * 100), "id3") == {
+        "artist": "Artist", "album": "Album", "date": [2024, 5, 6]}
+
+
+def test_id3v1(tmp_path):
+    data = b"\xff\xfb" * 200 + id3v1(b"Old Artist", b"Old Album", b"1999")
+    assert read_metadata(write(tmp_path / "a.mp3", data), "id3") == {
+        "artist": "Old Artist", "album": "Old Album", "date": [1999]}
+
+
+def test_id3v1_behind_an_empty_id3v2_tag(tmp_path):
+    data = id3v2([]) + b"\xff\xfb" * 200 + id3v1(b"Old Artist", b"", b"    ")
+    assert read_metadata(write(tmp_path / "a.mp3", data), "id3") == {"artist": "Old Artist"}
+
+
+# --- MP4 ---
+
+def atom(kind, body):
+    return struct.pack(">I", len(body) + 8) + kind + body
+
+
+def mvhd(seconds, version=0):
+    if version == 1:
+        return atom(b"mvhd", b"\x01\0\0\0" + struct.pack(">QQ", seconds, seconds) + b"\0" * 88)
+    return atom(b"mvhd", b"\0\0\0\0" + struct.pack(">II", seconds, seconds) + b"\0" * 88)
+
+
+def udta(**tags):
+    names = {"artist": b"\xa9ART", "album": b"\xa9alb", "date": b"\xa9day"}
+    items = b"".join(atom(names[field], atom(b"data", b"\0\0\0\x01\0\0\0\0" + value.encode()))
+                     for field, value in tags.items())
+    hdlr = atom(b"hdlr", b"\0" * 8 + b"mdir" + b"\0" * 13)
+    return atom(b"udta", atom(b"meta", b"\0\0\0\0" + hdlr + atom(b"ilst", items)))
+
+
+def mp4(*moov):
+    return atom(b"ftyp", b"isom\0\0\0\0isom") + atom(b"mdat", b"\0" * 1000) + atom(b"moov", b"".join(moov))
+
+
+def mp4_seconds(year, month, day):
+    return int(time.mktime((year, month, day, 12, 0, 0, 0, 0, -1))) + MP4_EPOCH_OFFSET
+
+
+@pytest.mark.parametrize("version", [0, 1])
+def test_mp4_mvhd_date(tmp_path, version):
+    data = mp4(mvhd(mp4_seconds(2023, 7, 8), version))
+    assert read_metadata(write(tmp_path / "a.mp4", data), "mp4") == {"date": [2023, 7, 8]}
+
+
+def test_mp4_udta_wins_over_mvhd(tmp_path):
+    data = mp4(mvhd(mp4_seconds(2023, 7, 8)), udta(artist="Band", album="Live", date="2020-01-02T10:00:00Z"))
+    assert read_metadata(write(tmp_path / "a.m4a", data), "mp4") == {
+        "artist": "Band", "album": "Live", "date": [2020, 1, 2]}
+
+
+@pytest.mark.parametrize("seconds", [0, 0xFFFFFFFFFFFFFFF0, MP4_EPOCH_OFFSET + 10**13])
+def test_mp4_corrupt_mvhd_date(tmp_path, seconds):
+    data = mp4(mvhd(seconds, version=1), udta(artist="Band"))
+    assert read_metadata(write(tmp_path / "a.mp4", data), "mp4") == {"artist": "Band"}
+
+
+# --- Broken input ---
+
+@pytest.mark.parametrize("fmt, data", [
+    ("jpeg", jpeg(tiff("little", b"2026:01:02 03:04:05"))),
+    ("tiff", tiff("big", b"2026:01:02 03:04:05", b"2025:10:17 12:00:00")),
+    ("id3", id3v2([(b"TPE1", "Artist"), (b"TDRC", "2024")], 4)),
+    ("mp4", mp4(mvhd(mp4_seconds(2023, 7, 8)), udta(artist="Band"))),
+])
+def test_truncated_and_corrupt_files(tmp_path, fmt, data):
+    path = str(tmp_path / "a")
+    for cut in range(0, len(data), 7):
+        assert isinstance(read_metadata(write(path, data[:cut]), fmt), dict)
+    for i in range(0, len(data), 5):
+        corrupt = data[:i] + bytes([data[i] ^ 0xFF]) + data[i + 1:]
+        assert isinstance(read_metadata(write(path, corrupt), fmt), dict)
+
+
+def test_missing_file(tmp_path):
+    assert read_metadata(str(tmp_path / "gone.jpg"), "jpeg") == {}
+
+
+# --- Cache ---
+
+class Entry:
+    def __init__(self, path):
+        self.path = path
+        self.name = os.path.basename(path)
+
+    def stat(self):
+        return os.stat(self.path)
+
+
+@pytest.mark.parametrize("workers", [1, 4])
+def test_cache_drops_files_that_are_gone(tmp_path, workers):
+    cache = str(tmp_path / "media.json")
+    data = mp4(mvhd(mp4_seconds(2023, 7, 8)))
+    names = ["kept.mp4", "deleted.mp4", "moved.mp4"]
+    reader = MediaReader.load(cache, workers=workers)
+    for name in names:
+        assert reader.read(Entry(write(tmp_path / name, data)), "mp4") == {"date": [2023, 7, 8]}
+    reader.save()
+
+    os.remove(tmp_path / "deleted.mp4")
+    os.rename(tmp_path / "moved.mp4", tmp_path / "elsewhere.mp4")
+    reader = MediaReader.load(cache, workers=workers)
+    assert len(reader._cache) == 3
+    reader.save()
+    reader = MediaReader.load(cache, workers=workers)
+    assert [entry[3] for entry in reader._cache.values()] == [str(tmp_path / "kept.mp4")]
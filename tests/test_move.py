@@ -0,0 +1,111 @@
+import errno
+import os
+
+import pytest
+
+import bobnox
+from bobnox import FileOrganizer
+from organize_linux import rename_noreplace, renameat2_available
+
+
+def touch(path, data=b""):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as fh:
+        fh.write(data)
+
+
+def read(path):
+    with open(path, "rb") as fh:
+        return fh.read()
+
+
+@pytest.mark.skipif(not renameat2_available(), reason="needs renameat2")
+def test_rename_noreplace(tmp_path):
+    touch(str(tmp_path / "a"), b"a")
+    touch(str(tmp_path / "b"), b"b")
+    with pytest.raises(FileExistsError):
+        rename_noreplace(str(tmp_path / "a"), str(tmp_path / "b"))
+    assert read(tmp_path / "a") == b"a" and read(tmp_path / "b") == b"b"
+    assert rename_noreplace(str(tmp_path / "a"), str(tmp_path / "c"))
+    assert read(tmp_path / "c") == b"a" and not os.path.exists(tmp_path / "a")
+
+
+def appearing(monkeypatch, rename):
+    """Patches rename_noreplace so that a file turns up at the first destination just before the move."""
+    calls = []
+
+    def rename_after_another(source, destination, src_dir_fd=None, dst_dir_fd=None):
+        if not calls:
+            with open(destination, "wb", opener=lambda path, flags: os.open(path, flags, dir_fd=dst_dir_fd)) as fh:
+                fh.write(b"theirs")
+        calls.append(destination)
+        return rename(source, destination, src_dir_fd, dst_dir_fd)
+    monkeypatch.setattr(bobnox, "rename_noreplace", rename_after_another)
+    return calls
+
+
+def refusing(source, destination, src_dir_fd=None, dst_dir_fd=None):
+    # What renameat2 does when the destination exists
+    try:
+        os.stat(destination, dir_fd=dst_dir_fd, follow_symlinks=False)
+    except FileNotFoundError:
+        pass
+    else:
+        raise FileExistsError(errno.EEXIST, os.strerror(errno.EEXIST), destination)
+    os.rename(source, destination, src_dir_fd=src_dir_fd, dst_dir_fd=dst_dir_fd)
+    return True
+
+
+@pytest.mark.parametrize("rename", [
+    refusing,
+    pytest.param(rename_noreplace, marks=pytest.mark.skipif(not renameat2_available(), reason="needs renameat2")),
+])
+def test_file_appearing_after_the_listing_is_kept(tmp_path, monkeypatch, rename):
+    touch(str(tmp_path / "a.jpg"), b"ours")
+    calls = appearing(monkeypatch, rename)
+    [event] = FileOrganizer().iter_organize(str(tmp_path))
+    assert event.error is None
+    assert os.path.basename(event.destination) == "a (1).jpg"
+    assert len(calls) == 2
+    assert read(tmp_path / "Images" / "a.jpg") == b"theirs"
+    assert read(tmp_path / "Images" / "a (1).jpg") == b"ours"
+
+
+def test_file_appearing_is_skipped_by_skip(tmp_path, monkeypatch):
+    touch(str(tmp_path / "a.jpg"), b"ours")
+    appearing(monkeypatch, refusing)
+    [event] = FileOrganizer(conflict="skip").iter_organize(str(tmp_path))
+    assert isinstance(event.error, FileExistsError)
+    assert read(tmp_path / "a.jpg") == b"ours"
+    assert read(tmp_path / "Images" / "a.jpg") == b"theirs"
+
+
+@pytest.fixture
+def cross_device(monkeypatch):
+    """Makes every rename fail as it does between filesystems."""
+    def exdev(*args, **kwargs):
+        raise OSError(errno.EXDEV, os.strerror(errno.EXDEV))
+    monkeypatch.setattr(bobnox, "rename_noreplace", exdev)
+    monkeypatch.setattr(os, "rename", exdev)
+    monkeypatch.setattr(os, "replace", exdev)
+
+
+def test_cross_device_moves_copy(tmp_path, cross_device):
+    touch(str(tmp_path / "a.jpg"), b"one")
+    touch(str(tmp_path / "Images" / "b.jpg"), b"old")
+    touch(str(tmp_path / "b.jpg"), b"two")
+    events = list(FileOrganizer().iter_organize(str(tmp_path)))
+    assert all(event.error is None for event in events)
+    assert sorted(os.listdir(tmp_path / "Images")) == ["a.jpg", "b (1).jpg", "b.jpg"]
+    assert read(tmp_path / "Images" / "a.jpg") == b"one"
+    assert read(tmp_path / "Images" / "b (1).jpg") == b"two"
+    assert read(tmp_path / "Images" / "b.jpg") == b"old"
+    assert not os.path.exists(tmp_path / "a.jpg") and not os.path.exists(tmp_path / "b.jpg")
+
+
+def test_cross_device_move_never_replaces(tmp_path, cross_device):
+    touch(str(tmp_path / "a"), b"new")
+    touch(str(tmp_path / "b"), b"old")
+    with pytest.raises(FileExistsError):
+        FileOrganizer._move_file(str(tmp_path / "a"), str(tmp_path / "b"))
+    assert read(tmp_path / "a") == b"new" and read(tmp_path / "b") == b"old"
@@ -0,0 +1,178 @@
+import os
+
+import pytest
+
+from bobnox import FileOrganizer
+
+
+def touch(path, data=b""):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as fh:
+        fh.write(data)
+
+
+def files_in(root):
+    return sorted(os.path.relpath(os.path.join(dirpath, name), root)
+                  for dirpath, _, names in os.walk(root) for name in names)
+
+
+def test_category_folders():
+    organizer = FileOrganizer()
+    for name in ["Images", "Documents", "Other Files", "XYZ Files", "7Z Files"]:
+        assert organizer.is_category_folder(name), name
+    for name in ["Program Files", "Project Files", "My Files", "Xyz Files", " Files", "A B Files", "proj"]:
+        assert not organizer.is_category_folder(name), name
+
+
+def test_recursive_run_enters_user_folders_named_files(tmp_path):
+    for folder in ["Program Files", "Project Files", "proj", "XYZ Files"]:
+        touch(str(tmp_path / folder / "photo.jpg"))
+    list(FileOrganizer().iter_organize(str(tmp_path), recursive=True))
+    assert files_in(tmp_path) == [
+        "Program Files/Images/photo.jpg",
+        "Project Files/Images/photo.jpg",
+        "XYZ Files/photo.jpg",
+        "proj/Images/photo.jpg",
+    ]
+
+
+def test_paths_from_a_finished_template_run_stay_put(tmp_path):
+    from organize_template import PathTemplate
+
+    touch(str(tmp_path / "a.jpg"))
+    touch(str(tmp_path / "b.pdf"))
+    touch(str(tmp_path / "inbox" / "c.jpg"))
+    organizer = FileOrganizer(template=PathTemplate("{category}/{year}/{month}"))
+    list(organizer.iter_organize(str(tmp_path)))
+    organized = files_in(tmp_path)
+
+    paths = [os.path.join(tmp_path, rel) for rel in organized if not rel.startswith("inbox")]
+    assert list(organizer.iter_organize_paths(paths, root=str(tmp_path))) == []
+    assert list(organizer.iter_organize_paths(paths)) == []
+    assert files_in(tmp_path) == organized
+
+    events = list(organizer.iter_organize_paths(["inbox/c.jpg"], root=str(tmp_path)))
+    assert [event.name for event in events] == ["c.jpg"]
+    assert events[0].destination.startswith(str(tmp_path / "inbox" / "Images"))
+
+
+def test_paths_below_nested_rule_folders_stay_put(tmp_path):
+    from organize_rules import RuleSet
+
+    rules = RuleSet.from_config({"rules": [{"folder": "Docs/Invoices", "extension": ".pdf"}]})
+    touch(str(tmp_path / "Docs" / "Invoices" / "x.pdf"))
+    organizer = FileOrganizer(rules)
+    assert list(organizer.iter_organize_paths([str(tmp_path / "Docs" / "Invoices" / "x.pdf")])) == []
+
+
+def open_fds():
+    return len(os.listdir("/proc/self/fd")) if os.path.isdir("/proc/self/fd") else None
+
+
+def test_alternating_paths_list_each_folder_once(tmp_path, monkeypatch):
+    import organize_conflicts
+
+    paths = []
+    for d in ("a", "b"):
+        for i in range(100):
+            touch(str(tmp_path / d / f"f{i}.jpg"))
+    for i in range(100):
+        paths += [str(tmp_path / "a" / f"f{i}.jpg"), str(tmp_path / "b" / f"f{i}.jpg")]
+    listings = []
+    real_scandir = os.scandir
+
+    def counting_scandir(path="."):
+        listings.append(path)
+        return real_scandir(path)
+    monkeypatch.setattr(organize_conflicts.os, "scandir", counting_scandir)
+    events = list(FileOrganizer().iter_organize_paths(paths))
+    assert len(events) == 200 and all(event.error is None for event in events)
+    # One listing (or creation) of Images per directory
+    assert len(listings) <= 2
+
+
+def test_paths_keep_a_bounded_number_of_directories_open(tmp_path):
+    organizer = FileOrganizer()
+    paths = []
+    for d in range(organizer.OPEN_DIRECTORIES * 3):
+        touch(str(tmp_path / f"d{d}" / "a.jpg"))
+        paths.append(str(tmp_path / f"d{d}" / "a.jpg"))
+    before = open_fds()
+    most = 0
+    for _ in organizer.iter_organize_paths(paths):
+        if before is not None:
+            most = max(most, open_fds() - before)
+    assert most <= 2 * organizer.OPEN_DIRECTORIES
+    assert open_fds() == before
+
+
+def test_moves_key_ignores_every_conflict_suffix(tmp_path):
+    from organize_executor import KeyedExecutor
+    from bobnox import _FileEntry
+
+    organizer = FileOrganizer()
+    movers = KeyedExecutor(2)
+    try:
+        keys = {organizer._move_job(str(tmp_path), _FileEntry(str(tmp_path), name), None, "Images", 0, movers)[0]
+                for name in ["a.jpg", "a (1).jpg", "a (1) (1).jpg", "a (2) (1a2b3c4d).jpg"]}
+    finally:
+        movers.shutdown()
+    assert keys == {(str(tmp_path), "Images", "a")}
+
+
+def test_workers_for_names_and_paths(tmp_path):
+    names = [f"photo{i % 3}.jpg" for i in range(3)] + [f"doc{i}.pdf" for i in range(6)]
+    for name in names:
+        touch(str(tmp_path / "one" / name))
+        touch(str(tmp_path / "two" / name))
+    organizer = FileOrganizer()
+
+    events = list(organizer.iter_organize_names(str(tmp_path / "one"), names + ["gone.txt"], workers=4))
+    assert sorted(event.name for event in events) == sorted(names)
+    assert all(event.error is None for event in events)
+    assert max(event.index for event in events) <= len(names) + 1
+
+    paths = [os.path.join("two", name) for name in names]
+    events = list(organizer.iter_organize_paths(paths, root=str(tmp_path), workers=4))
+    assert [event.index for event in events] == list(range(1, len(names) + 1))
+    assert all(event.error is None for event in events)
+    assert files_in(tmp_path / "two") == sorted(
+        os.path.join("Images" if name.endswith(".jpg") else "Documents", name) for name in names)
+
+
+@pytest.mark.skipif(open_fds() is None, reason="needs /proc/self/fd")
+@pytest.mark.parametrize("options", [
+    dict(),
+    dict(recursive=True),
+    dict(recursive=True, walk_threads=4, workers=4),
+    dict(max_memory=1 << 40),
+    dict(recursive=True, max_memory=1 << 40, workers=4),
+])
+def test_runs_close_their_fds(tmp_path, options):
+    for d in ["", "x", "x/y", "z"]:
+        for name in ["a.jpg", "b.pdf", "c.zip"]:
+            touch(str(tmp_path / d / name))
+    touch(str(tmp_path / "Images" / "a.jpg"))
+    before = open_fds()
+    events = list(FileOrganizer().iter_organize(str(tmp_path), **options))
+    assert events and all(event.error is None for event in events)
+    assert open_fds() == before
+
+
+@pytest.mark.skipif(open_fds() is None, reason="needs /proc/self/fd")
+def test_a_run_stopped_early_closes_its_fds(tmp_path):
+    before = open_fds()
+    for run, options in enumerate([dict(recursive=True), dict(recursive=True, max_memory=1 << 40)]):
+        for i in range(20):
+            touch(str(tmp_path / str(run) / f"d{i}" / "a.jpg"))
+        events = FileOrganizer().iter_organize(str(tmp_path / str(run)), **options)
+        next(events)
+        events.close()
+        assert open_fds() == before
+
+
+def test_watch_refuses_recursive(tmp_path):
+    touch(str(tmp_path / "sub" / "a.jpg"))
+    with pytest.raises(ValueError):
+        FileOrganizer().watch_directory(str(tmp_path), lambda message, progress: None, mode="poll", recursive=True)
+    assert files_in(tmp_path) == ["sub/a.jpg"]
@@ -0,0 +1,74 @@
+import json
+import os
+import threading
+
+import pytest
+
+from bobnox import FileOrganizer
+from organize_reload import RulesReloader
+from organize_rules import RuleSet
+
+
+def write_rules(path, config):
+    tmp = str(path) + ".tmp"
+    with open(tmp, "w") as fh:
+        json.dump(config, fh)
+    os.replace(tmp, path)
+
+
+@pytest.fixture
+def reloader(tmp_path):
+    path = tmp_path / "rules.json"
+    write_rules(path, {"rules": [{"folder": "First", "extension": ".txt"}]})
+    organizer = FileOrganizer(RuleSet.load(str(path)))
+    events = []
+    done = threading.Event()
+
+    def record(kind):
+        def callback(value, _):
+            events.append((kind, value))
+            done.set()
+        return callback
+
+    reloader = RulesReloader(organizer, str(path), interval=60, on_reload=record("reload"),
+                             on_error=record("error")).start()
+
+    def reload(config):
+        done.clear()
+        write_rules(path, config)
+        reloader.reload()
+        assert done.wait(5)
+        return events[-1]
+
+    yield organizer, reload
+    reloader.stop()
+
+
+@pytest.mark.parametrize("config", [
+    {"rules": [1]},
+    {"rules": [{"folder": "A", "priority": "hi"}]},
+    {"rules": [{"folder": "A", "regex": "(?i)inv"}]},
+    {"rules": [{"folder": "../out", "extension": ".txt"}]},
+    "not an object",
+])
+def test_bad_config_keeps_current_rules_and_reloading_alive(reloader, config):
+    organizer, reload = reloader
+    kind, error = reload(config)
+    assert kind == "error" and isinstance(error, ValueError)
+    assert organizer.rules_version == 0
+
+    kind, version = reload({"rules": [{"folder": "Second", "extension": ".txt"}]})
+    assert (kind, version) == ("reload", 1)
+    assert organizer.rules.rules[0].folder == "Second"
+
+
+def test_unexpected_error_is_reported(reloader, monkeypatch):
+    organizer, reload = reloader
+
+    def broken(*args, **kwargs):
+        raise RuntimeError("boom")
+    monkeypatch.setattr(RuleSet, "load", broken)
+    kind, error = reload({"rules": []})
+    assert kind == "error" and isinstance(error, RuntimeError)
+    monkeypatch.undo()
+    assert reload({"rules": []}) == ("reload", 1)
@@ -0,0 +1,84 @@
+import os
+import shutil
+
+import pytest
+
+import bobnox
+import organize_linux
+from bobnox import FileOrganizer
+from organize_index import ResumeCursor
+from organize_linux import getdents_available, stable_offsets
+
+needs_getdents = pytest.mark.skipif(not getdents_available(), reason="needs getdents64")
+
+
+def make_files(directory, count=30):
+    os.makedirs(directory, exist_ok=True)
+    for i in range(count):
+        with open(os.path.join(directory, f"f{i}.jpg"), "wb"):
+            pass
+
+
+def left(directory):
+    return sorted(entry.name for entry in os.scandir(directory) if entry.is_file())
+
+
+@pytest.fixture
+def short_budget(monkeypatch):
+    """Makes time budgets run out after ten files."""
+    checks = []
+
+    def check(budget):
+        checks.append(None)
+        if len(checks) > 10:
+            budget.expired = True
+        return budget.expired
+    monkeypatch.setattr(bobnox._TimeBudget, "check", check)
+    return checks
+
+
+@pytest.mark.parametrize("fs_type, stable", [("ext4", True), ("xfs", True), ("tmpfs", False), ("fuse.sshfs", False),
+                                             (None, False)])
+def test_stable_offsets(monkeypatch, fs_type, stable):
+    monkeypatch.setattr(organize_linux, "filesystem_type", lambda path: fs_type)
+    assert stable_offsets("/") == stable
+
+
+def run(directory):
+    return list(FileOrganizer().iter_organize(str(directory), scanner="getdents", time_budget=3600))
+
+
+@needs_getdents
+@pytest.mark.parametrize("stable", [True, False])
+def test_position_is_only_kept_where_offsets_are_stable(tmp_path, monkeypatch, short_budget, stable):
+    monkeypatch.setattr(bobnox, "stable_offsets", lambda path: stable)
+    make_files(str(tmp_path))
+    first = len(run(tmp_path))
+    assert 0 < first < 30
+    cursor = ResumeCursor.load(str(tmp_path), False, False)
+    assert cursor.pending_dirs == [str(tmp_path)]
+    if stable:
+        st = os.stat(tmp_path)
+        assert cursor.position and cursor.directory == [st.st_dev, st.st_ino]
+    else:
+        assert (cursor.position, cursor.directory) == (0, None)
+
+    monkeypatch.undo()
+    assert len(run(tmp_path)) == 30 - first
+    assert left(tmp_path) == []
+
+
+@needs_getdents
+def test_position_of_another_directory_is_ignored(tmp_path, monkeypatch, short_budget):
+    monkeypatch.setattr(bobnox, "stable_offsets", lambda path: True)
+    directory = tmp_path / "inbox"
+    make_files(str(directory))
+    run(directory)
+    assert ResumeCursor.load(str(directory), False, False).position
+
+    # Same path, new directory: its offsets have nothing to do with the saved one
+    shutil.rmtree(directory)
+    make_files(str(directory))
+    monkeypatch.undo()
+    assert len(run(directory)) == 30
+    assert left(directory) == []
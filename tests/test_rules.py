@@ -0,0 +1,103 @@
+import json
+import os
+
+import pytest
+
+from organize_rules import RuleSet, relative_folder
+
+
+class Entry:
+    def __init__(self, name):
+        self.name = name
+        self.path = name
+
+    def stat(self):
+        return os.stat_result((0o100644, 0, 0, 1, 0, 0, 10, 0, 0, 0))
+
+
+@pytest.mark.parametrize("folder", ["a/../../escaped", "..", "../x", "a/..", "/etc", "\\\\server\\share",
+                                    "C:\\Users", "c:x", "", ".", "./", None, 7])
+def test_folder_outside_directory_is_refused(folder):
+    with pytest.raises(ValueError):
+        RuleSet.from_config({"rules": [{"folder": folder, "extension": ".txt"}]})
+
+
+def test_keyword_folder_outside_directory_is_refused():
+    with pytest.raises(ValueError):
+        RuleSet.from_config({"keywords": {"invoice": "a/../../escaped"}})
+
+
+def test_folder_is_normalized():
+    assert relative_folder("./Invoices//2026/") == "Invoices/2026"
+    assert relative_folder("Docs\\Old") == "Docs/Old"
+    ruleset = RuleSet.from_config({"rules": [{"folder": "./Text/", "extension": ".txt"}]})
+    assert ruleset.match(Entry("notes.txt")) == "Text"
+
+
+def match(config, name):
+    return RuleSet.from_config(config).match(Entry(name))
+
+
+def test_backreference_after_rule_with_groups():
+    config = {"rules": [{"folder": "Other", "regex": "^(x|y)z"}, {"folder": "Doubled", "regex": "^(\\w)\\1"}]}
+    assert match(config, "aa.txt") == "Doubled"
+    assert match(config, "ab.txt") is None
+    assert match(config, "xz.txt") == "Other"
+
+
+def test_group_conditional_runs_alone():
+    config = {"rules": [{"folder": "A", "regex": "^(q)+r"},
+                        {"folder": "Quoted", "regex": "^(<)?\\w+(?(1)>)$"}]}
+    assert match(config, "<name>") == "Quoted"
+    assert match(config, "<name") is None
+
+
+@pytest.mark.parametrize("regex, expected", [
+    ("(\\w)\\1", True), ("(a)(?(1)b|c)", True), ("[\\1]", False), ("\\\\1", False),
+    ("\\101", False), ("\\0", False), ("(a)\\12", True), ("[]\\1]x", False), ("abc", False),
+])
+def test_refers_to_groups(regex, expected):
+    from organize_rules import refers_to_groups
+    assert refers_to_groups(regex) is expected
+
+
+@pytest.mark.parametrize("config", [
+    {"rules": [1]},
+    {"rules": ["Invoices"]},
+    {"rules": [{"folder": "A", "priority": "hi"}]},
+    {"rules": [{"folder": "A", "priority": True}]},
+    {"rules": [{"folder": "A", "extension": [1]}]},
+    {"rules": [{"folder": "A", "extension": 5}]},
+    {"rules": [{"folder": "A", "glob": 5}]},
+    {"rules": [{"folder": "A", "regex": ["a"]}]},
+    {"rules": [{"folder": "A", "min_size": [1]}]},
+    {"keywords": [{"keyword": 1, "folder": "A"}]},
+    {"keywords": [{"keyword": "a", "folder": "A", "priority": "hi"}]},
+    {"keywords": [3]},
+])
+def test_invalid_types_raise_value_error(config):
+    with pytest.raises(ValueError):
+        RuleSet.from_config(config)
+
+
+@pytest.mark.parametrize("regex", ["(?i)inv", "inv(", "(?P<x>a)", "a{2,1}"])
+def test_bad_pattern_fails_when_loading(tmp_path, cache_home, regex):
+    path = tmp_path / "rules.json"
+    path.write_text(json.dumps({"rules": [{"folder": "Invoices", "regex": regex}]}))
+    with pytest.raises(ValueError):
+        RuleSet.load(str(path))
+    assert not list(cache_home.glob("bobnox/rules-*"))
+
+
+def test_cached_rules_match_like_fresh_ones(tmp_path, cache_home):
+    path = tmp_path / "rules.json"
+    path.write_text(json.dumps({"rules": [
+        {"folder": "Invoices", "glob": "invoice*.pdf", "ignore_case": True},
+        {"folder": "Doubled", "regex": "^(\\w)\\1"},
+        {"folder": "Reports", "regex": "^report-\\d{4}", "priority": 10},
+    ]}))
+    fresh = RuleSet.load(str(path))
+    assert len(list(cache_home.glob("bobnox/rules-*.pickle"))) == 1
+    cached = RuleSet.load(str(path))
+    for name in ["INVOICE-1.pdf", "aa.txt", "report-2026.pdf", "other.txt"]:
+        assert cached.match(Entry(name)) == fresh.match(Entry(name))
@@ -0,0 +1,79 @@
+import os
+
+import pytest
+
+from organize_sniff import ContentSniffer, sniff_header
+
+
+def ftyp(major, *compatible):
+    body = major + b"\0\0\0\0" + b"".join(compatible)
+    return (len(body) + 8).to_bytes(4, "big") + b"ftyp" + body + b"\0" * 64
+
+
+@pytest.mark.parametrize("header, extension", [
+    (ftyp(b"avif", b"mif1", b"miaf"), ".avif"),
+    (ftyp(b"mif1", b"avif", b"miaf"), ".avif"),
+    (ftyp(b"heic", b"mif1", b"heic"), ".heic"),
+    (ftyp(b"mif1", b"heic"), ".heic"),
+    (ftyp(b"mif1", b"miaf"), ".heif"),
+    (ftyp(b"isom", b"isom", b"iso2", b"avc1", b"mp41"), ".mp4"),
+    (ftyp(b"M4A ", b"M4A ", b"mp42"), ".m4a"),
+    (ftyp(b"qt  ", b"qt  "), ".mov"),
+    (ftyp(b"3gp5", b"3gp5"), ".3gp"),
+    (ftyp(b"dash"), ".mp4"),
+    (b"\x89PNG\r\n\x1a\n", ".png"),
+    (b"#!/usr/bin/env python3\n", ".py"),
+    (b"plain text", None),
+])
+def test_sniff_header(header, extension):
+    assert sniff_header(header) == extension
+
+
+class Entry:
+    def __init__(self, path):
+        self.path = path
+        self.name = os.path.basename(path)
+
+    def stat(self):
+        return os.stat(self.path)
+
+
+def write(path, data):
+    with open(path, "wb") as fh:
+        fh.write(data)
+    # Old enough to be cached
+    os.utime(path, (1_000_000_000, 1_000_000_000))
+
+
+@pytest.mark.parametrize("workers", [1, 4])
+def test_cache_drops_files_that_are_gone(tmp_path, workers):
+    cache = str(tmp_path / "sniff.json")
+    for name in ["kept", "deleted", "moved"]:
+        write(str(tmp_path / name), b"%PDF-1.4")
+    sniffer = ContentSniffer.load(cache, workers=workers)
+    assert [sniffer.sniff(Entry(str(tmp_path / name))) for name in ["kept", "deleted", "moved"]] == [".pdf"] * 3
+    sniffer.save()
+
+    os.remove(tmp_path / "deleted")
+    os.rename(tmp_path / "moved", tmp_path / "moved.pdf")
+    sniffer = ContentSniffer.load(cache, workers=workers)
+    assert len(sniffer._cache) == 3
+    sniffer.save()
+    sniffer = ContentSniffer.load(cache, workers=workers)
+    assert [entry[3] for entry in sniffer._cache.values()] == [str(tmp_path / "kept")]
+
+
+def test_cache_follows_files_sniffed_again_elsewhere(tmp_path):
+    cache = str(tmp_path / "sniff.json")
+    write(str(tmp_path / "a"), b"%PDF-1.4")
+    sniffer = ContentSniffer.load(cache)
+    sniffer.sniff(Entry(str(tmp_path / "a")))
+    sniffer.save()
+
+    os.rename(tmp_path / "a", tmp_path / "b")
+    sniffer = ContentSniffer.load(cache)
+    assert sniffer.sniff(Entry(str(tmp_path / "b"))) == ".pdf"
+    sniffer.save()
+    sniffer = ContentSniffer.load(cache)
+    sniffer.save()
+    assert [entry[3] for entry in ContentSniffer.load(cache)._cache.values()] == [str(tmp_path / "b")]
@@ -0,0 +1,93 @@
+import os
+import random
+import threading
+
+import pytest
+
+from organize_spill import SpillingSorter
+
+
+def records(count, seed=0):
+    rng = random.Random(seed)
+    names = ["a.jpg", "b (1).pdf", "café.png", "日本.txt", "x" * 300, "sp ace", "\udcff raw"]
+    return [(f"/data/d{rng.randint(0, 20)}", rng.choice(["Images", "Documents"]), f"{rng.choice(names)}{rng.randint(0, 50)}")
+            for _ in range(count)]
+
+
+def run_files(directory):
+    return sorted(name for name in os.listdir(directory) if name.endswith(".run"))
+
+
+@pytest.fixture(autouse=True)
+def small_reads(monkeypatch):
+    # Records then straddle read chunks all the time
+    monkeypatch.setattr(SpillingSorter, "MIN_READ_CHUNK", 7)
+    monkeypatch.setattr(SpillingSorter, "READ_CHUNK", 7)
+
+
+def test_spilled_records_come_back_sorted_and_deduplicated(tmp_path):
+    added = records(2000)
+    with SpillingSorter(3, 4096, tmpdir=str(tmp_path)) as sorter:
+        for record in added:
+            sorter.add(record)
+        assert len(run_files(tmp_path)) > 10
+        assert sorter.count == len(added)
+        assert list(sorter) == sorted(set(added))
+    assert run_files(tmp_path) == []
+
+
+def test_without_spilling(tmp_path):
+    added = records(50)
+    with SpillingSorter(3, 1 << 30, tmpdir=str(tmp_path)) as sorter:
+        for record in added:
+            sorter.add(record)
+        assert list(sorter) == sorted(set(added))
+        assert run_files(tmp_path) == []
+
+
+def test_threads_add_at_once(tmp_path):
+    parts = [records(500, seed) for seed in range(4)]
+    with SpillingSorter(3, 2048, tmpdir=str(tmp_path)) as sorter:
+        threads = [threading.Thread(target=lambda part=part: [sorter.add(r) for r in part]) for part in parts]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert list(sorter) == sorted(set(r for part in parts for r in part))
+    assert run_files(tmp_path) == []
+
+
+def test_write_run_and_add_run_round_trip(tmp_path):
+    spill_dir = tmp_path / "spill"
+    spill_dir.mkdir()
+    saved = sorted(records(300, seed=1))
+    path = str(tmp_path / "saved.run")
+    assert SpillingSorter.write_run(saved, path) == len(saved)
+
+    added = records(300, seed=2)
+    with SpillingSorter(3, 4096, tmpdir=str(spill_dir)) as sorter:
+        sorter.add_run(path, len(saved))
+        for record in added:
+            sorter.add(record)
+        assert sorter.count == len(saved) + len(added)
+        assert list(sorter) == sorted(set(saved) | set(added))
+    # Spilled runs are removed, the adopted one belongs to the caller
+    assert run_files(spill_dir) == []
+    assert os.path.exists(path)
+
+    # A run adopted on its own comes back as written
+    with SpillingSorter(3, 4096, tmpdir=str(spill_dir)) as sorter:
+        sorter.add_run(path, len(saved))
+        assert list(sorter) == sorted(set(saved))
+
+
+def test_run_files_are_removed_when_the_merge_is_interrupted(tmp_path):
+    with pytest.raises(RuntimeError):
+        with SpillingSorter(3, 4096, tmpdir=str(tmp_path)) as sorter:
+            for record in records(2000):
+                sorter.add(record)
+            assert run_files(tmp_path)
+            for i, _ in enumerate(sorter):
+                if i == 100:
+                    raise RuntimeError("interrupted")
+    assert run_files(tmp_path) == []
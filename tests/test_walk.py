@@ -0,0 +1,52 @@
+import os
+
+import pytest
+
+from organize_walk import ParallelWalker
+
+
+def make_tree(root, dirs, files=3):
+    for d in dirs:
+        os.makedirs(root / d, exist_ok=True)
+        for i in range(files):
+            (root / d / f"f{i}.txt").write_text("x")
+
+
+def test_walk_lists_every_directory(tmp_path):
+    make_tree(tmp_path, ["a", "a/b", "c"])
+    seen = {os.path.relpath(dirpath, tmp_path): len(files) for dirpath, files in ParallelWalker(4).walk(str(tmp_path))}
+    assert seen == {".": 0, "a": 3, "a/b": 3, "c": 3}
+
+
+def test_skip_dir_prunes_by_name(tmp_path):
+    make_tree(tmp_path, ["keep", "skip", "skip/below"])
+    walker = ParallelWalker(2, skip_dir=lambda name: name == "skip")
+    seen = {os.path.relpath(dirpath, tmp_path) for dirpath, _ in walker.walk(str(tmp_path))}
+    assert seen == {".", "keep"}
+
+
+def test_handler_error_is_raised_by_walk(tmp_path):
+    make_tree(tmp_path, ["a", "b", "c"])
+
+    def handler(dirpath, files):
+        list(files)
+        if dirpath.endswith("b"):
+            raise RuntimeError("handler bug")
+        yield dirpath
+
+    with pytest.raises(RuntimeError, match="handler bug"):
+        list(ParallelWalker(3).walk(str(tmp_path), handler))
+
+
+def test_unlistable_directory_is_reported(tmp_path):
+    make_tree(tmp_path, ["a"])
+    walker = ParallelWalker(2)
+    walker._scan = lambda me, dirpath: (_ for _ in ()).throw(PermissionError(13, "denied", dirpath))
+    results = list(walker.walk(str(tmp_path)))
+    assert results and all(isinstance(error, PermissionError) for _, error in results)
+
+
+@pytest.mark.parametrize("workers", [0, -1])
+def test_walker_needs_a_worker(workers):
+    with pytest.raises(ValueError):
+        ParallelWalker(workers)
@@ -0,0 +1,62 @@
+import queue
+import threading
+import time
+
+from organize_watch import PollingWatcher, create_watcher
+
+
+def collect(watcher):
+    """Runs watcher.batches() on a thread; returns the queue of (arrival time, batch)."""
+    batches = queue.Queue()
+
+    def run():
+        for batch in watcher.batches():
+            batches.put((time.monotonic(), batch))
+    threading.Thread(target=run, daemon=True).start()
+    return batches
+
+
+def touch(path):
+    with open(path, "wb"):
+        pass
+
+
+def test_polling_watcher_gets_debounce_and_max_delay(tmp_path):
+    watcher = create_watcher(str(tmp_path), "poll", debounce=0.3, max_delay=2.0)
+    assert isinstance(watcher, PollingWatcher)
+    assert (watcher.debounce, watcher.max_delay) == (0.3, 2.0)
+
+
+def test_polling_batches_wait_for_quiet(tmp_path):
+    watcher = PollingWatcher(str(tmp_path), min_interval=0.01, max_interval=0.05, settle=0.02,
+                             debounce=0.5, max_delay=10.0)
+    batches = collect(watcher)
+    try:
+        for i in range(4):
+            touch(str(tmp_path / f"f{i}"))
+            time.sleep(0.1)
+        _, batch = batches.get(timeout=5)
+        assert batch == {"f0", "f1", "f2", "f3"}
+    finally:
+        watcher.stop()
+
+
+def test_polling_batches_come_out_within_max_delay(tmp_path):
+    watcher = PollingWatcher(str(tmp_path), min_interval=0.01, max_interval=0.05, settle=0.02,
+                             debounce=5.0, max_delay=0.3)
+    batches = collect(watcher)
+    try:
+        start = time.monotonic()
+        for i in range(20):
+            touch(str(tmp_path / f"f{i}"))
+            time.sleep(0.05)
+        arrived, batch = batches.get(timeout=5)
+        # Well before the stream of files stopped, let alone debounce seconds after it
+        assert arrived - start < 0.9
+        assert batch and len(batch) < 20
+        seen = set(batch)
+        while len(seen) < 20:
+            seen |= batches.get(timeout=5)[1]
+        assert seen == {f"f{i}" for i in range(20)}
+    finally:
+        watcher.stop()